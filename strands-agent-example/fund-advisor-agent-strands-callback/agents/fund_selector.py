@@ -8,7 +8,7 @@ import logging
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 logger = logging.getLogger(__name__)
-from tools.fund_info import get_fund_by_code, get_fund_search_results, get_fund_fees_by_code, get_fund_manager_by_code, get_fund_performance_by_code
+from tools.fund_info import get_fund_by_code, get_fund_search_results, get_fund_fees_by_code, get_fund_manager_by_code, get_fund_performance_by_code, resolve_fund, get_funds_by_codes, screen_funds
 from utils.context_utils import get_current_callback_handler
 from utils.agent_utils import create_agent_with_parent_callback
 
@@ -43,6 +43,9 @@ def fund_selector_agent(query: str) -> str:
         6. 考虑基金经理的管理能力和团队稳定性
         
         你的筛选结果应该提供多个选项，并说明每个选项的优势和适用场景。你需要使用基金搜索工具获取符合条件的基金列表，然后进行进一步分析和筛选。
+        当用户只给出基金名称、简称或拼音缩写时，先使用基金名称解析工具确定准确的基金代码。
+        需要对比多只候选基金时，使用批量基金查询工具一次获取所有基金的信息。
+        按收益率区间、费率、基金公司、基金经理等多个条件筛选时，使用基金筛选工具一次完成过滤和排序，不要多次调用基金搜索工具逐步缩小范围。
         
         输出格式：
         1. 筛选条件：[根据用户画像提取的筛选条件]
@@ -54,7 +57,7 @@ def fund_selector_agent(query: str) -> str:
            - 推荐理由：[为什么推荐这只基金]
         3. 投资建议：[如何配置这些基金，以及其他投资建议]
         """,
-        tools=[get_fund_by_code, get_fund_search_results, get_fund_fees_by_code, get_fund_manager_by_code, get_fund_performance_by_code,],
+        tools=[resolve_fund, get_fund_by_code, get_funds_by_codes, screen_funds, get_fund_search_results, get_fund_fees_by_code, get_fund_manager_by_code, get_fund_performance_by_code,],
         load_tools_from_directory=False
     )
     
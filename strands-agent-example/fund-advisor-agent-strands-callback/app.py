@@ -18,6 +18,7 @@ from pydantic import BaseModel
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from agents.portfolio_manager import PortfolioManagerAgent
+from tools.fund_info import start_fund_data_preload
 from utils.callback_handlers import StreamingCallbackHandler, LoggingCallbackHandler, EventType
 
 # 加载环境变量
@@ -79,6 +80,9 @@ set_current_callback_handler(composite_handler)
 # 创建投资组合管理Agent，并传入回调处理器
 portfolio_manager = PortfolioManagerAgent(callback_handler=composite_handler)
 
+# 后台预加载基金数据（基金目录、DuckDB 表和名称索引）
+start_fund_data_preload()
+
 @app.get("/")
 async def root():
     """API根路径，返回API信息"""
@@ -11,6 +11,7 @@ from dotenv import load_dotenv
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from agents.portfolio_manager import PortfolioManagerAgent
+from tools.fund_info import start_fund_data_preload
 from utils.callback_handlers import ConsoleCallbackHandler, LoggingCallbackHandler, CompositeCallbackHandler
 
 # 配置日志
@@ -44,6 +45,7 @@ def setup_agent_with_callbacks():
     
     # 创建投资组合管理Agent，并传入回调处理器
     portfolio_manager = PortfolioManagerAgent(callback_handler=composite_handler)
+    start_fund_data_preload()
     
     return portfolio_manager
 
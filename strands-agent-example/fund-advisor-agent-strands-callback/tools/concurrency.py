@@ -0,0 +1,127 @@
+"""
+工具调用的并发辅助
+
+SingleFlight: 同一时刻针对同一参数的多个相同请求只发出一次上游调用，
+其余调用方等待并共享这次调用的结果（或异常）。投资组合经理把同一只基金
+同时分发给多个子 Agent 时，重复的 akshare / DynamoDB 请求会合并为一次。
+
+fan_out: 在有界线程池上并发执行多个相互独立的阻塞请求，每个请求有超时限制，
+工具的耗时取决于最慢的一个请求，而不是所有请求之和。
+"""
+
+import contextvars
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """按键合并并发中的重复调用"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """执行 fn；若相同 key 的调用正在进行，则等待并返回它的结果"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+def single_flight(func: Callable) -> Callable:
+    """装饰器：合并对 func 的并发相同调用，参数不可哈希时直接调用
+
+    返回值会被多个调用方共享，被装饰的函数应只用于只读查询。
+    """
+    group = SingleFlight()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return func(*args, **kwargs)
+        return group.do(key, lambda: func(*args, **kwargs))
+
+    return wrapper
+
+
+# 所有工具共用的线程池大小，以及单个请求的默认超时时间（秒）
+FAN_OUT_WORKERS = 16
+FAN_OUT_TIMEOUT = 30
+
+_pool_local = threading.local()
+
+
+def _mark_pool_thread():
+    _pool_local.in_pool = True
+
+
+_pool = ThreadPoolExecutor(
+    max_workers=FAN_OUT_WORKERS, thread_name_prefix="tool-fan-out", initializer=_mark_pool_thread
+)
+
+
+def fan_out(tasks: Dict[Hashable, Callable[[], Any]], timeout: float = FAN_OUT_TIMEOUT) -> Dict[Hashable, Any]:
+    """并发执行一组无参调用，返回 {名称: 结果}
+
+    失败或超时的调用，其结果为对应的异常对象（超时为 TimeoutError），由调用方决定如何处理。
+    超时的调用无法被中断，会在后台继续执行到结束。
+    在线程池内部再次调用 fan_out 时改为顺序执行，避免线程池被嵌套任务占满而死锁。
+    每个任务在调用方 contextvars 上下文的副本中执行，请求级作用域（见 tools/request_context.py）随之传递。
+    """
+    if getattr(_pool_local, "in_pool", False) or len(tasks) <= 1:
+        results = {}
+        for name, task in tasks.items():
+            try:
+                results[name] = task()
+            except Exception as e:
+                results[name] = e
+        return results
+
+    deadline = time.monotonic() + timeout
+    futures = {name: _pool.submit(contextvars.copy_context().run, task) for name, task in tasks.items()}
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError:
+            logger.warning(f"并发请求 {name} 超过 {timeout} 秒未返回")
+            results[name] = TimeoutError(f"{name} timed out after {timeout}s")
+        except Exception as e:
+            results[name] = e
+    return results
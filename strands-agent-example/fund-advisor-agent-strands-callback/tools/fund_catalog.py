@@ -0,0 +1,179 @@
+"""
+基金目录（fund catalog）
+
+进程内只加载一次 data/fund_performance_all.csv，并把各列解析为类型确定的
+NumPy 数组（收益率、净值为 float64，手续费字符串 "0.15%" 解析为 0.15），
+供基金搜索、筛选等工具直接查询，避免在每次工具调用时重新读取和推断 CSV。
+"""
+
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent / "data"
+PERFORMANCE_CSV = DATA_DIR / "fund_performance_all.csv"
+BASIC_INFO_CSV = DATA_DIR / "fund_basic_info.csv"
+
+# 文本列
+TEXT_COLUMNS = ["fund_code", "fund_name", "fund_type", "manager_name", "company"]
+
+# 收益率列（单位：%），按时间跨度从短到长排列
+RETURN_COLUMNS = [
+    "daily_return",
+    "weekly_return",
+    "monthly_return",
+    "quarterly_return",
+    "half_year_return",
+    "yearly_return",
+    "two_year_return",
+    "three_year_return",
+    "ytd_return",
+    "since_inception_return",
+    "custom_return",
+]
+
+# 其余数值列
+NUMERIC_COLUMNS = ["nav", "acc_nav", "fee"] + RETURN_COLUMNS
+
+# 计算同类排名的列：收益率越高越好，费率越低越好
+PEER_RANK_COLUMNS = RETURN_COLUMNS + ["fee"]
+LOWER_IS_BETTER = {"fee"}
+
+# 取值重复度高的文本列，子串匹配在去重后的取值上进行
+FACET_COLUMNS = ["fund_type", "company", "manager_name"]
+
+
+def parse_percent(values: pd.Series) -> np.ndarray:
+    """把 "0.15%" 形式的字符串解析为浮点数（0.15），无法解析的值为 NaN"""
+    cleaned = values.astype("string").str.strip().str.rstrip("%")
+    return pd.to_numeric(cleaned, errors="coerce").to_numpy(dtype=np.float64)
+
+
+class FundCatalog:
+    """内存中的列式基金目录
+
+    frame 保存去重列名后的 DataFrame；columns 保存同一份数据的 NumPy 列，
+    供向量化查询使用。加载完成后视为只读。
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        self.columns: Dict[str, np.ndarray] = {
+            name: frame[name].to_numpy() for name in frame.columns
+        }
+        self.size = len(frame)
+        self._code_to_row = {code: row for row, code in enumerate(self.columns["fund_code"])}
+        # 代码与名称拼接成一个检索串，子串匹配时只需遍历一次
+        self._search_keys = [
+            f"{code}\x00{name}" for code, name in zip(self.columns["fund_code"], self.columns["fund_name"])
+        ]
+        # 基金类型、基金公司、基金经理的取值只有几十到几千种，先在去重后的取值上做子串匹配，再映射回行
+        self._facets = {}
+        for name in FACET_COLUMNS:
+            codes, values = pd.factorize(frame[name])
+            self._facets[name] = (codes, np.asarray(values, dtype=str))
+        self.peer_ranks, self.peer_counts = self._rank_within_type(frame)
+
+    @staticmethod
+    def _rank_within_type(frame: pd.DataFrame):
+        """按基金类型分组，计算每只基金在各列上的同类排名（1 为最好）和参与排名的同类基金数量
+
+        缺失值不参与排名，排名为 NaN；并列时取最好的名次。
+        """
+        groups = frame.groupby("fund_type", sort=False)
+        ranks, counts = {}, {}
+        for name in PEER_RANK_COLUMNS:
+            rank = groups[name].rank(method="min", ascending=name in LOWER_IS_BETTER)
+            ranks[name] = rank.to_numpy(dtype=np.float64)
+            counts[name] = groups[name].transform("count").to_numpy(dtype=np.int64)
+        return ranks, counts
+
+    @classmethod
+    def from_csv(cls, csv_path: Path = PERFORMANCE_CSV) -> "FundCatalog":
+        """从 CSV 加载目录，所有类型转换都在这里一次完成"""
+        raw = pd.read_csv(csv_path, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+        # 原始文件中 fund_code、fund_name 各重复一列，pandas 会重命名为 *.1，这里只保留第一列
+        raw = raw.loc[:, ~raw.columns.str.contains(r"\.\d+$")]
+
+        frame = pd.DataFrame(index=raw.index)
+        for name in TEXT_COLUMNS:
+            frame[name] = raw[name].astype(object).to_numpy()
+        frame["nav"] = pd.to_numeric(raw["nav"], errors="coerce").astype(np.float64)
+        frame["acc_nav"] = pd.to_numeric(raw["acc_nav"], errors="coerce").astype(np.float64)
+        for name in RETURN_COLUMNS:
+            frame[name] = pd.to_numeric(raw[name], errors="coerce").astype(np.float64)
+        frame["fee"] = parse_percent(raw["fee"])
+
+        logger.info(f"基金目录加载完成: {len(frame)} 只基金")
+        return cls(frame.reset_index(drop=True))
+
+    def row_of(self, fund_code: str) -> Optional[int]:
+        """根据基金代码返回行号，不存在时返回 None"""
+        return self._code_to_row.get(fund_code)
+
+    def rows_of(self, fund_codes: Iterable[str]) -> np.ndarray:
+        """批量查找行号，不存在的基金代码为 -1"""
+        rows = pd.Series(list(fund_codes), dtype=object).map(self._code_to_row)
+        return rows.fillna(-1).to_numpy(dtype=np.int64)
+
+    def text_mask(self, query: str) -> np.ndarray:
+        """基金代码或名称包含 query 的行"""
+        return np.fromiter((query in key for key in self._search_keys), dtype=bool, count=self.size)
+
+    def contains_mask(self, column: str, text: str) -> np.ndarray:
+        """FACET_COLUMNS 中某一列包含 text 的行"""
+        codes, values = self._facets[column]
+        # 末尾追加 False，缺失值（编码为 -1）映射到它
+        matched = np.append(np.char.find(values, text) >= 0, False)
+        return matched[codes]
+
+    def type_mask(self, fund_type: str) -> np.ndarray:
+        """基金类型包含 fund_type 的行"""
+        return self.contains_mask("fund_type", fund_type)
+
+    def peer_ranking(self, row: int) -> list:
+        """返回某行在各列上的 (列名, 取值, 同类排名, 同类数量, 前百分之几)，排名为 NaN 的列取值均为 None"""
+        ranking = []
+        for name in PEER_RANK_COLUMNS:
+            rank = self.peer_ranks[name][row]
+            if np.isnan(rank):
+                ranking.append((name, None, None, None, None))
+                continue
+            count = int(self.peer_counts[name][row])
+            value = float(self.columns[name][row])
+            ranking.append((name, value, int(rank), count, round(float(rank) / count * 100, 2)))
+        return ranking
+
+    def records(self, rows) -> list:
+        """把行号数组转换为字典列表，NaN 转为 None 以便 JSON 序列化"""
+        records = []
+        for row in rows:
+            record = {}
+            for name, values in self.columns.items():
+                value = values[row]
+                if isinstance(value, np.floating):
+                    value = None if np.isnan(value) else float(value)
+                record[name] = value
+            records.append(record)
+        return records
+
+
+_catalog: Optional[FundCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_fund_catalog() -> FundCatalog:
+    """获取进程级基金目录，首次调用时加载"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = FundCatalog.from_csv()
+    return _catalog
+
@@ -0,0 +1,114 @@
+"""
+股票 → 基金的持仓穿透索引
+
+由持仓库（见 tools/holdings_store.py）中每只基金最新季度的持仓构建一个稀疏矩阵：
+行是基金，列是股票，值是持仓占基金净值的比例。矩阵同时以 CSR（按基金）和 CSC（按股票）两种方式存放，
+全部是 NumPy 数组，不依赖 scipy：
+
+- 按股票查持有它的基金：读取 CSC 中该股票的一段
+- 组合的股票敞口：组合权重向量 w 与矩阵相乘（A^T w），用 np.bincount 一次完成
+
+持仓库有基金新增季度时，下一次查询会重建索引。
+索引只包含本进程已加载持仓的基金（例如组合穿透时加载的组合成分），不是全市场的基金；
+按股票反查全市场的持有基金使用个股的基金持股明细（见 tools/fund_info.py 中的 get_funds_holding_stock）。
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tools.holdings_store import HoldingsStore, get_holdings_store, quarter_label
+
+
+class HoldingsIndex:
+    """基金 × 股票的稀疏持仓矩阵"""
+
+    def __init__(self, latest_holdings: List[Tuple[str, int, pd.DataFrame]]):
+        latest_holdings = [entry for entry in latest_holdings if not entry[2].empty]
+        self.fund_codes = np.array([fund_code for fund_code, _, _ in latest_holdings], dtype=object)
+        self.quarters = np.array([quarter for _, quarter, _ in latest_holdings], dtype=np.int64)
+        self._fund_rows = {fund_code: row for row, fund_code in enumerate(self.fund_codes)}
+
+        if latest_holdings:
+            frames = [frame for _, _, frame in latest_holdings]
+            stock_codes = np.concatenate([frame["stock_code"].to_numpy(dtype=object) for frame in frames])
+            stock_names = np.concatenate([frame["stock_name"].to_numpy(dtype=object) for frame in frames])
+            weights = np.concatenate([frame["weight"].to_numpy(dtype=np.float64) for frame in frames]) / 100
+            counts = np.array([len(frame) for frame in frames], dtype=np.int64)
+        else:
+            stock_codes = stock_names = np.array([], dtype=object)
+            weights = np.array([], dtype=np.float64)
+            counts = np.array([], dtype=np.int64)
+
+        # 列号：按股票代码去重
+        columns, first, self.indices = np.unique(stock_codes.astype(str), return_index=True, return_inverse=True)
+        self.stock_codes = columns.astype(object)
+        self.stock_names = stock_names[first]
+        self._stock_columns = {stock_code: column for column, stock_code in enumerate(columns)}
+        self.data = np.nan_to_num(weights)
+
+        # CSR：第 i 只基金的持仓是 indices/data[indptr[i]:indptr[i + 1]]
+        self.indptr = np.concatenate([[0], np.cumsum(counts)])
+        self._rows = np.repeat(np.arange(len(counts)), counts)
+
+        # CSC：按列号稳定排序后，第 j 只股票的持有基金是 col_rows/col_data[col_ptr[j]:col_ptr[j + 1]]
+        order = np.argsort(self.indices, kind="stable")
+        self.col_rows = self._rows[order]
+        self.col_data = self.data[order]
+        self.col_ptr = np.concatenate([[0], np.cumsum(np.bincount(self.indices, minlength=len(columns)))])
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.fund_codes), len(self.stock_codes)
+
+    def funds_holding(self, stock_code: str) -> List[Tuple[str, float, str]]:
+        """持有某只股票的基金 [(基金代码, 占基金净值比例 %, 季度)]，按比例从高到低"""
+        column = self._stock_columns.get(stock_code)
+        if column is None:
+            return []
+        start, end = self.col_ptr[column], self.col_ptr[column + 1]
+        rows, weights = self.col_rows[start:end], self.col_data[start:end]
+        order = np.argsort(-weights, kind="stable")
+        return [
+            (self.fund_codes[row], float(weight * 100), quarter_label(int(self.quarters[row])))
+            for row, weight in zip(rows[order], weights[order])
+        ]
+
+    def exposure(self, fund_weights: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray]:
+        """组合穿透后的股票敞口
+
+        fund_weights 为 {基金代码: 组合中的权重}；返回 (每只股票占组合的比例, 贡献该股票的基金数)。
+        不在索引中的基金（没有股票持仓）不贡献任何敞口。
+        """
+        known = [(self._fund_rows[code], weight) for code, weight in fund_weights.items() if code in self._fund_rows]
+        rows = np.array([row for row, _ in known], dtype=np.int64)
+        weights = np.array([weight for _, weight in known], dtype=np.float64)
+        # 取出组合中每只基金在 CSR 中的一段，拼成一个非零元位置数组
+        starts, lengths = self.indptr[rows], self.indptr[rows + 1] - self.indptr[rows]
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        positions = offsets + np.arange(lengths.sum())
+        # A^T w：每个非零元乘以所在基金的组合权重，再按股票列号累加
+        contributions = self.data[positions] * np.repeat(weights, lengths)
+        columns = self.indices[positions]
+        exposure = np.bincount(columns, weights=contributions, minlength=len(self.stock_codes))
+        funds = np.bincount(columns, minlength=len(self.stock_codes))
+        return exposure, funds
+
+
+_index: Optional[HoldingsIndex] = None
+_index_version = -1
+_index_lock = threading.Lock()
+
+
+def get_holdings_index(store: Optional[HoldingsStore] = None) -> HoldingsIndex:
+    """获取与持仓库当前内容一致的索引，持仓库有变化时重建"""
+    global _index, _index_version
+    store = store or get_holdings_store()
+    with _index_lock:
+        store.load_all()
+        if _index is None or _index_version != store.version:
+            _index_version = store.version
+            _index = HoldingsIndex(store.latest_holdings())
+        return _index
@@ -0,0 +1,136 @@
+"""
+A 股实时行情快照
+
+stock_zh_a_spot_em 每次返回全部约 5000 只 A 股的行情。这里在进程内只保留一份快照，
+并建立 股票代码 -> 行号 的索引，单只或批量查询都直接读快照，不再为一只股票下载整张表。
+
+快照由后台线程定时刷新：交易时段（北京时间工作日 9:15-11:30、13:00-15:00）内每隔
+STOCK_SPOT_REFRESH_INTERVAL 秒（默认 30 秒，可通过同名环境变量配置）刷新一次，
+其余时间行情不变，每隔 OFF_HOURS_REFRESH_INTERVAL 秒刷新一次。
+读取时如果快照已超过两个刷新间隔没有更新（例如 Lambda 实例被冻结后恢复），会先同步刷新。
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import time as dtime
+from typing import Dict, Iterable, Optional
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from tools.ak_cache import ak_refresh
+from tools.concurrency import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+SPOT_ENDPOINT = "stock_zh_a_spot_em"
+
+# 交易时段内的刷新间隔（秒）
+SPOT_REFRESH_INTERVAL = float(os.environ.get("STOCK_SPOT_REFRESH_INTERVAL", "30"))
+# 非交易时段的刷新间隔（秒）
+OFF_HOURS_REFRESH_INTERVAL = 30 * 60
+
+MARKET_TIMEZONE = ZoneInfo("Asia/Shanghai")
+# 集合竞价开始到收盘
+TRADING_SESSIONS = ((dtime(9, 15), dtime(11, 30)), (dtime(13, 0), dtime(15, 0)))
+
+
+def is_trading_time(now: float) -> bool:
+    """now 是否处于 A 股交易时段（不含法定节假日判断）"""
+    current = datetime.fromtimestamp(now, MARKET_TIMEZONE)
+    if current.weekday() >= 5:
+        return False
+    return any(start <= current.time() <= end for start, end in TRADING_SESSIONS)
+
+
+@dataclass(frozen=True)
+class SpotSnapshot:
+    """一次抓取的全市场行情以及 股票代码 -> 行号 的索引"""
+
+    frame: pd.DataFrame
+    fetched_at: float
+    rows: Dict[str, int]
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, fetched_at: float) -> "SpotSnapshot":
+        frame = frame.reset_index(drop=True)
+        rows = {str(code): row for row, code in enumerate(frame["代码"])}
+        return cls(frame, fetched_at, rows)
+
+    def lookup(self, stock_codes: Iterable[str]) -> pd.DataFrame:
+        """按传入顺序返回这些股票的行情，快照中没有的代码会被跳过"""
+        positions = [self.rows[code] for code in stock_codes if code in self.rows]
+        return self.frame.iloc[positions]
+
+    def as_of(self) -> str:
+        return datetime.fromtimestamp(self.fetched_at, MARKET_TIMEZONE).isoformat(timespec="seconds")
+
+
+class MarketSnapshot:
+    """持有最新行情快照并在后台定时刷新"""
+
+    def __init__(
+        self, interval: float = SPOT_REFRESH_INTERVAL, off_hours_interval: float = OFF_HOURS_REFRESH_INTERVAL
+    ):
+        self._interval = interval
+        self._off_hours_interval = off_hours_interval
+        self._snapshot: Optional[SpotSnapshot] = None
+        self._refresher: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def refresh_interval(self, now: float) -> float:
+        return self._interval if is_trading_time(now) else self._off_hours_interval
+
+    def snapshot(self) -> SpotSnapshot:
+        """返回当前快照，首次调用时同步抓取并启动后台刷新线程"""
+        self._start_refresher()
+        snapshot = self._snapshot
+        now = time.time()
+        if snapshot is None or now - snapshot.fetched_at > 2 * self.refresh_interval(now):
+            snapshot = self.refresh()
+        return snapshot
+
+    def refresh(self) -> SpotSnapshot:
+        """立即抓取新快照，并发调用只抓取一次"""
+        return self._flights.do(SPOT_ENDPOINT, self._fetch)
+
+    def _fetch(self) -> SpotSnapshot:
+        snapshot = SpotSnapshot.from_frame(ak_refresh(SPOT_ENDPOINT), time.time())
+        self._snapshot = snapshot
+        return snapshot
+
+    def _start_refresher(self):
+        if self._refresher is not None:
+            return
+        with self._lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._run, name="stock-spot-refresher", daemon=True)
+                self._refresher.start()
+
+    def _run(self):
+        while True:
+            snapshot = self._snapshot
+            now = time.time()
+            wait = 0 if snapshot is None else snapshot.fetched_at + self.refresh_interval(now) - now
+            if wait > 0:
+                # 最多等待一个交易时段的刷新间隔，开盘后能及时切换到交易时段的刷新频率
+                time.sleep(min(wait, self._interval))
+                continue
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"刷新 A 股行情快照失败: {e}")
+                time.sleep(self._interval)
+
+
+_market_snapshot = MarketSnapshot()
+
+
+def get_market_snapshot() -> MarketSnapshot:
+    """获取进程级行情快照"""
+    return _market_snapshot
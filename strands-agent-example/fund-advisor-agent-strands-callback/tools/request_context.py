@@ -0,0 +1,106 @@
+"""
+请求级数据上下文
+
+处理一次顶层查询时，投资组合经理会把问题分发给多个子 Agent（用户画像、组合配置、综合持仓分析等），
+它们各自调用工具读取同一个用户的身份信息、持仓以及同一批基金的数据。
+PortfolioManagerAgent.process_query 在 request_scope() 中运行，作用域内被 @request_memoized 修饰的函数
+对相同参数只执行一次，之后的调用直接返回第一次的结果；并发的相同调用同样只执行一次。
+
+作用域保存在 contextvars 中：asyncio 任务、asyncio.to_thread 以及 fan_out 提交到线程池的任务
+都会复制调用方的上下文，因此子 Agent 的工具调用也能看到同一个作用域。作用域之外的调用直接执行，不做记忆。
+作用域只在一次查询内有效，不会跨请求复用数据；写操作成功后应调用 clear_request_cache()。
+"""
+
+import contextvars
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+
+from tools.concurrency import SingleFlight
+
+
+class RequestContext:
+    """一次顶层查询内的记忆表"""
+
+    def __init__(self):
+        self._results: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """返回 key 已记住的结果，没有时执行 compute；抛出异常的调用不会被记住"""
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+
+        def load():
+            result = compute()
+            with self._lock:
+                self._results[key] = result
+            return result
+
+        return self._flights.do(key, load)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+
+_current: contextvars.ContextVar[Optional[RequestContext]] = contextvars.ContextVar(
+    "fund_advisor_request_context", default=None
+)
+
+
+def current_request_context() -> Optional[RequestContext]:
+    return _current.get()
+
+
+@contextmanager
+def request_scope() -> Iterator[RequestContext]:
+    """进入请求作用域；已经在作用域内时沿用外层的作用域"""
+    context = _current.get()
+    if context is not None:
+        yield context
+        return
+    context = RequestContext()
+    token = _current.set(context)
+    try:
+        yield context
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            # 异步生成器在另一个上下文中被关闭时无法 reset，只清除当前上下文中的作用域
+            _current.set(None)
+
+
+def clear_request_cache():
+    """清除当前作用域已记住的结果，写操作成功后调用，使同一请求内后续的读取能看到新数据"""
+    context = _current.get()
+    if context is not None:
+        context.clear()
+
+
+def request_memoized(func: Callable) -> Callable:
+    """装饰器：请求作用域内对相同参数只执行一次 func，参数不可哈希或不在作用域内时直接调用
+
+    返回值会被同一请求内的多个调用方共享，被装饰的函数应只用于只读查询。
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        context = _current.get()
+        if context is None:
+            return func(*args, **kwargs)
+        key = (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return func(*args, **kwargs)
+        return context.get_or_compute(key, lambda: func(*args, **kwargs))
+
+    return wrapper
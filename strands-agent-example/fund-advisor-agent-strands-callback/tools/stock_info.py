@@ -1,5 +1,60 @@
+import logging
+import re
+from typing import Optional, Tuple
+
 from strands import tool
-import akshare as ak
+from tools.ak_cache import ak_call
+from tools.concurrency import fan_out
+from tools.market_snapshot import get_market_snapshot
+from tools.result_encoder import encode_frame, encode_rows
+
+logger = logging.getLogger(__name__)
+
+# 接受 "600519"、"SH600519"、"sh.600519"、"600519.SH" 等写法
+_STOCK_CODE = re.compile(r"^(?:(?:SH|SZ|BJ)\.?)?(\d{6})(?:\.(?:SH|SZ|BJ|SS))?$", re.IGNORECASE)
+
+# 批量查询返回的行情列（stock_zh_a_spot_em）
+BATCH_SPOT_COLUMNS = [
+    "名称", "最新价", "涨跌幅", "成交额", "换手率", "市盈率-动态", "市净率", "总市值", "60日涨跌幅", "年初至今涨跌幅",
+]
+# 批量查询返回的公司概况字段（stock_individual_basic_info_xq 的 item -> 列名）
+BATCH_PROFILE_ITEMS = {
+    "affiliate_industry": "所属行业",
+    "provincial_name": "所在省份",
+    "main_operation_business": "主营业务",
+}
+# 批量查询最多接受的股票数
+BATCH_MAX_STOCKS = 50
+
+
+def normalize_stock_code(stock_code: str) -> Optional[Tuple[str, str]]:
+    """返回 (6 位代码, 雪球代码如 "SH600519")，无法识别时返回 None
+
+    交易所按代码段判断，不依赖传入的前缀：6/900 开头为上交所，0/2/3 开头为深交所，4/8/92 开头为北交所。
+    """
+    match = _STOCK_CODE.match(str(stock_code).strip())
+    if not match:
+        return None
+    code = match.group(1)
+    if code.startswith(("6", "900")):
+        exchange = "SH"
+    elif code.startswith(("0", "2", "3")):
+        exchange = "SZ"
+    else:
+        exchange = "BJ"
+    return code, f"{exchange}{code}"
+
+
+def _fetch_stock_profile(xq_symbol: str) -> dict:
+    """雪球公司概况中 BATCH_PROFILE_ITEMS 的字段"""
+    profile_df = ak_call("stock_individual_basic_info_xq", symbol=xq_symbol)
+    items = dict(zip(profile_df["item"], profile_df["value"]))
+    profile = {}
+    for item, column in BATCH_PROFILE_ITEMS.items():
+        value = items.get(item)
+        # 所属行业是 {"ind_code": ..., "ind_name": ...}
+        profile[column] = value.get("ind_name") if isinstance(value, dict) else value
+    return profile
 
 @tool
 def get_stock_info_by_code(stock_code: str) -> dict:
@@ -10,8 +65,10 @@ def get_stock_info_by_code(stock_code: str) -> dict:
         stock_details: the details of the stock in JSON format
     """
     try:
-        stock_individual_basic_info_xq_df = ak.stock_individual_basic_info_xq(symbol=stock_code)
-        return stock_individual_basic_info_xq_df.to_dict(orient='records')
+        normalized = normalize_stock_code(stock_code)
+        symbol = normalized[1] if normalized else stock_code
+        stock_individual_basic_info_xq_df = ak_call("stock_individual_basic_info_xq", symbol=symbol)
+        return encode_frame(stock_individual_basic_info_xq_df)
     except Exception as e:
         return {"error": str(e)}
 
@@ -24,8 +81,8 @@ def get_stock_news_by_code(stock_code: str) -> dict:
         stock_news: the news of the stock in JSON format
     """
     try:
-        stock_news_df = ak.stock_news_em(symbol="300059")
-        return stock_news_df[["新闻标题"]].head(20).to_dict(orient='records')
+        stock_news_df = ak_call("stock_news_em", symbol="300059")
+        return encode_frame(stock_news_df, columns=["新闻标题"], max_rows=20)
     except Exception:
         return {}
     
@@ -38,8 +95,72 @@ def get_stock_performance_by_code(stock_code: str) -> dict:
         stock_performance: the performance of the stock in JSON format
     """
     try:
-        stock_zh_a_spot_em_df = ak.stock_zh_a_spot_em()
-        stock_performance_df = stock_zh_a_spot_em_df[stock_zh_a_spot_em_df['代码'] == stock_code]
-        return stock_performance_df.to_dict(orient='records')
+        snapshot = get_market_snapshot().snapshot()
+        normalized = normalize_stock_code(stock_code)
+        stock_performance = encode_frame(snapshot.lookup([normalized[0] if normalized else stock_code]))
+        stock_performance["as_of"] = snapshot.as_of()
+        return stock_performance
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+@tool
+def get_stocks_by_codes(stock_codes: list) -> dict:
+    """Get quotes and company profiles for several stocks in one call, e.g. a fund's top 10 holdings.
+    Prefer this over calling get_stock_info_by_code / get_stock_performance_by_code once per stock.
+    Args:
+        stock_codes: list of stock codes (at most 50), with or without exchange prefix,
+            e.g. ["600519", "SZ000858", "300750.SZ"]
+    Returns:
+        stocks: a compact table {"columns": [...], "rows": [[...], ...]} with one row per stock
+            (latest quote, valuation, returns, industry and main business),
+            "as_of" giving the quote snapshot time, and "missing" listing codes that could not be recognized or found
+    """
+    try:
+        if len(stock_codes) > BATCH_MAX_STOCKS:
+            return {
+                "error": f"At most {BATCH_MAX_STOCKS} stock codes per call, got {len(stock_codes)}; "
+                "split the codes into several calls"
+            }
+        normalized = {}
+        unrecognized = []
+        for stock_code in stock_codes:
+            parsed = normalize_stock_code(stock_code)
+            if parsed is None:
+                unrecognized.append(str(stock_code))
+            else:
+                normalized.setdefault(parsed[0], parsed[1])
+        codes = list(normalized)
+
+        # 公司概况各自请求雪球，并发执行；ak_call 会缓存结果，已查询过的股票不会再次请求
+        profiles = fan_out({code: (lambda symbol=symbol: _fetch_stock_profile(symbol)) for code, symbol in normalized.items()})
+        for code, profile in profiles.items():
+            if isinstance(profile, Exception):
+                logger.warning(f"获取股票 {code} 公司概况失败: {profile}")
+
+        snapshot = get_market_snapshot().snapshot()
+        quotes = snapshot.lookup(codes)
+        spot_columns = [column for column in BATCH_SPOT_COLUMNS if column in quotes.columns]
+        quote_rows = dict(zip(quotes["代码"], quotes[spot_columns].itertuples(index=False, name=None)))
+
+        profile_columns = list(BATCH_PROFILE_ITEMS.values())
+        rows = []
+        for code in codes:
+            quote = quote_rows.get(code)
+            profile = profiles.get(code)
+            if isinstance(profile, Exception):
+                profile = None
+            if quote is None and profile is None:
+                continue
+            rows.append(
+                [code]
+                + list(quote if quote is not None else [None] * len(spot_columns))
+                + [(profile or {}).get(column) for column in profile_columns]
+            )
+
+        result = encode_rows(["代码"] + spot_columns + profile_columns, rows, max_tokens=4000)
+        found = {row[0] for row in rows}
+        result["as_of"] = snapshot.as_of()
+        result["missing"] = unrecognized + [code for code in codes if code not in found]
+        return result
+    except Exception as e:
+        return {"error": str(e)}
@@ -0,0 +1,177 @@
+"""
+DynamoDB 表注册表
+
+表的物理名称保存在 SSM Parameter Store 中（{kb_name}-{table_name}-table-name）。
+这里在进程内缓存解析结果并按 TTL 刷新，同时复用 boto3 客户端，
+使工具调用不再每次都创建客户端并请求 SSM。
+
+paginate 沿 LastEvaluatedKey 逐页读取 query / scan 的结果，单次响应最多 1 MB，
+只读第一页会静默截断大结果集；逐页产出也让调用方可以边读边汇总，内存占用只与页大小有关。
+"""
+
+import logging
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import boto3
+
+logger = logging.getLogger(__name__)
+
+kb_name = "fsi-fund-knowledge"
+
+# 表名缓存时间（秒），到期后重新从 SSM 读取，以便重新部署后能切换到新表
+TABLE_NAME_TTL = 300
+
+# batch_get_item 单次请求最多 100 个键；未处理的键最多重试的次数
+BATCH_GET_LIMIT = 100
+BATCH_GET_RETRIES = 5
+
+# 旧格式的参数名称（兼容性），只有列在这里的表会尝试回退
+LEGACY_PARAMETERS = {
+    "fund_basic_info": f"{kb_name}-table-name",
+}
+
+
+class TableRegistry:
+    """缓存表名解析结果并复用 boto3 客户端"""
+
+    def __init__(self, ttl: float = TABLE_NAME_TTL):
+        self._ttl = ttl
+        self._names: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self._ssm_client = None
+        # boto3 的 resource 对象不是线程安全的，每个线程各自持有一个
+        self._local = threading.local()
+
+    def _ssm(self):
+        # boto3 client 是线程安全的，整个进程共用一个
+        if self._ssm_client is None:
+            with self._lock:
+                if self._ssm_client is None:
+                    self._ssm_client = boto3.client("ssm")
+        return self._ssm_client
+
+    def _dynamodb(self):
+        resource = getattr(self._local, "dynamodb", None)
+        if resource is None:
+            resource = self._local.dynamodb = boto3.resource("dynamodb")
+        return resource
+
+    def _read_parameter(self, name: str) -> str:
+        response = self._ssm().get_parameter(Name=name, WithDecryption=False)
+        return response["Parameter"]["Value"]
+
+    def _resolve_name(self, table_name: str) -> str:
+        """从 SSM 解析物理表名，失败时按需回退到旧格式参数"""
+        try:
+            return self._read_parameter(f"{kb_name}-{table_name}-table-name")
+        except Exception as e:
+            legacy_parameter = LEGACY_PARAMETERS.get(table_name)
+            if legacy_parameter is None:
+                raise Exception(f"无法获取表 {table_name}: {str(e)}")
+            try:
+                physical_name = self._read_parameter(legacy_parameter)
+            except Exception as e:
+                raise Exception(f"无法获取表 {table_name}: {str(e)}")
+            logger.info(f"表 {table_name} 使用旧格式参数 {legacy_parameter}")
+            return physical_name
+
+    def table_name(self, table_name: str) -> str:
+        """返回物理表名，缓存未过期时不访问 SSM"""
+        cached = self._names.get(table_name)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        physical_name = self._resolve_name(table_name)
+        self._names[table_name] = (physical_name, time.monotonic() + self._ttl)
+        return physical_name
+
+    def table(self, table_name: str):
+        """返回 DynamoDB Table 资源"""
+        return self._dynamodb().Table(self.table_name(table_name))
+
+    def batch_get(self, table_name: str, keys: List[dict]) -> List[dict]:
+        """用 batch_get_item 批量读取完整主键对应的条目，未处理的键按指数退避重试"""
+        physical_name = self.table_name(table_name)
+        dynamodb = self._dynamodb()
+        items = []
+        for start in range(0, len(keys), BATCH_GET_LIMIT):
+            request = {physical_name: {"Keys": keys[start : start + BATCH_GET_LIMIT]}}
+            for attempt in range(BATCH_GET_RETRIES + 1):
+                response = dynamodb.batch_get_item(RequestItems=request)
+                items.extend(response["Responses"].get(physical_name, []))
+                request = response.get("UnprocessedKeys") or {}
+                if not request:
+                    break
+                if attempt < BATCH_GET_RETRIES:
+                    time.sleep(min(0.05 * 2 ** attempt, 1.0))
+            else:
+                unprocessed = len(request[physical_name]["Keys"])
+                logger.warning(f"表 {table_name} 有 {unprocessed} 个键在重试后仍未处理")
+        return items
+
+    def invalidate(self, table_name: Optional[str] = None):
+        """清除某个表（或全部表）的名称缓存"""
+        if table_name is None:
+            self._names.clear()
+        else:
+            self._names.pop(table_name, None)
+
+
+_registry = TableRegistry()
+
+
+def get_table(table_name):
+    """Helper function to get DynamoDB table
+    Args:
+        table_name: name of the table
+    Returns:
+        DynamoDB table resource
+    """
+    return _registry.table(table_name)
+
+
+def batch_get_items(table_name, keys):
+    """Helper function to read many items by full primary key
+    Args:
+        table_name: name of the table
+        keys: list of primary key dicts
+    Returns:
+        list of items that were found
+    """
+    return _registry.batch_get(table_name, keys)
+
+
+def to_native(value: Any) -> Any:
+    """把 DynamoDB 返回的 Decimal（包括嵌套在列表、字典中的）转换为 int 或 float"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, dict):
+        return {key: to_native(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_native(item) for item in value]
+    return value
+
+
+def paginate(
+    operation: Callable[..., dict], attributes: Optional[Sequence[str]] = None, **kwargs
+) -> Iterator[List[dict]]:
+    """逐页执行 table.query / table.scan，每次产出一页条目
+
+    attributes 为要读取的属性（ProjectionExpression），为 None 时读取完整条目。
+    属性名一律通过 ExpressionAttributeNames 引用，保留字（name、ttl 等）也能直接使用。
+    条目中的 Decimal 在这里一次转换为 int / float。
+    """
+    if attributes:
+        names = {f"#p{index}": attribute for index, attribute in enumerate(attributes)}
+        kwargs["ProjectionExpression"] = ", ".join(names)
+        kwargs["ExpressionAttributeNames"] = {**kwargs.get("ExpressionAttributeNames", {}), **names}
+    while True:
+        response = operation(**kwargs)
+        items = response.get("Items", [])
+        yield [to_native(item) for item in items]
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
@@ -6,7 +6,7 @@ import logging
 
 # 添加项目根目录到Python路径，以便导入其他模块
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from tools.fund_info import get_fund_fees_by_code, get_fund_manager_by_code
+from tools.fund_info import get_fund_fees_by_code, get_fund_manager_by_code, get_fund_peer_ranking
 
 logger = logging.getLogger(__name__)
 
@@ -64,10 +64,10 @@ def fees_analyst(query: str) -> str:
         2. 基金的申购费率和赎回费率结构
         3. 基金的销售服务费和其他费用
         4. 费用对基金长期收益的影响测算
-        5. 与同类基金的费率比较
+        5. 与同类基金的费率比较（使用同类排名工具获取费率在同类基金中的排名）
         
         你的分析应该帮助投资者理解基金费用结构，评估费用的合理性和对长期收益的影响。""",
-        tools=[get_fund_fees_by_code],
+        tools=[get_fund_fees_by_code, get_fund_peer_ranking],
         load_tools_from_directory=False
     )
     
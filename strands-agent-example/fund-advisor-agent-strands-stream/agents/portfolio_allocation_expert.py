@@ -8,6 +8,7 @@ import logging
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from agents.comprehensive_holdings_analyst import comprehensive_holdings_analyst
 from tools.user_info import get_user_comprehensive_info, get_user_holdings
+from tools.fund_info import get_funds_holding_stock, get_portfolio_risk_analysis, get_portfolio_stock_exposure
 
 logger = logging.getLogger(__name__)
 
@@ -32,8 +33,8 @@ def portfolio_allocation_expert(query: str) -> str:
         1. 用户风险偏好和投资期限
         2. 用户持仓基金的基本信息和表现
         3. 组合的整体收益和风险水平
-        4. 组合的资产配置和行业分布
-        5. 各基金之间的相关性和分散化效果
+        4. 组合的资产配置和行业分布（使用组合股票穿透工具，按用户持仓金额得到组合合计的个股敞口和集中度）
+        5. 各基金之间的相关性和分散化效果（使用组合风险分析工具，以各持仓的当前市值为权重，得到组合波动率、各基金的风险贡献、相关性、有效下注数和集中度，直接引用工具计算的数值）
         6. 各基金的真实盈利可能性和持仓表现
         7. 基于用户特点和市场环境的持有或调仓建议
         
@@ -71,7 +72,7 @@ def portfolio_allocation_expert(query: str) -> str:
            - 建议新增：[建议新增的基金类型或具体基金]
         7. 总结建议：[对用户投资组合的总体建议和优化方向]
         """,
-        tools=[get_user_comprehensive_info, get_user_holdings, comprehensive_holdings_analyst],
+        tools=[get_user_comprehensive_info, get_user_holdings, comprehensive_holdings_analyst, get_portfolio_stock_exposure, get_portfolio_risk_analysis, get_funds_holding_stock],
         load_tools_from_directory=False
     )
     
@@ -15,6 +15,7 @@ from agents.analysis_agents import manager_analyst, fees_analyst
 from agents.user_profile import user_profile_agent
 from agents.fund_selector import fund_selector_agent
 from strands_tools import mem0_memory, current_time, retrieve
+from tools.request_context import request_scope
 
 
 logger = logging.getLogger(__name__)
@@ -181,8 +182,10 @@ class PortfolioManagerAgent:
         """
         logger.info(f"处理用户查询: {query}")
         
-        # 调用投资组合管理Agent
-        response = self.agent(query)
+        # 同一次查询内，各子 Agent 对相同数据的读取只执行一次
+        with request_scope():
+            # 调用投资组合管理Agent
+            response = self.agent(query)
         return response.message
     
     async def process_query_stream(self, query: str) -> AsyncGenerator[Dict[str, Any], None]:
@@ -197,9 +200,11 @@ class PortfolioManagerAgent:
         """
         logger.info(f"异步处理用户查询: {query}")
         
-        # 使用stream_async方法获取异步迭代器
-        agent_stream = self.stream_agent.stream_async(query)
-        
-        # 返回异步迭代器
-        async for event in agent_stream:
-            yield event
+        # 同一次查询内，各子 Agent 对相同数据的读取只执行一次
+        with request_scope():
+            # 使用stream_async方法获取异步迭代器
+            agent_stream = self.stream_agent.stream_async(query)
+            
+            # 返回异步迭代器
+            async for event in agent_stream:
+                yield event
@@ -11,6 +11,7 @@ import asyncio
 from dotenv import load_dotenv
 
 from agents.portfolio_manager import PortfolioManagerAgent
+from tools.fund_info import start_fund_data_preload
 
 # 加载环境变量
 load_dotenv()
@@ -40,6 +41,9 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # 创建投资组合管理Agent
 portfolio_manager = PortfolioManagerAgent(load_tools_from_directory=False)
 
+# 后台预加载基金数据（基金目录、DuckDB 表和名称索引）
+start_fund_data_preload()
+
 class QueryRequest(BaseModel):
     """查询请求模型"""
     query: str
@@ -4,6 +4,7 @@ import sys
 import asyncio
 from dotenv import load_dotenv
 from agents.portfolio_manager import PortfolioManagerAgent
+from tools.fund_info import start_fund_data_preload
 
 # 加载环境变量
 load_dotenv()
@@ -49,6 +50,7 @@ async def main_async():
     try:
         # 创建投资组合管理Agent
         portfolio_manager = PortfolioManagerAgent(load_tools_from_directory=False)
+        start_fund_data_preload()
         
         # 启动交互循环
         print("\n" + "="*50)
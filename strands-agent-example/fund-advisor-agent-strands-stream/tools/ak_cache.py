@@ -0,0 +1,228 @@
+"""
+akshare 数据缓存
+
+所有 akshare 调用都通过 ak_call(endpoint, **kwargs) 发出，结果按 (接口名, 参数) 缓存。
+每个接口有自己的缓存策略：有效期（例如费率 7 天、季报披露期内的持仓 1 天、实时行情 30 秒）、
+过期后仍可返回旧数据的时间窗口（stale-while-revalidate，同时在后台刷新），
+以及按 LRU 淘汰的条目上限。返回的 DataFrame 被多个调用方共享，调用方不应原地修改。
+
+内存缓存之下还有一层磁盘缓存（见 tools/disk_cache.py），由同一机器或同一共享目录上的
+所有进程共用，新启动的 worker 可以直接读到其他进程已经抓取的数据。
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import akshare as ak
+
+from tools.concurrency import SingleFlight
+from tools.disk_cache import DiskCache, open_disk_cache
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+
+# 季报在季度结束后陆续披露，季度结束后这么多天内每天重新检查（与 tools/holdings_store.py 的 REPORT_SETTLE_DAYS 一致）
+QUARTERLY_DISCLOSURE_DAYS = 45
+
+
+def until_quarterly_recheck(now: float) -> float:
+    """季报类数据的过期时间戳
+
+    季度结束后的披露期内新的季报随时可能出现，缓存一天后重新检查；
+    披露期结束后数据在下一个季度结束前不会再变化，缓存到下一个自然季度开始。
+    """
+    current = datetime.fromtimestamp(now)
+    quarter_start = datetime(current.year, (current.month - 1) // 3 * 3 + 1, 1)
+    if current < quarter_start + timedelta(days=QUARTERLY_DISCLOSURE_DAYS):
+        return now + DAY
+    if quarter_start.month == 10:
+        return datetime(current.year + 1, 1, 1).timestamp()
+    return datetime(current.year, quarter_start.month + 3, 1).timestamp()
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """单个接口的缓存策略
+
+    ttl: 数据有效期（秒）
+    stale_ttl: 过期后仍可返回旧数据并在后台刷新的时间窗口（秒）
+    max_entries: 该接口最多缓存的参数组合数量，超出时淘汰最久未使用的条目
+    expires_at: 可选，根据当前时间计算过期时间戳，优先于 ttl
+    """
+
+    ttl: float
+    stale_ttl: float = 0
+    max_entries: int = 256
+    expires_at: Optional[Callable[[float], float]] = None
+
+    def expiry(self, now: float) -> float:
+        if self.expires_at is not None:
+            return self.expires_at(now)
+        return now + self.ttl
+
+
+DEFAULT_POLICY = CachePolicy(ttl=10 * MINUTE, stale_ttl=10 * MINUTE)
+
+POLICIES: Dict[str, CachePolicy] = {
+    # 基金
+    "fund_individual_basic_info_xq": CachePolicy(ttl=DAY, stale_ttl=DAY, max_entries=2048),
+    "fund_fee_em": CachePolicy(ttl=7 * DAY, stale_ttl=7 * DAY, max_entries=4096),
+    "fund_individual_detail_hold_xq": CachePolicy(ttl=0, stale_ttl=DAY, max_entries=2048, expires_at=until_quarterly_recheck),
+    "fund_portfolio_industry_allocation_em": CachePolicy(ttl=0, stale_ttl=DAY, max_entries=2048, expires_at=until_quarterly_recheck),
+    "fund_individual_achievement_xq": CachePolicy(ttl=DAY, stale_ttl=DAY, max_entries=2048),
+    "fund_individual_profit_probability_xq": CachePolicy(ttl=DAY, stale_ttl=DAY, max_entries=2048),
+    "fund_individual_analysis_xq": CachePolicy(ttl=DAY, stale_ttl=DAY, max_entries=2048),
+    # 全部开放式基金的最新净值，每个交易日晚间公布
+    "fund_open_fund_daily_em": CachePolicy(ttl=30 * MINUTE, stale_ttl=2 * HOUR, max_entries=1),
+    # 净值历史和股票持仓分别由 tools/nav_store.py、tools/holdings_store.py 持久化并决定何时重新抓取，
+    # 这里只需合并短时间内的重复请求
+    "fund_open_fund_info_em": CachePolicy(ttl=HOUR, max_entries=64),
+    "fund_portfolio_hold_em": CachePolicy(ttl=HOUR, max_entries=64),
+    # 股票
+    "stock_individual_basic_info_xq": CachePolicy(ttl=7 * DAY, stale_ttl=7 * DAY, max_entries=4096),
+    "stock_news_em": CachePolicy(ttl=15 * MINUTE, stale_ttl=15 * MINUTE, max_entries=1024),
+    "stock_zh_a_spot_em": CachePolicy(ttl=30, stale_ttl=60, max_entries=1),
+    # 基金持股明细随基金季报陆续披露而增加，每天重新检查一次
+    "stock_fund_stock_holder": CachePolicy(ttl=DAY, stale_ttl=DAY, max_entries=1024),
+    # 市场与宏观
+    "stock_market_activity_legu": CachePolicy(ttl=MINUTE, stale_ttl=MINUTE, max_entries=1),
+    "stock_zh_index_spot_em": CachePolicy(ttl=30, stale_ttl=60, max_entries=16),
+    "stock_zh_index_daily": CachePolicy(ttl=HOUR, max_entries=16),
+    "macro_china_lpr": CachePolicy(ttl=DAY, stale_ttl=7 * DAY, max_entries=1),
+    "macro_china_cpi": CachePolicy(ttl=DAY, stale_ttl=7 * DAY, max_entries=1),
+    "macro_china_ppi": CachePolicy(ttl=DAY, stale_ttl=7 * DAY, max_entries=1),
+}
+
+
+class TTLCache:
+    """按接口分区的 TTL + LRU 缓存，支持 stale-while-revalidate"""
+
+    def __init__(
+        self,
+        policies: Dict[str, CachePolicy] = POLICIES,
+        default_policy: CachePolicy = DEFAULT_POLICY,
+        disk: Optional[DiskCache] = None,
+    ):
+        self._policies = policies
+        self._default_policy = default_policy
+        self._disk = disk
+        # endpoint -> OrderedDict[key, (value, expires_at)]
+        self._partitions: Dict[str, "OrderedDict[Hashable, Tuple[Any, float]]"] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def policy(self, endpoint: str) -> CachePolicy:
+        return self._policies.get(endpoint, self._default_policy)
+
+    def get_or_fetch(self, endpoint: str, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        """返回缓存值；未命中时同步调用 fetch，已过期但在 stale 窗口内时返回旧值并后台刷新
+
+        查找顺序为内存、磁盘、上游接口，磁盘命中的数据会回填到内存。
+        多个线程同时未命中同一条目时只有一个线程调用 fetch，其余线程共享结果。
+        """
+        policy = self.policy(endpoint)
+        now = time.time()
+        with self._lock:
+            partition = self._partitions.setdefault(endpoint, OrderedDict())
+            entry = partition.get(key)
+            if entry is not None:
+                partition.move_to_end(key)
+                value, expires_at = entry
+                if now < expires_at:
+                    return value
+                if now < expires_at + policy.stale_ttl:
+                    self._schedule_refresh(endpoint, key, fetch)
+                    return value
+
+        if self._disk is not None:
+            stored = self._disk.get(endpoint, key)
+            if stored is not None:
+                value, fetched_at = stored
+                expires_at = policy.expiry(fetched_at)
+                if now < expires_at + policy.stale_ttl:
+                    self._store(endpoint, key, value, expires_at)
+                    if now >= expires_at:
+                        with self._lock:
+                            self._schedule_refresh(endpoint, key, fetch)
+                    return value
+
+        # 缓存未命中：并发的相同请求只向上游发出一次
+        def load():
+            value = fetch()
+            self.put(endpoint, key, value)
+            return value
+
+        return self._flights.do((endpoint, key), load)
+
+    def refresh(self, endpoint: str, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        """忽略缓存中的旧值，立即从上游抓取并写入缓存；并发的相同刷新只抓取一次"""
+
+        def load():
+            value = fetch()
+            self.put(endpoint, key, value)
+            return value
+
+        return self._flights.do((endpoint, key), load)
+
+    def put(self, endpoint: str, key: Hashable, value: Any):
+        """写入新抓取的数据（内存和磁盘）"""
+        self._store(endpoint, key, value, self.policy(endpoint).expiry(time.time()))
+        if self._disk is not None:
+            self._disk.put(endpoint, key, value)
+
+    def _store(self, endpoint: str, key: Hashable, value: Any, expires_at: float):
+        policy = self.policy(endpoint)
+        with self._lock:
+            partition = self._partitions.setdefault(endpoint, OrderedDict())
+            partition[key] = (value, expires_at)
+            partition.move_to_end(key)
+            while len(partition) > policy.max_entries:
+                partition.popitem(last=False)
+
+    def _schedule_refresh(self, endpoint: str, key: Hashable, fetch: Callable[[], Any]):
+        # 调用方需持有 self._lock；同一条目同时只有一个刷新线程
+        if (endpoint, key) in self._refreshing:
+            return
+        self._refreshing.add((endpoint, key))
+        threading.Thread(target=self._refresh, args=(endpoint, key, fetch), daemon=True).start()
+
+    def _refresh(self, endpoint: str, key: Hashable, fetch: Callable[[], Any]):
+        try:
+            self.put(endpoint, key, fetch())
+        except Exception as e:
+            logger.warning(f"后台刷新 {endpoint} 失败，继续使用旧数据: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard((endpoint, key))
+
+    def clear(self, endpoint: Optional[str] = None):
+        with self._lock:
+            if endpoint is None:
+                self._partitions.clear()
+            else:
+                self._partitions.pop(endpoint, None)
+
+
+_cache = TTLCache(disk=open_disk_cache(version=getattr(ak, "__version__", "unknown")))
+
+
+def ak_call(endpoint: str, **kwargs) -> Any:
+    """通过缓存调用 akshare 接口，例如 ak_call("fund_fee_em", symbol="000001", indicator="认购费率")"""
+    key = tuple(sorted(kwargs.items()))
+    return _cache.get_or_fetch(endpoint, key, lambda: getattr(ak, endpoint)(**kwargs))
+
+
+def ak_refresh(endpoint: str, **kwargs) -> Any:
+    """强制从上游重新抓取并更新缓存，供定时刷新的数据（例如实时行情快照）使用"""
+    key = tuple(sorted(kwargs.items()))
+    return _cache.refresh(endpoint, key, lambda: getattr(ak, endpoint)(**kwargs))
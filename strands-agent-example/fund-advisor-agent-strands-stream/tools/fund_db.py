@@ -0,0 +1,96 @@
+"""
+进程级 DuckDB 基金数据库
+
+每个进程只建立一个长期存在的 DuckDB 连接，启动时把基金目录等表注册一次，
+之后所有查询都通过固定的参数化语句执行，用户输入只作为参数传入，不会拼接进 SQL。
+DuckDB 的单个连接不能被多个线程同时使用，这里用游标池让并发的工具调用
+各自持有一个游标，而不是在默认连接上排队。
+"""
+
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+import duckdb
+
+from tools.fund_catalog import get_fund_catalog
+
+logger = logging.getLogger(__name__)
+
+# 游标池大小，超过该数量的并发查询会等待空闲游标
+CURSOR_POOL_SIZE = 8
+
+# 基金搜索：按代码/名称子串和基金类型过滤，按今年来收益降序排序，基金代码保证排序完全确定
+# row_id 对应基金目录中的行号，结果由目录统一转换为记录；total 为过滤后（分页前）的总数
+SEARCH_FUNDS_SQL = """
+    SELECT row_id, count(*) OVER () AS total
+    FROM fund_performance
+    WHERE ($query = '' OR contains(fund_code, $query) OR contains(fund_name, $query))
+      AND ($fund_type = '' OR contains(fund_type, $fund_type))
+    ORDER BY ytd_return DESC NULLS LAST, fund_code
+    LIMIT $limit OFFSET $offset
+"""
+
+
+class FundDatabase:
+    """持有长期连接、已注册的基金表和游标池"""
+
+    def __init__(self, pool_size: int = CURSOR_POOL_SIZE):
+        self._connection = duckdb.connect(database=":memory:")
+        self._register_tables()
+        self._pool: "queue.Queue[duckdb.DuckDBPyConnection]" = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(self._connection.cursor())
+
+    def _register_tables(self):
+        """把基金目录物化为 DuckDB 表，只在初始化时执行一次"""
+        catalog = get_fund_catalog()
+        self._connection.register("catalog_frame", catalog.frame.reset_index(names="row_id"))
+        self._connection.execute("CREATE TABLE fund_performance AS SELECT * FROM catalog_frame")
+        self._connection.unregister("catalog_frame")
+        logger.info("DuckDB 基金表注册完成")
+
+    @contextmanager
+    def cursor(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """从游标池借出一个游标，使用完毕后归还"""
+        cursor = self._pool.get()
+        try:
+            yield cursor
+        finally:
+            self._pool.put(cursor)
+
+    def search_funds(
+        self, query: str = "", fund_type: str = "", limit: int = 100, offset: int = 0
+    ) -> Tuple[List[int], int]:
+        """执行参数化的基金搜索，返回 (基金目录中的行号, 满足条件的基金总数)"""
+        params = {"query": query or "", "fund_type": fund_type or "", "limit": limit, "offset": offset}
+        with self.cursor() as cursor:
+            result = cursor.execute(SEARCH_FUNDS_SQL, params).fetchall()
+        if not result:
+            # 偏移超过结果数时窗口函数没有行可返回，总数单独统计
+            return [], self.count_funds(query, fund_type) if offset else 0
+        return [row[0] for row in result], result[0][1]
+
+    def count_funds(self, query: str = "", fund_type: str = "") -> int:
+        """满足搜索条件的基金总数"""
+        params = {"query": query or "", "fund_type": fund_type or "", "limit": 1, "offset": 0}
+        with self.cursor() as cursor:
+            result = cursor.execute(SEARCH_FUNDS_SQL, params).fetchall()
+        return result[0][1] if result else 0
+
+
+_database: Optional[FundDatabase] = None
+_database_lock = threading.Lock()
+
+
+def get_fund_database() -> FundDatabase:
+    """获取进程级基金数据库，首次调用时建立连接并注册表"""
+    global _database
+    if _database is None:
+        with _database_lock:
+            if _database is None:
+                _database = FundDatabase()
+    return _database
+
@@ -0,0 +1,193 @@
+"""
+本地净值历史库
+
+每只基金（以及用作基准的指数）的历史序列保存为一个 .npy 文件，内容是形状为 (2, n) 的 float64 数组：
+第 0 行是日期（距 1970-01-01 的天数），第 1 行是累计净值（指数为收盘点位），两行在文件中各自连续存放。
+读取时用 np.load(mmap_mode="r") 做内存映射，只有实际访问到的页会被读入，
+同一台机器上的多个 worker 进程共享操作系统的页缓存。
+
+序列从 akshare 抓取（基金: fund_open_fund_info_em 累计净值走势，指数: stock_zh_index_daily 收盘价），
+文件超过 NAV_REFRESH_INTERVAL 未更新时重新抓取并原子替换；抓取失败时继续使用旧文件。
+目录位于磁盘缓存根目录（FUND_ADVISOR_CACHE_DIR）下，磁盘缓存被禁用时序列只保存在内存中。
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tools.ak_cache import ak_call
+from tools.concurrency import SingleFlight
+from tools.disk_cache import DEFAULT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# 序列文件的有效期（秒），净值每个交易日晚间更新一次
+NAV_REFRESH_INTERVAL = 12 * 60 * 60
+
+# 用累计净值而不是单位净值：分红会让单位净值下跌，但不是投资者的亏损
+FUND_NAV_INDICATOR = "累计净值走势"
+
+
+@dataclass(frozen=True)
+class NavSeries:
+    """按日期升序排列的净值序列，values 可能是只读的内存映射视图"""
+
+    dates: np.ndarray  # datetime64[D]
+    values: np.ndarray  # float64
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def since(self, start: np.datetime64) -> "NavSeries":
+        """返回 start 当天及之后的部分（视图，不复制数据）"""
+        offset = int(np.searchsorted(self.dates, start))
+        return NavSeries(self.dates[offset:], self.values[offset:])
+
+
+def to_nav_array(dates, values) -> np.ndarray:
+    """把日期和数值整理为 (2, n) 的 float64 数组：去掉缺失值、按日期升序、同一天只保留最后一个值"""
+    dates = pd.to_datetime(pd.Series(dates), errors="coerce").to_numpy(dtype="datetime64[D]")
+    values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64)
+    valid = ~np.isnat(dates) & np.isfinite(values)
+    days = dates[valid].astype(np.int64)
+    values = values[valid]
+    order = np.argsort(days, kind="stable")
+    days, values = days[order], values[order]
+    # 同一日期有多条记录时保留最后一条
+    keep = np.append(days[1:] != days[:-1], True)
+    return np.ascontiguousarray(np.vstack([days[keep].astype(np.float64), values[keep]]))
+
+
+def fetch_fund_nav(fund_code: str) -> np.ndarray:
+    """从 akshare 抓取基金累计净值历史"""
+    frame = ak_call("fund_open_fund_info_em", symbol=fund_code, indicator=FUND_NAV_INDICATOR)
+    if frame.empty:
+        # 货币基金等没有净值走势的基金返回空表
+        return np.empty((2, 0))
+    return to_nav_array(frame["净值日期"], frame["累计净值"])
+
+
+def fetch_index_close(symbol: str) -> np.ndarray:
+    """从 akshare 抓取指数日线收盘价，symbol 形如 sh000300"""
+    frame = ak_call("stock_zh_index_daily", symbol=symbol)
+    return to_nav_array(frame["date"], frame["close"])
+
+
+class NavStore:
+    """以名称（fund:<基金代码> 或 index:<指数代码>）为键的净值序列库"""
+
+    def __init__(self, root: Optional[Path], refresh_interval: float = NAV_REFRESH_INTERVAL):
+        self.root = Path(root) if root is not None else None
+        if self.root is not None:
+            self.root.mkdir(parents=True, exist_ok=True)
+        self._refresh_interval = refresh_interval
+        # 名称 -> (序列, 数据写入时间)
+        self._series: Dict[str, Tuple[NavSeries, float]] = {}
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def fund(self, fund_code: str) -> NavSeries:
+        """基金累计净值序列"""
+        return self.get(f"fund:{fund_code}", lambda: fetch_fund_nav(fund_code))
+
+    def index(self, symbol: str) -> NavSeries:
+        """指数收盘点位序列"""
+        return self.get(f"index:{symbol}", lambda: fetch_index_close(symbol))
+
+    def get(self, name: str, fetch: Callable[[], np.ndarray]) -> NavSeries:
+        """返回序列；内存和磁盘上都没有未过期的数据时调用 fetch 抓取"""
+        now = time.time()
+        with self._lock:
+            cached = self._series.get(name)
+        if cached is not None and now - cached[1] < self._refresh_interval:
+            return cached[0]
+
+        stored = self._load(name)
+        if stored is not None and now - stored[1] < self._refresh_interval:
+            with self._lock:
+                self._series[name] = stored
+            return stored[0]
+
+        try:
+            return self._flights.do(name, lambda: self._fetch(name, fetch))
+        except Exception as e:
+            stale = stored or cached
+            if stale is None:
+                raise
+            logger.warning(f"更新净值序列 {name} 失败，继续使用旧数据: {e}")
+            return stale[0]
+
+    def _fetch(self, name: str, fetch: Callable[[], np.ndarray]) -> NavSeries:
+        array = fetch()
+        loaded = None
+        if self.root is not None and self._write(name, array):
+            loaded = self._load(name)
+        if loaded is None:
+            loaded = (self._to_series(array), time.time())
+        with self._lock:
+            self._series[name] = loaded
+        return loaded[0]
+
+    def _path(self, name: str) -> Path:
+        kind, key = name.split(":", 1)
+        return self.root / kind / f"{key}.npy"
+
+    @staticmethod
+    def _to_series(array: np.ndarray) -> NavSeries:
+        return NavSeries(array[0].astype(np.int64).astype("datetime64[D]"), array[1])
+
+    def _load(self, name: str) -> Optional[Tuple[NavSeries, float]]:
+        if self.root is None:
+            return None
+        path = self._path(name)
+        try:
+            written_at = path.stat().st_mtime
+            array = np.load(path, mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"读取净值序列 {path} 失败: {e}")
+            return None
+        return self._to_series(array), written_at
+
+    def _write(self, name: str, array: np.ndarray) -> bool:
+        path = self._path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=".npy")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, array)
+            # 已经映射旧文件的读方仍持有旧的 inode，不受替换影响
+            os.replace(temp_path, path)
+            return True
+        except Exception as e:
+            Path(temp_path).unlink(missing_ok=True)
+            logger.warning(f"写入净值序列 {path} 失败: {e}")
+            return False
+
+
+_store: Optional[NavStore] = None
+_store_lock = threading.Lock()
+
+
+def get_nav_store() -> NavStore:
+    """获取进程级净值历史库，目录不可用时只使用内存"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                root = os.environ.get("FUND_ADVISOR_CACHE_DIR", DEFAULT_CACHE_DIR)
+                try:
+                    _store = NavStore(Path(root) / "nav" if root else None)
+                except OSError as e:
+                    logger.warning(f"净值历史目录 {root} 不可用，仅使用内存: {e}")
+                    _store = NavStore(None)
+    return _store
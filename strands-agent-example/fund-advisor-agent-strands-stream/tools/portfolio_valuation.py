@@ -0,0 +1,176 @@
+"""
+持仓估值引擎
+
+把用户持仓与全部开放式基金的最新单位净值（见 tools/nav_quotes.py，随上游每日更新）按基金代码对齐，
+一次向量化计算所有持仓的成本、市值、盈亏、组合内权重和当日变动，nav_date 记录估值所用净值的日期。
+输入可以包含任意多个用户的持仓，不需要逐个用户、逐条持仓循环；按基金汇总同样只是一次 groupby，
+分批（例如分页读取）得到的汇总可以继续合并。
+
+取不到最新净值的基金（没有报价，或者抓取净值失败）：保留持仓记录中已有的 current_value 和 nav_date
+（没有 current_value 时按成本计），当日变动记为 0，并标记 priced 为 False。
+"""
+
+import logging
+from decimal import Decimal
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from tools.nav_quotes import NavQuotes, get_nav_quotes
+
+logger = logging.getLogger(__name__)
+
+# DynamoDB 持仓记录中的数值字段，读取时统一从 Decimal 转换为 float64
+HOLDING_NUMERIC_COLUMNS = ["holding_amount", "purchase_price", "current_value", "profit_loss"]
+
+# 按基金汇总时可以直接相加的列，lots 为该基金的持仓笔数
+FUND_SUM_COLUMNS = ["lots", "holding_amount", "cost", "current_value", "profit_loss", "daily_change"]
+
+# 按基金汇总时其余列的合并方式；分批汇总的结果再按同样的方式合并，结果与一次汇总相同
+FUND_OTHER_AGGREGATES = {
+    "fund_name": "first", "purchase_date": "min", "nav": "first", "daily_return": "first",
+    "nav_date": "max", "priced": "all",
+}
+
+# 按基金汇总后输出的列
+FUND_SUMMARY_COLUMNS = [
+    "fund_code", "fund_name", "lots", "holding_amount", "purchase_price", "purchase_date", "nav", "nav_date",
+    "daily_return", "cost", "current_value", "profit_loss", "profit_loss_pct", "daily_change", "percentage", "priced",
+]
+
+# 估值写回 DynamoDB 时保留的小数位数
+VALUE_DECIMALS = 4
+
+
+def to_decimal(value: float, digits: int = VALUE_DECIMALS) -> Decimal:
+    """DynamoDB 不接受 float，数值先四舍五入再转为 Decimal"""
+    return Decimal(str(round(float(value), digits)))
+
+
+def holdings_frame(items: Iterable[dict]) -> pd.DataFrame:
+    """把 DynamoDB 持仓记录转换为 DataFrame，数值字段转换为 float64，缺失为 NaN"""
+    frame = pd.DataFrame(list(items))
+    for name in ["user_id", "fund_code", "nav_date"]:
+        if name not in frame.columns:
+            frame[name] = pd.Series(dtype=object)
+    for name in HOLDING_NUMERIC_COLUMNS:
+        values = frame[name] if name in frame.columns else pd.Series(np.nan, index=frame.index)
+        frame[name] = pd.to_numeric(values, errors="coerce").astype(np.float64)
+    return frame
+
+
+def latest_quotes() -> NavQuotes:
+    """最新净值，抓取失败时返回空报价（所有持仓保留已有估值）"""
+    try:
+        return get_nav_quotes()
+    except Exception as e:
+        logger.warning(f"获取基金最新净值失败: {e}")
+        return NavQuotes.empty()
+
+
+def value_holdings(holdings: pd.DataFrame, quotes: Optional[NavQuotes] = None) -> pd.DataFrame:
+    """按最新净值为每条持仓估值
+
+    增加的列：nav、daily_return（%）、cost、current_value、profit_loss、profit_loss_pct（%）、
+    daily_change（当日市值变动）、weight（占该用户组合市值的 %）、priced（是否取到了最新净值），
+    nav_date 更新为所用净值的日期。
+    """
+    quotes = quotes if quotes is not None else latest_quotes()
+    valued = holdings.copy()
+    rows = quotes.rows_of(valued["fund_code"].astype(str))
+    priced = rows >= 0
+    # 末尾追加 NaN，找不到的基金（行号 -1）映射到它
+    nav = np.append(quotes.nav, np.nan)[rows]
+    daily_return = np.append(quotes.daily_return, np.nan)[rows]
+    nav_date = np.append(quotes.nav_date, None)[rows]
+    priced &= np.isfinite(nav)
+
+    shares = valued["holding_amount"].to_numpy(dtype=np.float64)
+    cost = shares * valued["purchase_price"].to_numpy(dtype=np.float64)
+    stored_value = valued["current_value"].to_numpy(dtype=np.float64)
+    current_value = np.where(priced, shares * nav, np.where(np.isfinite(stored_value), stored_value, cost))
+    # 当日涨跌幅为 r% 时，当日市值变动 = 今日市值 * r / (100 + r)
+    daily_change = np.where(priced & np.isfinite(daily_return), current_value * daily_return / (100 + daily_return), 0.0)
+
+    valued["nav"] = np.where(priced, nav, np.nan)
+    valued["daily_return"] = np.where(priced, daily_return, np.nan)
+    valued["cost"] = cost
+    valued["current_value"] = current_value
+    valued["profit_loss"] = current_value - cost
+    with np.errstate(divide="ignore", invalid="ignore"):
+        valued["profit_loss_pct"] = np.where(cost > 0, (current_value - cost) / cost * 100, np.nan)
+    valued["daily_change"] = daily_change
+    totals = valued.groupby("user_id", sort=False)["current_value"].transform("sum").to_numpy(dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        valued["weight"] = np.where(totals > 0, current_value / totals * 100, 0.0)
+    valued["nav_date"] = np.where(priced, nav_date, valued["nav_date"].to_numpy(dtype=object))
+    valued["priced"] = priced
+    return valued
+
+
+def summarize_by_fund(valued: pd.DataFrame) -> pd.DataFrame:
+    """按基金汇总估值结果（同一基金的多笔持仓合并为一行），索引为 fund_code"""
+    return _aggregate_funds(valued.assign(lots=1).groupby("fund_code", sort=False))
+
+
+def combine_fund_summaries(summaries: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """合并分批（例如分页读取）得到的按基金汇总，结果只随基金数量增长，与持仓笔数无关"""
+    return _aggregate_funds(pd.concat(list(summaries)).groupby(level=0, sort=False))
+
+
+def _aggregate_funds(grouped) -> pd.DataFrame:
+    columns = grouped.obj.columns
+    summary = grouped[FUND_SUM_COLUMNS].sum()
+    for name, how in FUND_OTHER_AGGREGATES.items():
+        if name in columns:
+            summary[name] = grouped[name].agg(how)
+    return summary
+
+
+def portfolio_totals(by_fund: pd.DataFrame) -> pd.Series:
+    """由按基金汇总的结果得到整个组合的合计和比率"""
+    summary = pd.DataFrame({
+        "holdings_count": [int(by_fund["lots"].sum())],
+        "total_cost": [by_fund["cost"].sum()],
+        "total_value": [by_fund["current_value"].sum()],
+        "total_profit_loss": [by_fund["profit_loss"].sum()],
+        "daily_change": [by_fund["daily_change"].sum()],
+        "as_of": [by_fund["nav_date"].max()],
+    })
+    return _with_ratios(summary).iloc[0]
+
+
+def fund_summary_rows(by_fund: pd.DataFrame, total_value: float) -> pd.DataFrame:
+    """按基金汇总的结果加上平均成本价、盈亏比例和占组合市值的比例，列为 FUND_SUMMARY_COLUMNS"""
+    funds = by_fund.reset_index()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        funds["purchase_price"] = np.where(funds["holding_amount"] > 0, funds["cost"] / funds["holding_amount"], np.nan)
+        funds["profit_loss_pct"] = np.where(funds["cost"] > 0, funds["profit_loss"] / funds["cost"] * 100, np.nan)
+    funds["percentage"] = funds["current_value"] / total_value * 100 if total_value > 0 else 0.0
+    return funds.reindex(columns=FUND_SUMMARY_COLUMNS)
+
+
+def _with_ratios(summary: pd.DataFrame) -> pd.DataFrame:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        summary["profit_loss_pct"] = np.where(
+            summary["total_cost"] > 0, summary["total_profit_loss"] / summary["total_cost"] * 100, np.nan
+        )
+        previous_value = summary["total_value"] - summary["daily_change"]
+        summary["daily_change_pct"] = np.where(previous_value > 0, summary["daily_change"] / previous_value * 100, np.nan)
+    return summary
+
+
+def value_new_holding(fund_code: str, holding_amount: float, purchase_price: float) -> dict:
+    """新增持仓时的 current_value、profit_loss 和 nav_date，取不到最新净值时按成本计，nav_date 为 None"""
+    valued = value_holdings(holdings_frame([{
+        "user_id": "",
+        "fund_code": fund_code,
+        "holding_amount": holding_amount,
+        "purchase_price": purchase_price,
+    }]))
+    return {
+        "current_value": float(valued["current_value"].iloc[0]),
+        "profit_loss": float(valued["profit_loss"].iloc[0]),
+        "nav_date": valued["nav_date"].iloc[0] if valued["priced"].iloc[0] else None,
+    }
@@ -8,7 +8,7 @@ import logging
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 logger = logging.getLogger(__name__)
-from tools.fund_info import get_fund_by_code, get_fund_performance_by_code, get_fund_individual_analysis_by_code
+from tools.fund_info import get_fund_by_code, get_fund_performance_by_code, get_fund_individual_analysis_by_code, get_fund_peer_ranking, get_fund_risk_metrics
 from utils.context_utils import get_current_callback_handler
 from utils.agent_utils import create_agent_with_parent_callback
 
@@ -45,8 +45,10 @@ def strategy_performance_expert(query: str) -> str:
         业绩分析：
         1. 基金在不同时间段（1月、3月、6月、1年、3年、5年）的收益表现
         2. 基金与业绩比较基准的对比
+           （使用同类排名工具获取基金在同类基金中各时间段收益的排名）
         3. 基金的波动性指标（标准差、最大回撤）
         4. 风险调整收益指标（夏普比率、信息比率、特雷诺比率）
+           （波动率、最大回撤和风险调整收益指标使用风险指标工具根据历史净值计算，不要自行估算）
         5. 基金在不同市场环境下的表现一致性
         
         你的分析应该客观、专业，并提供具体的数据支持。你需要综合评估基金的策略和业绩，判断基金的投资价值和风险。
@@ -69,7 +71,7 @@ def strategy_performance_expert(query: str) -> str:
         5. 投资建议：[适合投资/谨慎投资/不建议投资]
         6. 建议理由：[给出投资建议的具体理由]
         """,
-        tools=[get_fund_by_code, get_fund_performance_by_code, get_fund_individual_analysis_by_code],
+        tools=[get_fund_by_code, get_fund_performance_by_code, get_fund_individual_analysis_by_code, get_fund_peer_ranking, get_fund_risk_metrics],
         load_tools_from_directory=False
     )
     
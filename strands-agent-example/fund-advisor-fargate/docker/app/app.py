@@ -17,6 +17,7 @@ from pydantic import BaseModel
 # 添加项目根目录到Python路径，以便导入其他模块
 sys.path.append("/app")
 from agents.portfolio_manager import PortfolioManagerAgent
+from tools.fund_info import start_fund_data_preload
 from utils.callback_handlers import StreamingCallbackHandler, LoggingCallbackHandler, EventType
 from auth.session import (
     create_session, get_session, update_session, delete_session, 
@@ -79,6 +80,9 @@ composite_handler = CompositeCallbackHandler([logging_handler])
 # 设置线程本地存储的callback处理器
 set_current_callback_handler(composite_handler)
 
+# 后台预加载基金数据（基金目录、DuckDB 表和名称索引）
+start_fund_data_preload()
+
 # 会话管理
 session_managers = {}
 
@@ -1,5 +1,12 @@
 from strands import tool
-import akshare as ak
+from tools.ak_cache import ak_call
+from tools.macro_store import get_macro_store
+from tools.result_encoder import encode_frame
+
+# 指数行情只保留模型分析需要的列
+STOCK_INDEX_COLUMNS = ["代码", "名称", "最新价", "涨跌幅", "涨跌额", "成交额", "最高", "最低"]
+# 宏观序列返回的最近期数
+MACRO_RECENT_PERIODS = 24
 
 @tool
 def get_stock_market_activity() -> dict:
@@ -8,8 +15,8 @@ def get_stock_market_activity() -> dict:
         stock_market_activity: the stock market activity in JSON format
     """
     try:
-        stock_market_activity_legu_df = ak.stock_market_activity_legu()
-        return stock_market_activity_legu_df.to_dict(orient='records')
+        stock_market_activity_legu_df = ak_call("stock_market_activity_legu")
+        return encode_frame(stock_market_activity_legu_df)
     except Exception as e:
         return {"error": str(e)}
     
@@ -21,8 +28,8 @@ def get_stock_index() -> dict:
         stock_index: the stock index in JSON format
     """
     try:
-        stock_zh_index_spot_em_df = ak.stock_zh_index_spot_em(symbol="上证系列指数")
-        return stock_zh_index_spot_em_df.to_dict(orient='records')
+        stock_zh_index_spot_em_df = ak_call("stock_zh_index_spot_em", symbol="上证系列指数")
+        return encode_frame(stock_zh_index_spot_em_df, columns=STOCK_INDEX_COLUMNS, max_rows=50)
     except Exception as e:
         return {"error": str(e)}
     
@@ -30,11 +37,11 @@ def get_stock_index() -> dict:
 def get_macro_china_lpr() -> dict:
     """Get macro China LPR
     Returns:
-        macro_china_lpr: the macro China LPR in JSON format
+        macro_china_lpr: the latest LPR observations in JSON format, most recent first
     """
     try:
-        macro_china_lpr_df = ak.macro_china_lpr()
-        return macro_china_lpr_df.tail(24).to_dict(orient='records')
+        macro_china_lpr_df = get_macro_store().latest("macro_china_lpr", MACRO_RECENT_PERIODS)
+        return encode_frame(macro_china_lpr_df)
     except Exception as e:
         return {"error": str(e)}
     
@@ -42,11 +49,11 @@ def get_macro_china_lpr() -> dict:
 def get_macro_china_cpi() -> dict:
     """Get macro China CPI
     Returns:
-        macro_china_cpi: the macro China CPI in JSON format
+        macro_china_cpi: the latest CPI observations in JSON format, most recent first
     """
     try:
-        macro_china_cpi_df = ak.macro_china_cpi()
-        return macro_china_cpi_df.head(24).to_dict(orient='records')
+        macro_china_cpi_df = get_macro_store().latest("macro_china_cpi", MACRO_RECENT_PERIODS)
+        return encode_frame(macro_china_cpi_df)
     except Exception as e:
         return {"error": str(e)}
 
@@ -54,10 +61,10 @@ def get_macro_china_cpi() -> dict:
 def get_macro_china_ppi() -> dict:
     """Get macro China PPI
     Returns:
-        macro_china_ppi: the macro China PPI in JSON format
+        macro_china_ppi: the latest PPI observations in JSON format, most recent first
     """
     try:
-        macro_china_ppi_df = ak.macro_china_ppi()
-        return macro_china_ppi_df.tail(24).to_dict(orient='records')
+        macro_china_ppi_df = get_macro_store().latest("macro_china_ppi", MACRO_RECENT_PERIODS)
+        return encode_frame(macro_china_ppi_df)
     except Exception as e:
         return {"error": str(e)}
\ No newline at end of file
@@ -1,40 +1,100 @@
 from strands import tool
-import boto3
-from boto3.dynamodb.conditions import Key, Attr
-import akshare as ak
+from boto3.dynamodb.conditions import Key
+import functools
+import hashlib
+import logging
+import random
+import threading
+import time
+import numpy as np
+import pandas as pd
+from tools.ak_cache import ak_call
+from tools.concurrency import fan_out, single_flight
+from tools.fund_catalog import get_fund_catalog
+from tools.fund_db import get_fund_database
+from tools.fund_index import get_fund_index
+from tools.fund_screener import screen
+from tools.holdings_index import get_holdings_index
+from tools.holdings_store import get_holdings_store, latest_reported_quarter, parse_quarter, quarter_end, quarter_label
+from tools.nav_store import get_nav_store
+from tools import risk_metrics
+from tools.portfolio_risk import analyze, get_covariance_cache
+from tools.request_context import request_memoized
+from tools.result_encoder import encode_frame, encode_records, encode_rows, to_plain
+from tools.stock_info import normalize_stock_code
+from tools.table_registry import batch_get_items, get_table
 
-kb_name = "fsi-fund-knowledge"
+logger = logging.getLogger(__name__)
 
-def get_table(table_name):
-    """Helper function to get DynamoDB table
-    Args:
-        table_name: name of the table
-    Returns:
-        DynamoDB table resource
+# fund_basic_info 表上按基金名称查询的全局二级索引（见 prereqs/prereqs_config.yaml）
+FUND_NAME_INDEX = "fund_name-index"
+
+# 基金代码 → fund_basic_info 表排序键（fund_name）的映射，只记录从表中实际查到的键；
+# 表的分区键是 fund_code，未记录的代码按分区键查询（Limit=1），不从其他数据源推测排序键
+_fund_name_keys = {}
+
+# 基金筛选结果中始终包含的列，区间和排序用到的列会追加在后面
+SCREEN_RESULT_COLUMNS = [
+    "fund_code", "fund_name", "fund_type", "company", "manager_name", "nav", "fee",
+    "monthly_return", "yearly_return", "three_year_return", "ytd_return",
+]
+
+# 基金搜索每页的最大条数，以及分散模式下参与打散的候选数量
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_DIVERSIFY_POOL = 100
+
+# 风险指标的统计区间（自然日），None 表示成立以来
+RISK_PERIOD_DAYS = {"3m": 91, "6m": 182, "1y": 365, "2y": 730, "3y": 1095, "5y": 1826, "all": None}
+
+# 组合风险分析中返回的相关性最高的基金对数量
+RISK_CORRELATED_PAIRS = 10
+
+# 个股的基金持股明细（新浪财经），列出披露了该股票的全部基金，用于按股票反查基金
+STOCK_FUND_HOLDERS_ENDPOINT = "stock_fund_stock_holder"
+
+# 批量查询基金时返回的列，两个数据源的结果都整理为这些列，source 标明数据来自 akshare 还是 dynamodb
+BASIC_INFO_COLUMNS = [
+    "fund_code", "fund_name", "fund_type", "company", "manager", "inception_date", "latest_size", "benchmark", "source",
+]
+
+# 雪球基金基本信息的字段 → BASIC_INFO_COLUMNS 中的列，fund_basic_info 表的条目直接按列名读取
+XQ_BASIC_INFO_FIELDS = {
+    "基金代码": "fund_code", "基金名称": "fund_name", "基金类型": "fund_type", "基金公司": "company",
+    "基金经理": "manager", "成立时间": "inception_date", "最新规模": "latest_size", "业绩比较基准": "benchmark",
+}
+
+def _preload_fund_data():
+    """加载基金目录、DuckDB 表和名称索引"""
+    get_fund_database()
+    get_fund_index()
+
+_preload_thread = None
+_preload_lock = threading.Lock()
+
+def start_fund_data_preload():
+    """在后台预加载基金数据，由应用启动时调用，重复调用只启动一次
+
+    搜索、筛选和名称解析工具都直接查询内存中的数据；预加载完成前的调用会在第一次使用时同步加载。
+    预加载线程是守护线程，不会阻止进程退出。
     """
-    dynamodb = boto3.resource("dynamodb")
-    smm_client = boto3.client("ssm")
-    param_name = f"{kb_name}-{table_name}-table-name"
-    
-    try:
-        table_param = smm_client.get_parameter(
-            Name=param_name, WithDecryption=False
-        )
-        return dynamodb.Table(table_param["Parameter"]["Value"])
-    except Exception as e:
-        # 尝试旧格式的参数名称（兼容性）
-        if table_name == "fund_basic_info":
-            try:
-                table_param = smm_client.get_parameter(
-                    Name=f"{kb_name}-table-name", WithDecryption=False
-                )
-                return dynamodb.Table(table_param["Parameter"]["Value"])
-            except Exception as e:
-                raise Exception(f"无法获取表 {table_name}: {str(e)}")
-        else:
-            raise Exception(f"无法获取表 {table_name}: {str(e)}")
+    global _preload_thread
+    with _preload_lock:
+        if _preload_thread is None:
+            _preload_thread = threading.Thread(target=_preload_fund_data, name="fund-data-preload", daemon=True)
+            _preload_thread.start()
+
+def _query_fund_basic_info(table, fund_code):
+    """按分区键 fund_code 读取一只基金的 fund_basic_info 条目，并记录它的完整主键；没有时返回 None"""
+    response = table.query(KeyConditionExpression=Key("fund_code").eq(fund_code), Limit=1)
+    if not response["Items"]:
+        return None
+    item = response["Items"][0]
+    _fund_name_keys[fund_code] = item["fund_name"]
+    return item
 
 @tool
+@request_memoized
+@single_flight
 def get_fund_by_code(fund_code: str) -> dict:
     """Get fund details by fund code
     Args:
@@ -43,26 +103,25 @@ def get_fund_by_code(fund_code: str) -> dict:
         fund_details: the details of the fund in JSON format
     """
     try:
-        fund_individual_basic_info_xq_df = ak.fund_individual_basic_info_xq(symbol=fund_code)
-        return fund_individual_basic_info_xq_df.to_json(orient="records")
+        fund_individual_basic_info_xq_df = ak_call("fund_individual_basic_info_xq", symbol=fund_code)
+        return encode_frame(fund_individual_basic_info_xq_df)
     except Exception:
         pass
     try:
         table = get_table("fund_basic_info")
-        
-        # Query using the primary key (fund_code)
-        response = table.query(
-            KeyConditionExpression=Key("fund_code").eq(fund_code)
-        )
-        
-        if response["Items"]:
-            return response["Items"]
+
+        # Query using the partition key (fund_code)
+        item = _query_fund_basic_info(table, fund_code)
+        if item is not None:
+            return [item]
         else:
             return f"No fund found with code {fund_code}"
     except Exception as e:
         return str(e)
 
 @tool
+@request_memoized
+@single_flight
 def get_fund_by_name(fund_name: str) -> dict:
     """Get fund details by fund name
     Args:
@@ -72,11 +131,18 @@ def get_fund_by_name(fund_name: str) -> dict:
     """
     try:
         table = get_table("fund_basic_info")
-        
-        # Scan the table and filter by fund_name
-        # Note: This is less efficient than querying by primary key
-        response = table.scan(
-            FilterExpression=Attr("fund_name").eq(fund_name)
+
+        # 本地名称索引能解析出基金代码时，直接按分区键查询
+        fund_code = get_fund_index().code_of(fund_name)
+        if fund_code:
+            item = _query_fund_basic_info(table, fund_code)
+            if item is not None:
+                return [item]
+
+        # Query the fund_name global secondary index
+        response = table.query(
+            IndexName=FUND_NAME_INDEX,
+            KeyConditionExpression=Key("fund_name").eq(fund_name)
         )
         
         if response["Items"]:
@@ -98,8 +164,8 @@ def get_fund_details(fund_code: str = None, fund_name: str = None) -> dict:
     if not fund_code and not fund_name:
         return "Either fund_code or fund_name must be provided"
     try:
-        fund_individual_basic_info_xq_df = ak.fund_individual_basic_info_xq(symbol=fund_code)
-        return fund_individual_basic_info_xq_df.to_json(orient="records")
+        fund_individual_basic_info_xq_df = ak_call("fund_individual_basic_info_xq", symbol=fund_code)
+        return encode_frame(fund_individual_basic_info_xq_df)
     except Exception:
         pass
     try:
@@ -127,6 +193,81 @@ def get_fund_details(fund_code: str = None, fund_name: str = None) -> dict:
         return str(e)
 
 @tool
+def get_funds_by_codes(fund_codes: list) -> dict:
+    """Get basic details for several funds in one call, e.g. to compare candidate funds
+    Args:
+        fund_codes: list of fund codes, e.g. ["000001", "110011"]
+    Returns:
+        funds: a compact table {"columns": [...], "rows": [[...], ...]} with one row per fund found and the same
+        columns for every fund (source tells whether the row came from akshare or the fund_basic_info table),
+        plus "missing" listing the codes that could not be found
+    """
+    try:
+        fund_codes = list(dict.fromkeys(str(code).strip() for code in fund_codes if str(code).strip()))
+
+        # 与 get_fund_by_code 相同，先并发请求 akshare
+        records = {}
+        fetched = fan_out({code: (lambda code=code: _fetch_fund_basic_info(code)) for code in fund_codes})
+        for code, record in fetched.items():
+            if record and not isinstance(record, Exception):
+                records[code] = record
+
+        # akshare 没有返回的基金再读 fund_basic_info 表
+        missing = [code for code in fund_codes if code not in records]
+        if missing:
+            for code, item in _read_fund_basic_info(missing).items():
+                record = {column: item.get(column) for column in BASIC_INFO_COLUMNS}
+                record["source"] = "dynamodb"
+                records[code] = record
+
+        result = encode_records(
+            [records[code] for code in fund_codes if code in records], columns=BASIC_INFO_COLUMNS, max_tokens=4000
+        )
+        result["missing"] = [code for code in fund_codes if code not in records]
+        return result
+    except Exception as e:
+        return {"error": str(e)}
+
+def _fetch_fund_basic_info(fund_code):
+    """Fetch one fund's basic info from akshare as a BASIC_INFO_COLUMNS dict, or None on failure"""
+    try:
+        fund_info_df = ak_call("fund_individual_basic_info_xq", symbol=fund_code)
+        record = dict.fromkeys(BASIC_INFO_COLUMNS)
+        for item, value in zip(fund_info_df["item"], fund_info_df["value"]):
+            if item in XQ_BASIC_INFO_FIELDS:
+                record[XQ_BASIC_INFO_FIELDS[item]] = value
+        record["fund_code"] = fund_code
+        record["source"] = "akshare"
+        return record
+    except Exception:
+        return None
+
+def _read_fund_basic_info(fund_codes):
+    """从 fund_basic_info 表读取多只基金，返回 {基金代码: 条目}
+
+    已经查到过完整主键的基金一次 batch_get_item 读取，其余基金按分区键并发查询。
+    """
+    table = get_table("fund_basic_info")
+    items = {}
+    keys = [{"fund_code": code, "fund_name": _fund_name_keys[code]} for code in fund_codes if code in _fund_name_keys]
+    if keys:
+        try:
+            for item in batch_get_items("fund_basic_info", keys):
+                items[item["fund_code"]] = item
+        except Exception as e:
+            logger.warning(f"批量读取 fund_basic_info 失败: {e}")
+    remaining = [code for code in fund_codes if code not in items]
+    queried = fan_out({code: (lambda code=code: _query_fund_basic_info(table, code)) for code in remaining})
+    for code, item in queried.items():
+        if isinstance(item, Exception):
+            logger.warning(f"查询 fund_basic_info 中的基金 {code} 失败: {item}")
+        elif item is not None:
+            items[code] = item
+    return items
+
+@tool
+@request_memoized
+@single_flight
 def get_fund_manager_by_code(fund_code: str) -> dict:
     """Get fund manager information by fund code
     Args:
@@ -137,9 +278,9 @@ def get_fund_manager_by_code(fund_code: str) -> dict:
     try:
         table = get_table("fund_manager_info")
         
-        # Scan the table and filter by fund_code (since fund_code is the sort key)
-        response = table.scan(
-            FilterExpression=Attr("fund_code").eq(fund_code)
+        # Query using the partition key (fund_code)
+        response = table.query(
+            KeyConditionExpression=Key("fund_code").eq(fund_code)
         )
         
         if response["Items"]:
@@ -150,6 +291,7 @@ def get_fund_manager_by_code(fund_code: str) -> dict:
         return str(e)
 
 @tool
+@request_memoized
 def get_fund_fees_by_code(fund_code: str) -> dict:
     """Get fund fee structure by fund code
     Args:
@@ -158,9 +300,13 @@ def get_fund_fees_by_code(fund_code: str) -> dict:
         fee_details: the fee structure of the fund in JSON format
     """
     try:
-        fund_fee_em_df_1 = ak.fund_fee_em(symbol=fund_code, indicator="认购费率")
-        fund_fee_em_df_2 = ak.fund_fee_em(symbol=fund_code, indicator="赎回费率")
-        return {"认购费率":fund_fee_em_df_1.to_string(), "赎回费率":fund_fee_em_df_2.to_string()}
+        # 认购费率和赎回费率并发获取
+        fees = fan_out({
+            indicator: (lambda indicator=indicator: ak_call("fund_fee_em", symbol=fund_code, indicator=indicator))
+            for indicator in ("认购费率", "赎回费率")
+        })
+        if not any(isinstance(fee_df, Exception) for fee_df in fees.values()):
+            return {indicator: encode_frame(fee_df, max_tokens=800) for indicator, fee_df in fees.items()}
     except Exception:
         pass
     try:
@@ -179,6 +325,8 @@ def get_fund_fees_by_code(fund_code: str) -> dict:
         return str(e)
 
 @tool
+@request_memoized
+@single_flight
 def get_fund_performance_by_code(fund_code: str, report_date: str = None) -> dict:
     """Get fund holdings by fund code and optionally by report date
     Args:
@@ -198,8 +346,8 @@ def get_fund_performance_by_code(fund_code: str, report_date: str = None) -> dic
             if "Item" in response:
                 return response["Item"]
             else:
-                fund_individual_achievement_xq_df = ak.fund_individual_achievement_xq(symbol=fund_code)
-                return fund_individual_achievement_xq_df.to_dict(orient='records')
+                fund_individual_achievement_xq_df = ak_call("fund_individual_achievement_xq", symbol=fund_code)
+                return encode_frame(fund_individual_achievement_xq_df, max_rows=30)
         else:
             # If only fund_code is provided, query all holdings for this fund
             response = table.query(
@@ -209,30 +357,250 @@ def get_fund_performance_by_code(fund_code: str, report_date: str = None) -> dic
             if response["Items"]:
                 return response["Items"]
             else:
-                fund_individual_achievement_xq_df = ak.fund_individual_achievement_xq(symbol=fund_code)
-                return fund_individual_achievement_xq_df.to_dict(orient='records')
+                fund_individual_achievement_xq_df = ak_call("fund_individual_achievement_xq", symbol=fund_code)
+                return encode_frame(fund_individual_achievement_xq_df, max_rows=30)
     except Exception as e:
         return str(e)
     
 
 @tool
+@request_memoized
 def get_fund_holdings_by_code(fund_code: str, report_date: str = None) -> dict:
     """Get fund holdings by fund code and optionally by report date
     Args:
         fund_code: the code of the fund
-        report_date: the report date of the holdings (optional)
+        report_date: the report quarter of the holdings, e.g. '2025Q1' or '2025-03-31' (optional,
+            defaults to the latest disclosed quarter)
     Returns:
-        holdings_details: the holdings of the fund in JSON format
+        holdings_details: the report quarter and the stock holdings of the fund (weight in % of
+        NAV, shares in 10k shares, market_value in 10k CNY)
     """
+    quarter = parse_quarter(report_date) if report_date else None
+    if report_date and quarter is None:
+        return {"error": f"Unrecognized report date {report_date}, expected e.g. '2025Q1' or '2025-03-31'"}
     try:
-        fund_portfolio_hold_em_df = ak.fund_portfolio_hold_em(symbol=fund_code, date="2025")
-        return fund_portfolio_hold_em_df[fund_portfolio_hold_em_df['季度'] == '2025年1季度股票投资明细'].head(10).to_dict(orient='records')
-    except Exception:
-        if not report_date:
-            report_date = "2025-05-25"
-        fund_individual_detail_hold_xq_df = ak.fund_individual_detail_hold_xq(symbol=fund_code, date=report_date)
-        return fund_individual_detail_hold_xq_df.to_dict(orient='records')
-    
+        resolved, holdings = get_holdings_store().holdings(fund_code, quarter)
+        if not holdings.empty:
+            return {
+                "fund_code": fund_code,
+                "quarter": quarter_label(resolved),
+                "holdings": encode_frame(holdings.drop(columns=["quarter"]), max_rows=10),
+            }
+    except Exception as e:
+        logger.warning(f"获取基金 {fund_code} 股票持仓失败: {e}")
+    # 没有股票持仓明细时（例如债券基金）返回雪球的资产配置
+    fallback_quarter = quarter if quarter is not None else latest_reported_quarter(time.time())
+    fund_individual_detail_hold_xq_df = ak_call(
+        "fund_individual_detail_hold_xq", symbol=fund_code, date=quarter_end(fallback_quarter).strftime("%Y%m%d")
+    )
+    return encode_frame(fund_individual_detail_hold_xq_df, max_rows=20)
+
+@tool
+def get_funds_holding_stock(stock_code: str, limit: int = 20) -> dict:
+    """Find the funds that hold a stock, as of the latest report date disclosing it
+    Args:
+        stock_code: the code of the stock; A-share codes may carry an exchange prefix or suffix
+            (e.g., '600519', 'SH600519', '600519.SH'), Hong Kong codes are 5 digits (e.g., '00700')
+        limit: maximum number of funds to return (default 20)
+    Returns:
+        holding_funds: funds holding the stock, largest position first (weight in % of fund NAV).
+        coverage is "all_funds" for A-shares, taken from the full list of fund holders disclosed for the stock;
+        for other markets, or when that list is unavailable, it is "loaded_funds" and the result only covers
+        funds whose holdings were already looked up in this process (indexed_funds of them)
+    """
+    try:
+        parsed = normalize_stock_code(stock_code)
+        if parsed is None:
+            # 基金持股明细只覆盖 A 股，其他代码（例如港股）只能在已加载的基金持仓中查找
+            return _funds_holding_stock_loaded(str(stock_code).strip(), limit)
+        stock_code = parsed[0]
+        try:
+            holders = ak_call(STOCK_FUND_HOLDERS_ENDPOINT, symbol=stock_code)
+        except Exception as e:
+            logger.warning(f"获取股票 {stock_code} 基金持股明细失败，改为查询已加载的基金持仓: {e}")
+            return _funds_holding_stock_loaded(stock_code, limit)
+
+        columns = ["fund_code", "fund_name", "weight", "shares", "market_value"]
+        report_dates = pd.to_datetime(holders["截止日期"], errors="coerce") if not holders.empty else None
+        if report_dates is None or report_dates.isna().all():
+            return {"stock_code": stock_code, "coverage": "all_funds", "report_date": None,
+                    "funds": encode_rows(columns, [], total_rows=0)}
+        report_date = report_dates.max()
+        latest = holders[report_dates == report_date].sort_values("占净值比例", ascending=False, kind="stable")
+        rows = list(zip(
+            latest["基金代码"].astype(str).str.zfill(6),
+            latest["基金名称"],
+            latest["占净值比例"],
+            latest["持仓数量"],
+            latest["持股市值"],
+        ))
+        return {
+            "stock_code": stock_code,
+            "coverage": "all_funds",
+            "report_date": report_date.strftime("%Y-%m-%d"),
+            "funds": encode_rows(columns, rows[:limit], total_rows=len(rows)),
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+def _funds_holding_stock_loaded(stock_code, limit):
+    """在持仓穿透索引中查找持有股票的基金，只覆盖本进程已加载持仓的基金"""
+    index = get_holdings_index()
+    holders = index.funds_holding(stock_code)
+    catalog = get_fund_catalog()
+    rows = []
+    for fund_code, weight, quarter in holders[:limit]:
+        row = catalog.row_of(fund_code)
+        fund_name = catalog.columns["fund_name"][row] if row is not None else None
+        rows.append((fund_code, fund_name, weight, quarter))
+    return {
+        "stock_code": stock_code,
+        "coverage": "loaded_funds",
+        "indexed_funds": index.shape[0],
+        "funds": encode_rows(["fund_code", "fund_name", "weight", "quarter"], rows, total_rows=len(holders)),
+    }
+
+def _portfolio_weights(fund_weights):
+    """{基金代码: 金额或权重} -> 合计为 1 的权重；有负数或非有限值、或者没有正数金额时返回 None
+
+    组合只做多，负数权重（做空）会让风险贡献和穿透敞口失去意义，因此直接拒绝。
+    """
+    weights = {str(code): float(value) for code, value in fund_weights.items()}
+    if any(not np.isfinite(value) or value < 0 for value in weights.values()):
+        return None
+    total = sum(weights.values())
+    if total <= 0:
+        return None
+    return {code: value / total for code, value in weights.items()}
+
+@tool
+def get_portfolio_stock_exposure(fund_weights: dict, limit: int = 20) -> dict:
+    """Look through a fund portfolio to the stocks it is exposed to, aggregated across all funds
+    Args:
+        fund_weights: the portfolio as {fund_code: amount or weight}, e.g. {"000001": 50000, "110011": 30000};
+            values are normalized to portfolio weights
+        limit: maximum number of stocks to return (default 20)
+    Returns:
+        stock_exposure: stocks by exposure in % of the whole portfolio, with the number of portfolio
+        funds holding each; funds_without_stock_holdings lists funds with no disclosed stock holdings
+    """
+    try:
+        weights = _portfolio_weights(fund_weights)
+        if weights is None:
+            return {"error": "fund_weights must be non-negative amounts with a positive total"}
+
+        # 组合中的基金并发加载持仓，已入库的基金直接返回
+        store = get_holdings_store()
+        loaded = fan_out({code: (lambda code=code: store.holdings(code)) for code in weights})
+        for code, result in loaded.items():
+            if isinstance(result, Exception):
+                logger.warning(f"获取基金 {code} 股票持仓失败: {result}")
+
+        index = get_holdings_index()
+        exposure, fund_counts = index.exposure(weights)
+        order = np.argsort(-exposure, kind="stable")[: int(np.count_nonzero(exposure))]
+        rows = [
+            (index.stock_codes[column], index.stock_names[column], exposure[column] * 100, fund_counts[column])
+            for column in order[:limit]
+        ]
+        return {
+            "total_stock_exposure": to_plain(exposure.sum() * 100),
+            "funds_without_stock_holdings": [code for code in weights if store.latest_quarter(code) is None],
+            "exposure": encode_rows(["stock_code", "stock_name", "exposure", "fund_count"], rows, total_rows=len(order)),
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+@tool
+def get_portfolio_risk_analysis(fund_weights: dict, period: str = "1y") -> dict:
+    """Quantify the risk of a fund portfolio from the funds' aligned NAV history: volatility,
+    per-fund risk contribution, correlation and diversification
+    Args:
+        fund_weights: the portfolio as {fund_code: amount or weight}, e.g. {"000001": 50000, "110011": 30000};
+            values are normalized to portfolio weights (for a user's portfolio pass each holding's current_value)
+        period: lookback period, one of '3m', '6m', '1y', '2y', '3y', '5y', 'all' (default '1y'); only dates
+            on which every fund has a NAV are used
+    Returns:
+        portfolio: annualized volatility and historical return, diversification ratio (weighted fund
+        volatility / portfolio volatility), effective_bets (1 to number of funds, higher is more diversified),
+        HHI of weights and effective number of funds;
+        funds: per fund weight, annualized volatility and return, marginal risk, risk contribution (sums to
+        the portfolio volatility) and risk_share (sums to 100), all in %;
+        most_correlated: the most correlated fund pairs; funds_without_history lists funds left out
+        (e.g. money market funds) and covered_weight the % of the portfolio that was analyzed
+    """
+    try:
+        if period not in RISK_PERIOD_DAYS:
+            return {"error": f"Unsupported period {period}, expected one of {', '.join(RISK_PERIOD_DAYS)}"}
+        weights = _portfolio_weights(fund_weights)
+        if weights is None:
+            return {"error": "fund_weights must be non-negative amounts with a positive total"}
+
+        # 组合中的基金并发加载净值历史，已入库的基金直接返回
+        store = get_nav_store()
+        loaded = fan_out({code: (lambda code=code: store.fund(code)) for code in weights})
+        series, without_history = {}, []
+        for code, result in loaded.items():
+            if isinstance(result, Exception):
+                logger.warning(f"获取基金 {code} 净值历史失败: {result}")
+            if isinstance(result, Exception) or len(result) < 2:
+                without_history.append(code)
+            else:
+                series[code] = result
+        if not series:
+            return {"error": "None of the funds has NAV history", "funds_without_history": without_history}
+
+        estimate = get_covariance_cache().estimate(series, RISK_PERIOD_DAYS[period])
+        covered = np.array([weights[code] for code in estimate.fund_codes])
+        risk = analyze(estimate, covered / covered.sum())
+
+        catalog = get_fund_catalog()
+        names = [catalog.columns["fund_name"][row] if row >= 0 else None for row in catalog.rows_of(estimate.fund_codes)]
+        order = np.argsort(-risk.risk_contribution, kind="stable")
+        funds = [
+            (
+                estimate.fund_codes[i], names[i], risk.weights[i] * 100, estimate.volatility[i] * 100,
+                estimate.mean_returns[i] * 100, risk.marginal_risk[i] * 100, risk.risk_contribution[i] * 100,
+                risk.risk_share[i] * 100,
+            )
+            for i in order
+        ]
+        correlation = estimate.correlation()
+        upper, lower = np.triu_indices(len(estimate.fund_codes), k=1)
+        pairs = np.argsort(-correlation[upper, lower], kind="stable")[:RISK_CORRELATED_PAIRS]
+        most_correlated = [
+            (estimate.fund_codes[upper[i]], estimate.fund_codes[lower[i]], correlation[upper[i], lower[i]])
+            for i in pairs
+        ]
+
+        with np.errstate(divide="ignore"):
+            portfolio = {
+                "annualized_volatility": risk.volatility * 100,
+                "annualized_return": risk.expected_return * 100,
+                "diversification_ratio": risk.diversification_ratio,
+                "effective_bets": risk.effective_bets,
+                "herfindahl_index": risk.herfindahl,
+                "effective_number_of_funds": 1 / risk.herfindahl,
+                "max_weight": risk.weights.max() * 100,
+            }
+        return {
+            "period": period,
+            "start_date": str(estimate.start_date),
+            "end_date": str(estimate.end_date),
+            "observations": estimate.observations,
+            "covered_weight": to_plain(covered.sum() * 100),
+            "funds_without_history": without_history,
+            "portfolio": {key: to_plain(value) for key, value in portfolio.items()},
+            "funds": encode_rows(
+                ["fund_code", "fund_name", "weight", "volatility", "annualized_return", "marginal_risk",
+                 "risk_contribution", "risk_share"],
+                funds,
+                max_tokens=None,
+            ),
+            "most_correlated": encode_rows(["fund_code", "other_fund_code", "correlation"], most_correlated),
+        }
+    except Exception as e:
+        return {"error": str(e)}
 
 @tool
 def get_fund_profit_probability_by_code(fund_code: str) -> dict:
@@ -244,8 +612,8 @@ def get_fund_profit_probability_by_code(fund_code: str) -> dict:
         profit_probability_details: the profit probability of the fund in JSON format
     """
     try:
-        fund_individual_profit_probability_xq_df = ak.fund_individual_profit_probability_xq(symbol=fund_code)
-        return fund_individual_profit_probability_xq_df.to_dict(orient='records')
+        fund_individual_profit_probability_xq_df = ak_call("fund_individual_profit_probability_xq", symbol=fund_code)
+        return encode_frame(fund_individual_profit_probability_xq_df)
     except Exception:
         return {}
     
@@ -258,8 +626,8 @@ def get_fund_industry_by_code(fund_code: str) -> dict:
         industry_allocation: the industry allocation of the fund in JSON format
     """
     try:
-        fund_industry_allocation_df  = ak.fund_portfolio_industry_allocation_em(symbol=fund_code, date="2025")
-        return fund_industry_allocation_df.head(5).to_dict(orient='records')
+        fund_industry_allocation_df  = ak_call("fund_portfolio_industry_allocation_em", symbol=fund_code, date="2025")
+        return encode_frame(fund_industry_allocation_df, max_rows=5)
     except Exception:
         return {}
     
@@ -272,70 +640,233 @@ def get_fund_individual_analysis_by_code(fund_code: str) -> dict:
         individual_analysis: the individual analysis of the fund in JSON format
     """
     try:
-        fund_individual_analysis_df = ak.fund_individual_analysis_xq(symbol=fund_code)
-        return fund_individual_analysis_df.to_dict(orient='records')
+        fund_individual_analysis_df = ak_call("fund_individual_analysis_xq", symbol=fund_code)
+        return encode_frame(fund_individual_analysis_df)
     except Exception as e:
         return {"error": str(e)}
 
+def _search_cursor_key(query, fund_type, diversify_seed):
+    """同一组搜索条件的指纹，用于拒绝拿其他搜索的游标翻页"""
+    return hashlib.sha1(repr((query or "", fund_type or "", diversify_seed)).encode("utf-8")).hexdigest()[:8]
+
+@functools.lru_cache(maxsize=1024)
+def _search_page(query, fund_type, offset, page_size, diversify_seed):
+    """返回 (一页基金的目录行号, 结果总数)；基金目录在进程内不变，相同参数的结果可以直接复用"""
+    database = get_fund_database()
+    if diversify_seed is None:
+        rows, total = database.search_funds(query=query, fund_type=fund_type, limit=page_size, offset=offset)
+        return tuple(rows), total
+    # 分散模式：在排名前 SEARCH_DIVERSIFY_POOL 的结果中按种子打乱，同一种子的顺序总是相同
+    pool, _ = database.search_funds(query=query, fund_type=fund_type, limit=SEARCH_DIVERSIFY_POOL)
+    random.Random(diversify_seed).shuffle(pool)
+    return tuple(pool[offset : offset + page_size]), len(pool)
+
 @tool
-def get_fund_search_results(query: str, fund_type: str = None) -> dict:
+def get_fund_search_results(
+    query: str, fund_type: str = None, page_size: int = 20, cursor: str = None, diversify_seed: int = None
+) -> dict:
     """Search for funds based on a query string and optionally filter by fund type
     Args:
         query: the search query string
         fund_type: optional filter by fund type (e.g., '债券型', '混合型', '指数型', '货币型')
+        page_size: number of funds per page (default 20, at most 100)
+        cursor: the next_cursor returned by a previous call with the same query, to get the next page (optional)
+        diversify_seed: optional integer; when given, the top 100 matches are shuffled with this seed
+            instead of strictly ranked, and the same seed always gives the same order
     Returns:
-        search_results: the search results in JSON format, sorted by ytd_return (year-to-date return)
-        in descending order and randomly selecting 20 from the top 100
+        search_results: the search results sorted by ytd_return (year-to-date return) in descending
+        order, then by fund code; total_rows is the number of matching funds and next_cursor is null
+        on the last page
     """
     try:
-        import duckdb
-        import pandas as pd
-        import random
-        from pathlib import Path
-        
-        # 获取CSV文件的绝对路径
-        current_dir = Path(__file__).parent
-        csv_path = current_dir / "data" / "fund_performance_all.csv"
-        
-        # 构建SQL查询
-        sql_query = f"""
-            SELECT * FROM read_csv('{csv_path}', AUTO_DETECT=TRUE)
-            WHERE 1=1
-        """
-        
-        # 添加模糊搜索条件
-        if query:
-            sql_query += f"""
-                AND (
-                    fund_code LIKE '%{query}%' OR
-                    fund_name LIKE '%{query}%'
+        catalog = get_fund_catalog()
+        page_size = max(1, min(int(page_size), SEARCH_MAX_PAGE_SIZE))
+        cursor_key = _search_cursor_key(query, fund_type, diversify_seed)
+        offset = 0
+        if cursor:
+            offset_text, _, key = cursor.partition("-")
+            if key != cursor_key or not offset_text.isdigit():
+                return {"error": "cursor does not belong to this search, repeat the search without cursor"}
+            offset = int(offset_text)
+
+        rows, total = _search_page(query or "", fund_type or "", offset, page_size, diversify_seed)
+        result = encode_records(catalog.records(rows), max_rows=page_size, total_rows=total)
+        # 结果被 token 预算截断时，下一页从第一条未返回的结果开始
+        next_offset = offset + len(result["rows"])
+        result["next_cursor"] = f"{next_offset}-{cursor_key}" if next_offset < total else None
+        return result
+    except Exception as e:
+        return {"error": str(e)}
+
+@tool
+def get_fund_peer_ranking(fund_code: str) -> dict:
+    """Get a fund's rank among funds of the same fund type for every return horizon and for fees
+    Args:
+        fund_code: the code of the fund
+    Returns:
+        peer_ranking: fund_type and a table with one row per metric: value, rank (1 is best:
+        highest return / lowest fee), peer_count and top_percent (rank as a percentage of
+        peer_count, smaller is better)
+    """
+    try:
+        catalog = get_fund_catalog()
+        row = catalog.row_of(fund_code)
+        if row is None:
+            return f"No fund found with code {fund_code}"
+        ranking = encode_rows(
+            ["metric", "value", "rank", "peer_count", "top_percent"], catalog.peer_ranking(row), max_tokens=None
+        )
+        return {
+            "fund_code": fund_code,
+            "fund_name": catalog.columns["fund_name"][row],
+            "fund_type": catalog.columns["fund_type"][row],
+            "ranking": ranking,
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+@tool
+def get_fund_risk_metrics(
+    fund_code: str, period: str = "1y", benchmark: str = "sh000300", risk_free_rate: float = 1.5
+) -> dict:
+    """Compute volatility, drawdown and risk-adjusted return metrics from the fund's NAV history
+    Args:
+        fund_code: the code of the fund
+        period: lookback period, one of '3m', '6m', '1y', '2y', '3y', '5y', 'all' (default '1y')
+        benchmark: benchmark index symbol for beta, tracking error, information ratio and Treynor
+            ratio (default 'sh000300', CSI 300; e.g. 'sh000905' for CSI 500)
+        risk_free_rate: annual risk-free rate in % (default 1.5)
+    Returns:
+        risk_metrics: returns, volatility, drawdowns, tracking error and Treynor ratio in %,
+        annualized with 250 trading days;
+        rolling_1y summarizes every 1-year holding period over the whole NAV history
+    """
+    try:
+        if period not in RISK_PERIOD_DAYS:
+            return {"error": f"Unsupported period {period}, expected one of {', '.join(RISK_PERIOD_DAYS)}"}
+        store = get_nav_store()
+        history = store.fund(fund_code)
+        if len(history) < 2:
+            return f"No NAV history found for fund with code {fund_code}"
+        days = RISK_PERIOD_DAYS[period]
+        series = history if days is None else history.since(history.dates[-1] - np.timedelta64(days, "D"))
+        values = np.asarray(series.values)
+        returns = risk_metrics.simple_returns(values)
+        risk_free = risk_free_rate / 100
+        peak, trough = risk_metrics.max_drawdown_window(values)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            metrics = {
+                "fund_code": fund_code,
+                "period": period,
+                "start_date": str(series.dates[0]),
+                "end_date": str(series.dates[-1]),
+                "observations": len(series),
+                "total_return": risk_metrics.total_return(values) * 100,
+                "annualized_return": risk_metrics.annualized_return(values) * 100,
+                "annualized_volatility": risk_metrics.annualized_volatility(returns) * 100,
+                "max_drawdown": risk_metrics.max_drawdown(values) * 100,
+                "max_drawdown_peak_date": str(series.dates[peak]),
+                "max_drawdown_trough_date": str(series.dates[trough]),
+                "sharpe_ratio": risk_metrics.sharpe_ratio(returns, risk_free),
+                "sortino_ratio": risk_metrics.sortino_ratio(returns, risk_free),
+            }
+
+            full_values = np.asarray(history.values)
+            if len(full_values) > risk_metrics.TRADING_DAYS:
+                rolling = risk_metrics.rolling_returns(full_values, risk_metrics.TRADING_DAYS)
+                metrics["rolling_1y"] = {
+                    "min": rolling.min() * 100,
+                    "median": np.median(rolling) * 100,
+                    "max": rolling.max() * 100,
+                    "positive_ratio": (rolling > 0).mean(),
+                }
+
+            try:
+                index = store.index(benchmark)
+            except Exception as e:
+                logger.warning(f"获取基准指数 {benchmark} 失败: {e}")
+                index = None
+            if index is not None:
+                # 只使用基金和指数都有数据的日期
+                _, fund_rows, index_rows = np.intersect1d(
+                    series.dates, index.dates, assume_unique=True, return_indices=True
                 )
-            """
-        
-        # 如果提供了基金类型，添加筛选条件
-        if fund_type:
-            sql_query += f"""
-                AND fund_type LIKE '%{fund_type}%'
-            """
-        
-        # 按照ytd_return降序排序并限制结果为前100个
-        sql_query += """
-            ORDER BY CAST(ytd_return AS FLOAT) DESC
-            LIMIT 100
-        """
-        
-        # 执行查询
-        result = duckdb.sql(sql_query).df()
-        
-        # 如果结果少于20个，返回所有结果
-        if len(result) <= 20:
-            return result.to_dict(orient='records')
-        
-        # 从前100个结果中随机选择20个
-        random_indices = random.sample(range(len(result)), 20)
-        random_results = result.iloc[random_indices]
-        
-        # 将结果转换为字典列表
-        return random_results.to_dict(orient='records')
+                if len(fund_rows) > 2:
+                    fund_returns = risk_metrics.simple_returns(values[fund_rows])
+                    index_returns = risk_metrics.simple_returns(np.asarray(index.values)[index_rows])
+                    # 贝塔接近 0 时特雷诺比率为 NaN，返回 None
+                    treynor = risk_metrics.treynor_ratio(fund_returns, index_returns, risk_free)
+                    metrics.update(
+                        benchmark=benchmark,
+                        beta=risk_metrics.beta(fund_returns, index_returns),
+                        tracking_error=risk_metrics.tracking_error(fund_returns, index_returns) * 100,
+                        information_ratio=risk_metrics.information_ratio(fund_returns, index_returns),
+                        treynor_ratio=treynor * 100 if np.isfinite(treynor) else None,
+                    )
+
+        return {
+            key: {k: to_plain(v) for k, v in value.items()} if isinstance(value, dict) else to_plain(value)
+            for key, value in metrics.items()
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+@tool
+def resolve_fund(query: str, limit: int = 5) -> dict:
+    """Resolve a fuzzy fund name, pinyin abbreviation or code to ranked fund candidates
+    Args:
+        query: fund name fragment, pinyin initials (e.g. 'HXCZ'), full pinyin or fund code
+        limit: maximum number of candidates to return (default 5)
+    Returns:
+        candidates: matching funds with fund_code, fund_name, fund_type, share_class and a
+        score between 0 and 1, best match first: 1 for an exact code, name or pinyin match,
+        0.6 and above when a code, name or pinyin starts with the query, below 0.6 for partial similarity
+    """
+    try:
+        return get_fund_index().search(query, limit=limit)
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+@tool
+def screen_funds(
+    fund_type: str = None,
+    company: str = None,
+    manager: str = None,
+    ranges: dict = None,
+    sort_by: list = None,
+    limit: int = 20,
+) -> dict:
+    """Screen all funds by several criteria at once and return the top matches
+    Args:
+        fund_type: optional substring of the fund type (e.g., '债券型', '混合型', '指数型', '货币型')
+        company: optional substring of the fund company name (e.g., '华夏')
+        manager: optional substring of the fund manager name
+        ranges: optional inclusive ranges keyed by column, [min, max] with null for an open end,
+            e.g. {"yearly_return": [10, null], "fee": [null, 0.15]}. Columns: nav, acc_nav, fee (%),
+            daily_return, weekly_return, monthly_return, quarterly_return, half_year_return,
+            yearly_return, two_year_return, three_year_return, ytd_return, since_inception_return,
+            custom_return (all returns in %)
+        sort_by: optional sort keys in priority order, '-' prefix for descending,
+            e.g. ["-three_year_return", "fee"] (default ["-ytd_return"])
+        limit: maximum number of funds to return (default 20)
+    Returns:
+        screen_results: the top funds as a compact table; total_rows is the number of funds
+        matching all criteria
+    """
+    try:
+        catalog = get_fund_catalog()
+        rows, matched = screen(
+            catalog,
+            ranges=ranges,
+            fund_type=fund_type,
+            company=company,
+            manager=manager,
+            sort_by=sort_by,
+            limit=limit,
+        )
+        extra_columns = list(ranges or {}) + [key.strip().lstrip("+-") for key in sort_by or []]
+        columns = list(dict.fromkeys(SCREEN_RESULT_COLUMNS + extra_columns))
+        return encode_records(catalog.records(rows), columns=columns, total_rows=matched)
+    except Exception as e:
+        return {"error": str(e)}
@@ -0,0 +1,104 @@
+"""
+向量化基金筛选
+
+在内存中的基金目录（见 tools/fund_catalog.py）上，把每个条件编译为一个 NumPy 布尔掩码后求交：
+各时间跨度收益率、费率、净值的区间，以及基金类型、基金公司、基金经理的子串匹配。
+结果支持多键排序；只取前 k 个时先用 argpartition 按主排序键选出候选，再只对候选排序，
+一次筛选全部 17k 只基金在亚毫秒级完成。
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tools.fund_catalog import NUMERIC_COLUMNS, FundCatalog
+
+# 可以做区间过滤和排序的列
+SCREEN_COLUMNS = NUMERIC_COLUMNS
+
+# 默认排序：今年以来收益率从高到低，与基金搜索工具一致
+DEFAULT_SORT = ["-ytd_return"]
+
+
+def parse_sort_keys(sort_by: Optional[Sequence[str]]) -> List[Tuple[str, bool]]:
+    """把 ["-yearly_return", "fee"] 解析为 [(列名, 是否降序)]，"-" 前缀表示降序"""
+    keys = []
+    for key in sort_by or DEFAULT_SORT:
+        key = key.strip()
+        descending = key.startswith("-")
+        column = key.lstrip("+-")
+        if column not in SCREEN_COLUMNS:
+            raise ValueError(f"不支持按 {column} 排序，可选列: {', '.join(SCREEN_COLUMNS)}")
+        keys.append((column, descending))
+    return keys
+
+
+def parse_range(column: str, bounds) -> Tuple[Optional[float], Optional[float]]:
+    """把 [下限, 上限] 或 {"min": 下限, "max": 上限} 解析为浮点数区间，None 表示不限"""
+    if isinstance(bounds, dict):
+        bounds = (bounds.get("min"), bounds.get("max"))
+    if not isinstance(bounds, (list, tuple)) or len(bounds) != 2:
+        raise ValueError(f"{column} 的区间应为 [下限, 上限]")
+    low, high = (None if bound is None or bound == "" else float(bound) for bound in bounds)
+    return low, high
+
+
+def screen_mask(
+    catalog: FundCatalog,
+    ranges: Optional[Dict[str, Sequence]] = None,
+    fund_type: Optional[str] = None,
+    company: Optional[str] = None,
+    manager: Optional[str] = None,
+) -> np.ndarray:
+    """返回满足所有条件的行掩码；区间为闭区间，缺失值不满足任何区间条件"""
+    mask = np.ones(catalog.size, dtype=bool)
+    for column, text in (("fund_type", fund_type), ("company", company), ("manager_name", manager)):
+        if text:
+            mask &= catalog.contains_mask(column, text)
+    for column, bounds in (ranges or {}).items():
+        if column not in SCREEN_COLUMNS:
+            raise ValueError(f"不支持按 {column} 过滤，可选列: {', '.join(SCREEN_COLUMNS)}")
+        low, high = parse_range(column, bounds)
+        values = catalog.columns[column]
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+    return mask
+
+
+def top_k(catalog: FundCatalog, rows: np.ndarray, sort_keys: List[Tuple[str, bool]], limit: int) -> np.ndarray:
+    """按多个排序键返回 rows 中排在最前的 limit 行，缺失值排在最后，完全相同时按行号"""
+    # 统一转换为升序排序键：降序列取负，NaN 替换为 +inf
+    keys = []
+    for column, descending in sort_keys:
+        values = catalog.columns[column][rows]
+        values = -values if descending else values
+        keys.append(np.where(np.isnan(values), np.inf, values))
+
+    if 0 < limit < len(rows):
+        # 只按主排序键选出前 limit 个，与第 limit 个主键相同的行也保留，次排序键在其中决定先后
+        primary = keys[0]
+        threshold = primary[np.argpartition(primary, limit - 1)[:limit]].max()
+        candidates = np.flatnonzero(primary <= threshold)
+        rows = rows[candidates]
+        keys = [key[candidates] for key in keys]
+
+    # np.lexsort 以最后一个键为主键
+    order = np.lexsort([rows] + keys[::-1])
+    return rows[order[:limit]] if limit > 0 else rows[order]
+
+
+def screen(
+    catalog: FundCatalog,
+    ranges: Optional[Dict[str, Sequence]] = None,
+    fund_type: Optional[str] = None,
+    company: Optional[str] = None,
+    manager: Optional[str] = None,
+    sort_by: Optional[Sequence[str]] = None,
+    limit: int = 20,
+) -> Tuple[np.ndarray, int]:
+    """筛选并排序，返回 (排在最前的 limit 个行号, 满足条件的基金总数)"""
+    sort_keys = parse_sort_keys(sort_by)
+    rows = np.flatnonzero(screen_mask(catalog, ranges, fund_type, company, manager))
+    return top_k(catalog, rows, sort_keys, limit), len(rows)
@@ -0,0 +1,274 @@
+"""
+基金季度持仓库
+
+按 (基金代码, 季度) 保存 fund_portfolio_hold_em 返回的股票持仓明细。接口按年份返回当年已披露的所有季度，
+这里只在目标季度尚未入库时才抓取对应年份，抓到的季度规范化后合并进该基金的持仓表，
+每只基金的持仓表作为一个条目写入磁盘缓存（见 tools/disk_cache.py），重启后无需重新抓取。
+
+季度用整数序号表示（year * 4 + 季度 - 1），对外显示为 "2025Q1"。
+某个季度结束 REPORT_LAG_DAYS 天后才认为季报已经披露，因此 "最新季度" 随日历自动前移。
+季度结束 REPORT_SETTLE_DAYS 天之前，缺失的季度每隔 HOLDINGS_RECHECK_INTERVAL 重新检查一次；
+此后仍然缺失（例如债券基金没有股票持仓）就不再请求。
+"""
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from tools.ak_cache import ak_call
+from tools.concurrency import SingleFlight
+from tools.disk_cache import DiskCache, open_disk_cache
+
+logger = logging.getLogger(__name__)
+
+# 季度结束多少天后认为季报已经披露（基金季报在季度结束后 15 个工作日内披露）
+REPORT_LAG_DAYS = 15
+# 季度结束多少天后认为所有基金都已披露完毕
+REPORT_SETTLE_DAYS = 45
+# 披露期内缺失季度的重新检查间隔（秒）
+HOLDINGS_RECHECK_INTERVAL = 24 * 60 * 60
+
+# 持仓库在磁盘缓存中的版本号和命名空间，规范化后的列变化时递增版本号
+HOLDINGS_STORE_VERSION = "holdings-2"
+HOLDINGS_NAMESPACE = "fund_holdings"
+
+# fund_portfolio_hold_em 的列名 -> 持仓库的列名（持股数单位为万股，持仓市值单位为万元）
+HOLDING_COLUMNS = {
+    "股票代码": "stock_code",
+    "股票名称": "stock_name",
+    "占净值比例": "weight",
+    "持股数": "shares",
+    "持仓市值": "market_value",
+}
+
+_QUARTER_LABEL = re.compile(r"(\d{4})\s*年\s*([1-4])\s*季度")
+_QUARTER_CODE = re.compile(r"(\d{4})\s*[Qq]\s*([1-4])")
+_DATE = re.compile(r"(\d{4})-?(\d{2})-?(\d{2})")
+
+
+def quarter_of(year: int, quarter: int) -> int:
+    return year * 4 + quarter - 1
+
+
+def quarter_label(ordinal: int) -> str:
+    """季度序号 -> "2025Q1" """
+    return f"{ordinal // 4}Q{ordinal % 4 + 1}"
+
+
+def quarter_end(ordinal: int) -> date:
+    """季度的最后一天"""
+    year, quarter = divmod(ordinal, 4)
+    if quarter == 3:
+        return date(year, 12, 31)
+    return date(year, quarter * 3 + 4, 1) - timedelta(days=1)
+
+
+def parse_quarter(text: str) -> Optional[int]:
+    """解析 "2025Q1"、"2025年1季度股票投资明细" 或日期（"2025-03-31"、"20250331"，取日期所在季度）"""
+    text = str(text).strip()
+    match = _QUARTER_CODE.search(text) or _QUARTER_LABEL.search(text)
+    if match:
+        return quarter_of(int(match.group(1)), int(match.group(2)))
+    match = _DATE.search(text)
+    if match:
+        return quarter_of(int(match.group(1)), (int(match.group(2)) - 1) // 3 + 1)
+    return None
+
+
+def latest_reported_quarter(now: float, lag_days: int = REPORT_LAG_DAYS) -> int:
+    """在时间戳 now 时最近一个已经到披露时间的季度"""
+    reference = (datetime.fromtimestamp(now) - timedelta(days=lag_days)).date()
+    # reference 所在季度尚未结束，最新披露的是上一个季度
+    return quarter_of(reference.year, (reference.month - 1) // 3 + 1) - 1
+
+
+def normalize_holdings(frame: pd.DataFrame) -> pd.DataFrame:
+    """把 fund_portfolio_hold_em 的结果转换为持仓库的列，季度列为季度序号"""
+    columns = ["quarter"] + list(HOLDING_COLUMNS.values())
+    if frame is None or frame.empty or "季度" not in frame.columns:
+        return pd.DataFrame(columns=columns)
+    normalized = frame.rename(columns=HOLDING_COLUMNS)
+    normalized["quarter"] = frame["季度"].map(parse_quarter)
+    normalized = normalized.dropna(subset=["quarter"])
+    normalized["quarter"] = normalized["quarter"].astype("int64")
+    normalized["stock_code"] = normalized["stock_code"].astype(str).str.strip()
+    for name in ("weight", "shares", "market_value"):
+        normalized[name] = pd.to_numeric(normalized[name], errors="coerce")
+    return normalized[columns].reset_index(drop=True)
+
+
+@dataclass
+class FundHoldings:
+    """单只基金已入库的持仓，checked 记录每个年份最近一次向上游请求的时间"""
+
+    fund_code: str
+    frame: pd.DataFrame
+    checked: Dict[int, float] = field(default_factory=dict)
+
+    @property
+    def quarters(self) -> List[int]:
+        return sorted(self.frame["quarter"].unique().tolist())
+
+    def latest(self, at_most: int) -> Optional[int]:
+        """不晚于 at_most 的最新已入库季度"""
+        quarters = [quarter for quarter in self.quarters if quarter <= at_most]
+        return quarters[-1] if quarters else None
+
+    def quarter(self, ordinal: int) -> pd.DataFrame:
+        return self.frame[self.frame["quarter"] == ordinal].reset_index(drop=True)
+
+    def to_frame(self) -> pd.DataFrame:
+        """写入磁盘缓存的形式：持仓表，基金代码和检查时间放在 attrs 中"""
+        frame = self.frame.copy(deep=False)
+        frame.attrs = {"fund_code": self.fund_code, "checked": {str(year): at for year, at in self.checked.items()}}
+        return frame
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "FundHoldings":
+        attrs = frame.attrs
+        checked = {int(year): at for year, at in attrs.get("checked", {}).items()}
+        frame = frame.copy(deep=False)
+        frame.attrs = {}
+        return cls(attrs["fund_code"], frame, checked)
+
+
+class HoldingsStore:
+    """按基金增量维护的季度持仓库"""
+
+    def __init__(self, disk: Optional[DiskCache], recheck_interval: float = HOLDINGS_RECHECK_INTERVAL):
+        self._disk = disk
+        self._recheck_interval = recheck_interval
+        self._funds: Dict[str, FundHoldings] = {}
+        # 最新季度索引：基金代码 -> 已入库的最新季度
+        self._latest: Dict[str, int] = {}
+        # 每次有基金新增季度时递增，供派生的索引判断是否需要重建
+        self.version = 0
+        self._loaded_all = False
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def holdings(self, fund_code: str, quarter: Optional[int] = None) -> Tuple[Optional[int], pd.DataFrame]:
+        """返回 (季度, 持仓)；未指定季度时返回最新已披露的季度，没有数据时季度为 None"""
+        now = time.time()
+        target = quarter if quarter is not None else latest_reported_quarter(now)
+        fund = self._ensure(fund_code, target, now, previous_year=quarter is None)
+        if quarter is not None:
+            resolved = quarter
+        else:
+            # 个别基金会早于预期披露，已入库的更新季度同样可用
+            quarters = fund.quarters
+            resolved = quarters[-1] if quarters else None
+        if resolved is None:
+            return None, fund.frame.iloc[0:0]
+        return resolved, fund.quarter(resolved)
+
+    def latest_quarter(self, fund_code: str) -> Optional[int]:
+        """最新季度索引中的记录，不会触发抓取"""
+        with self._lock:
+            return self._latest.get(fund_code)
+
+    def latest_holdings(self) -> List[Tuple[str, int, pd.DataFrame]]:
+        """所有已入库基金的最新季度持仓 [(基金代码, 季度, 持仓)]"""
+        self.load_all()
+        with self._lock:
+            latest = [(self._funds[fund_code], quarter) for fund_code, quarter in self._latest.items()]
+        return [(fund.fund_code, quarter, fund.quarter(quarter)) for fund, quarter in latest]
+
+    def load_all(self):
+        """把磁盘上已入库的全部基金载入内存，只在第一次调用时读取磁盘"""
+        if self._loaded_all or self._disk is None:
+            return
+        for frame, _ in self._disk.values(HOLDINGS_NAMESPACE):
+            fund = FundHoldings.from_frame(frame)
+            with self._lock:
+                loaded = fund.fund_code in self._funds
+            if not loaded:
+                self._remember(fund.fund_code, fund)
+        self._loaded_all = True
+
+    def _ensure(self, fund_code: str, target: int, now: float, previous_year: bool) -> FundHoldings:
+        """保证目标季度已入库或已确认暂无数据；previous_year 为 True 且目标年份没有任何季度时再检查上一年"""
+        fund = self._fund(fund_code)
+        if target in fund.quarters:
+            return fund
+        year = target // 4
+        candidates = [(year, target)]
+        if previous_year:
+            candidates.append((year - 1, quarter_of(year - 1, 4)))
+        for fetch_year, wanted in candidates:
+            if fetch_year < year and fund.latest(target) is not None:
+                break
+            if self._needs_fetch(fund, fetch_year, wanted, now):
+                fund = self._flights.do((fund_code, fetch_year), lambda: self._fetch(fund_code, fetch_year))
+        return fund
+
+    def _needs_fetch(self, fund: FundHoldings, year: int, wanted: int, now: float) -> bool:
+        if wanted in fund.quarters:
+            return False
+        checked_at = fund.checked.get(year)
+        if checked_at is None:
+            return True
+        settled_at = datetime.combine(quarter_end(wanted), datetime.min.time()) + timedelta(days=REPORT_SETTLE_DAYS)
+        # 披露期结束后检查过仍然没有，说明该季度确实没有股票持仓
+        if checked_at >= settled_at.timestamp():
+            return False
+        return now - checked_at >= self._recheck_interval
+
+    def _fund(self, fund_code: str) -> FundHoldings:
+        with self._lock:
+            fund = self._funds.get(fund_code)
+        if fund is not None:
+            return fund
+        fund = FundHoldings(fund_code, normalize_holdings(None))
+        if self._disk is not None:
+            stored = self._disk.get(HOLDINGS_NAMESPACE, fund_code)
+            if stored is not None:
+                fund = FundHoldings.from_frame(stored[0])
+        self._remember(fund_code, fund)
+        return fund
+
+    def _fetch(self, fund_code: str, year: int) -> FundHoldings:
+        fetched_at = time.time()
+        fetched = normalize_holdings(ak_call("fund_portfolio_hold_em", symbol=fund_code, date=str(year)))
+        fund = self._fund(fund_code)
+        # 只合并尚未入库的季度，已入库的季度不会再变化
+        new_rows = fetched[~fetched["quarter"].isin(fund.quarters)]
+        frame = pd.concat([fund.frame, new_rows], ignore_index=True) if not new_rows.empty else fund.frame
+        updated = FundHoldings(
+            fund_code, frame.sort_values("quarter", kind="stable").reset_index(drop=True), dict(fund.checked)
+        )
+        updated.checked[year] = fetched_at
+        if not new_rows.empty:
+            logger.info(f"基金 {fund_code} 新增持仓季度: {sorted(set(new_rows['quarter'].map(quarter_label)))}")
+        self._remember(fund_code, updated)
+        if self._disk is not None:
+            self._disk.put(HOLDINGS_NAMESPACE, fund_code, updated.to_frame())
+        return updated
+
+    def _remember(self, fund_code: str, fund: FundHoldings):
+        quarters = fund.quarters
+        with self._lock:
+            self._funds[fund_code] = fund
+            if quarters and self._latest.get(fund_code) != quarters[-1]:
+                self._latest[fund_code] = quarters[-1]
+                self.version += 1
+
+
+_store: Optional[HoldingsStore] = None
+_store_lock = threading.Lock()
+
+
+def get_holdings_store() -> HoldingsStore:
+    """获取进程级持仓库"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HoldingsStore(open_disk_cache(version=HOLDINGS_STORE_VERSION))
+    return _store
@@ -0,0 +1,121 @@
+"""
+工具结果的紧凑编码
+
+to_dict(orient="records") 会在每一行重复所有列名，大表会给模型上下文带来数千个 token。
+这里把结果统一编码为 "表头 + 行" 的列式结构：
+
+    {"columns": [...], "rows": [[...], ...], "total_rows": 120, "truncated": true}
+
+并支持列投影、行数上限和 token 预算。超出预算时从尾部截断行，
+total_rows 和 truncated 告诉模型结果并不完整。
+"""
+
+import json
+import math
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# 默认每个工具结果的 token 预算
+DEFAULT_MAX_TOKENS = 2000
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中日韩字符约 1 个 token，其余字符约 4 个字符 1 个 token"""
+    cjk = sum(1 for ch in text if "\u3000" <= ch <= "\u9fff" or "\uff00" <= ch <= "\uffef")
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def to_plain(value: Any) -> Any:
+    """把 NumPy / pandas / Decimal 等类型转换为可 JSON 序列化的 Python 原生类型"""
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        return None if math.isnan(value) or math.isinf(value) else round(value, 6)
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    if not isinstance(value, (str, list, dict)) and pd.isna(value):
+        return None
+    return value
+
+
+def encode_rows(
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    total_rows: Optional[int] = None,
+    max_rows: Optional[int] = None,
+    max_tokens: Optional[int] = DEFAULT_MAX_TOKENS,
+) -> dict:
+    """按行数上限和 token 预算编码表格"""
+    columns = [str(column) for column in columns]
+    header_tokens = estimate_tokens(json.dumps(columns, ensure_ascii=False))
+    encoded: List[list] = []
+    used = header_tokens
+    for index, row in enumerate(rows):
+        if max_rows is not None and index >= max_rows:
+            break
+        plain = [to_plain(value) for value in row]
+        cost = estimate_tokens(json.dumps(plain, ensure_ascii=False, default=str))
+        if max_tokens is not None and encoded and used + cost > max_tokens:
+            break
+        encoded.append(plain)
+        used += cost
+
+    if total_rows is None:
+        total_rows = len(encoded)
+    return {
+        "columns": columns,
+        "rows": encoded,
+        "total_rows": total_rows,
+        "truncated": len(encoded) < total_rows,
+    }
+
+
+def encode_frame(
+    frame: pd.DataFrame,
+    columns: Optional[Sequence[str]] = None,
+    max_rows: Optional[int] = None,
+    max_tokens: Optional[int] = DEFAULT_MAX_TOKENS,
+) -> dict:
+    """编码 DataFrame，columns 为要保留的列（不存在的列会被忽略）"""
+    if columns is not None:
+        frame = frame[[column for column in columns if column in frame.columns]]
+    return encode_rows(
+        list(frame.columns),
+        frame.itertuples(index=False, name=None),
+        total_rows=len(frame),
+        max_rows=max_rows,
+        max_tokens=max_tokens,
+    )
+
+
+def encode_records(
+    records: Sequence[dict],
+    columns: Optional[Sequence[str]] = None,
+    max_rows: Optional[int] = None,
+    max_tokens: Optional[int] = DEFAULT_MAX_TOKENS,
+    total_rows: Optional[int] = None,
+) -> dict:
+    """编码字典列表（例如 DynamoDB 条目），未指定 columns 时取所有记录键的并集
+
+    records 本身只是结果的一部分时（例如筛选结果的前 k 个），total_rows 为完整结果的行数。
+    """
+    if columns is None:
+        columns = list(dict.fromkeys(key for record in records for key in record))
+    return encode_rows(
+        columns,
+        ([record.get(column) for column in columns] for record in records),
+        total_rows=len(records) if total_rows is None else total_rows,
+        max_rows=max_rows,
+        max_tokens=max_tokens,
+    )
@@ -6,6 +6,7 @@ Lambda处理程序，处理基金顾问查询
 """
 
 from agents.portfolio_manager import PortfolioManagerAgent
+from tools.fund_info import start_fund_data_preload
 from utils.callback_handlers import LoggingCallbackHandler
 from typing import Dict, Any
 from dotenv import load_dotenv
@@ -18,6 +19,9 @@ load_dotenv()
 if "KNOWLEDGE_BASE_ID" not in os.environ:
     os.environ["KNOWLEDGE_BASE_ID"] = "DDBX9Y6VJ6"
 
+# 冷启动时在后台预加载基金数据（基金目录、DuckDB 表和名称索引），后续调用复用同一个执行环境
+start_fund_data_preload()
+
 def handler(event: Dict[str, Any], context) -> Dict[str, Any]:
     """
     Lambda处理程序，处理基金顾问查询
@@ -16,8 +16,8 @@ import logging
 sys.path.append("/var/task")  # Lambda函数代码的根目录
 
 logger = logging.getLogger(__name__)
-from tools.stock_info import get_stock_info_by_code, get_stock_news_by_code, get_stock_performance_by_code
-from tools.fund_info import get_fund_by_code, get_fund_holdings_by_code, get_fund_performance_by_code
+from tools.stock_info import get_stock_info_by_code, get_stock_news_by_code, get_stock_performance_by_code, get_stocks_by_codes
+from tools.fund_info import get_fund_by_code, get_fund_holdings_by_code, get_fund_performance_by_code, get_funds_holding_stock, get_portfolio_stock_exposure
 from utils.context_utils import get_current_callback_handler
 from utils.agent_utils import create_agent_with_parent_callback
 
@@ -55,6 +55,7 @@ def comprehensive_holdings_analyst(query: str) -> str:
         3. 基金持仓的集中度和分散度
         4. 重仓股的质量和潜在风险
         5. 持仓变动趋势及其反映的投资策略变化
+        分析多只基金组成的组合时，使用组合股票穿透工具一次得到所有基金合计的个股敞口，不要逐只基金查询持仓后自行汇总；需要了解某只股票被哪些基金持有时，使用股票持有基金查询工具。
         
         持仓表现分析：
         1. 重仓股的近期表现（股价涨跌、市场表现）
@@ -64,6 +65,7 @@ def comprehensive_holdings_analyst(query: str) -> str:
         5. 基金业绩与重仓股表现的一致性分析
         6. 基于持仓分析的基金真实盈利可能性判断
         7. 持有建议（适合持有、谨慎持有、建议减持）
+        分析重仓股表现时，使用批量股票查询工具一次获取全部重仓股的行情、估值和公司概况，不要逐只股票调用个股查询工具；个股工具只用于补充单只股票的详细资料和新闻。
         
         你的分析应该深入、专业，帮助投资者理解基金的实际投资方向和风格，并判断基金真实盈利的可能性以及基金的表现是否与持仓信息相符。
         
@@ -85,7 +87,7 @@ def comprehensive_holdings_analyst(query: str) -> str:
         6. 持有建议：[适合持有/谨慎持有/建议减持]
         7. 建议理由：[给出持有建议的具体理由]
         """,
-        tools=[get_fund_by_code, get_fund_holdings_by_code, get_fund_performance_by_code, get_stock_info_by_code, get_stock_news_by_code, get_stock_performance_by_code],
+        tools=[get_fund_by_code, get_fund_holdings_by_code, get_fund_performance_by_code, get_stock_info_by_code, get_stock_news_by_code, get_stock_performance_by_code, get_funds_holding_stock, get_portfolio_stock_exposure, get_stocks_by_codes],
         load_tools_from_directory=False
     )
     
@@ -22,6 +22,7 @@ from agents.analysis_agents import manager_analyst, fees_analyst
 from agents.user_profile import user_profile_agent
 from agents.fund_selector import fund_selector_agent
 from strands_tools import current_time, retrieve
+from tools.request_context import request_scope
 from utils.context_utils import get_current_callback_handler, set_current_callback_handler
 
 logger = logging.getLogger(__name__)
@@ -120,6 +121,8 @@ class PortfolioManagerAgent:
         """
         logger.info(f"处理用户查询: {query}")
         
-        # 调用投资组合管理Agent
-        response = self.agent(query)
+        # 同一次查询内，各子 Agent 对相同数据的读取只执行一次
+        with request_scope():
+            # 调用投资组合管理Agent
+            response = self.agent(query)
         return response.message
@@ -0,0 +1,269 @@
+"""
+磁盘缓存层
+
+把 akshare 返回的 DataFrame 以 Parquet（列式压缩）格式写入共享目录，
+同一台机器上的多个 uvicorn worker、重启后的 Fargate 任务或挂载了同一 EFS 的容器
+都能直接读到已抓取的数据。目录通过环境变量 FUND_ADVISOR_CACHE_DIR 配置，
+设置为空字符串时禁用磁盘缓存。
+
+- 写入先落到同目录下的临时文件，再用 os.replace 原子替换，读方不会看到半写的文件
+- 缓存键包含缓存格式版本和 akshare 版本，升级任一方都会自动换到新的目录
+- 文件的修改时间即数据抓取时间，过期判断由调用方的缓存策略完成
+- 目录可能被多个进程或容器共享，文件中只保存数据（Parquet 和 JSON），不保存 pickle 等读取时会执行代码的格式
+- DuckDB 会把混合类型的 object 列（例如雪球接口的 item/value 表中的字典和数字）静默转换为字符串，
+  把 datetime.date 转换为时间戳。写入前把这类列的每个值编码为 JSON 字符串、日期列标记为日期，
+  列的编码方式和 DataFrame.attrs 一起写进 Parquet 的键值元数据，读取时据此还原。
+  写出的文件还会读回与原表逐列比较，仍不一致时不写入磁盘（只保留在内存缓存中）
+- DataFrame 以外的值写成 JSON，无法编码为 JSON 的值同样不写入磁盘
+- 缓存根目录（包括各版本目录和净值序列）的总大小不超过 FUND_ADVISOR_CACHE_MAX_BYTES，
+  超出时按修改时间从旧到新删除文件（Lambda 的 /tmp 只有 512 MB）
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterator, Optional, Tuple
+
+import duckdb
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 缓存文件格式变化时递增（3：去掉 pickle，object 列编码为 JSON）
+CACHE_FORMAT_VERSION = 3
+
+DEFAULT_CACHE_DIR = "/tmp/fund-advisor-cache"
+
+# 缓存根目录的默认总大小上限（字节），可用环境变量 FUND_ADVISOR_CACHE_MAX_BYTES 覆盖
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# 超出上限时删除最旧的文件，直到总大小降到上限的这个比例，避免每次写入都重新扫描目录
+DISK_CACHE_EVICT_TARGET = 0.8
+
+# Parquet 键值元数据中保存列编码方式和 DataFrame.attrs 的键
+PARQUET_METADATA_KEY = "fund_advisor"
+
+CACHE_SUFFIXES = (".parquet", ".json")
+
+
+class DiskCache:
+    """以 (命名空间, 键) 为索引的磁盘缓存，DataFrame 存为 Parquet，其余值存为 JSON"""
+
+    def __init__(self, root: Path, version: str, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.base = Path(root)
+        self.root = self.base / f"v{CACHE_FORMAT_VERSION}-{version}"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._evicting = threading.Lock()
+        # 根目录总大小的估计值：启动时扫描一次，之后按本进程的写入累加，淘汰时重新扫描校正
+        self._size = sum(size for _, size, _ in self._files())
+
+    def _path(self, namespace: str, key: Hashable) -> Path:
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return self.root / namespace / digest
+
+    def get(self, namespace: str, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """返回 (值, 写入时间戳)，不存在或读取失败时返回 None"""
+        base = self._path(namespace, key)
+        for suffix in CACHE_SUFFIXES:
+            path = base.with_suffix(suffix)
+            try:
+                return self._read(path)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.warning(f"读取磁盘缓存 {path} 失败: {e}")
+                return None
+        return None
+
+    def values(self, namespace: str) -> Iterator[Tuple[Any, float]]:
+        """遍历某个命名空间下的所有条目，返回 (值, 写入时间戳)，读取失败的条目会被跳过"""
+        directory = self.root / namespace
+        if not directory.is_dir():
+            return
+        for path in directory.iterdir():
+            if path.name.startswith(".tmp-") or path.suffix not in CACHE_SUFFIXES:
+                continue
+            try:
+                yield self._read(path)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.warning(f"读取磁盘缓存 {path} 失败: {e}")
+
+    @classmethod
+    def _read(cls, path: Path) -> Tuple[Any, float]:
+        fetched_at = path.stat().st_mtime
+        if path.suffix == ".parquet":
+            return cls._read_parquet(str(path)), fetched_at
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f), fetched_at
+
+    def put(self, namespace: str, key: Hashable, value: Any):
+        """原子写入缓存条目，失败或无法原样保存时只记录日志"""
+        base = self._path(namespace, key)
+        base.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            if isinstance(value, pd.DataFrame):
+                target = base.with_suffix(".parquet")
+                change = self._atomic_write(target, lambda path: self._write_parquet(value, path))
+            else:
+                target = base.with_suffix(".json")
+                change = self._atomic_write(target, lambda path: self._write_json(value, path))
+        except (TypeError, ValueError, AssertionError) as e:
+            logger.debug(f"{namespace} 条目无法原样写入磁盘缓存，只保留在内存中: {e}")
+            return
+        except Exception as e:
+            logger.warning(f"写入磁盘缓存 {base} 失败: {e}")
+            return
+        self._account(change)
+
+    @staticmethod
+    def _encode_frame(frame: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """把 DuckDB 无法原样保存的 object 列编码为 JSON 字符串，返回 (编码后的表, 元数据)"""
+        json_columns, date_columns = [], []
+        encoded = frame.copy(deep=False)
+        for name, column in frame.items():
+            if column.dtype != object:
+                continue
+            present = column[column.notna()]
+            if present.map(lambda item: isinstance(item, str)).all():
+                continue
+            if present.map(lambda item: isinstance(item, datetime.date) and not isinstance(item, datetime.datetime)).all():
+                date_columns.append(name)
+                continue
+            json_columns.append(name)
+            encoded[name] = column.map(lambda item: json.dumps(item, ensure_ascii=False))
+        metadata = {"json_columns": json_columns, "date_columns": date_columns, "attrs": frame.attrs}
+        return encoded, metadata
+
+    @staticmethod
+    def _decode_frame(frame: pd.DataFrame, metadata: Dict[str, Any]) -> pd.DataFrame:
+        for name in metadata.get("json_columns", []):
+            frame[name] = frame[name].map(json.loads)
+        for name in metadata.get("date_columns", []):
+            frame[name] = frame[name].map(lambda item: None if pd.isna(item) else item.date()).astype(object)
+        frame.attrs = metadata.get("attrs", {})
+        return frame
+
+    @classmethod
+    def _read_parquet(cls, path: str) -> pd.DataFrame:
+        connection = duckdb.connect()
+        try:
+            frame = connection.read_parquet(path).df()
+            rows = connection.execute(
+                "SELECT value FROM parquet_kv_metadata(?) WHERE key = ?", [path, PARQUET_METADATA_KEY]
+            ).fetchall()
+        finally:
+            connection.close()
+        metadata = json.loads(rows[0][0]) if rows else {}
+        return cls._decode_frame(frame, metadata)
+
+    @classmethod
+    def _write_parquet(cls, frame: pd.DataFrame, path: str):
+        encoded, metadata = cls._encode_frame(frame)
+        # JSON 无法编码的值（例如 NumPy 标量）在这里抛出 TypeError
+        quoted_metadata = json.dumps(metadata, ensure_ascii=False).replace("'", "''")
+        quoted_path = path.replace("'", "''")
+        connection = duckdb.connect()
+        try:
+            connection.register("frame", encoded)
+            connection.execute(
+                f"COPY frame TO '{quoted_path}' "
+                f"(FORMAT PARQUET, COMPRESSION ZSTD, KV_METADATA {{{PARQUET_METADATA_KEY}: '{quoted_metadata}'}})"
+            )
+        finally:
+            connection.close()
+        # 列名、索引和值都要与原表一致，否则抛出 AssertionError，该条目不写入磁盘；
+        # 字符串列读回时可能是 object 或 str dtype，两者的值相同，不比较 dtype
+        pd.testing.assert_frame_equal(cls._read_parquet(path), frame, check_dtype=False)
+
+    @staticmethod
+    def _write_json(value: Any, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+
+    @staticmethod
+    def _atomic_write(target: Path, write) -> int:
+        """写入并原子替换目标文件，返回目录总大小的变化量"""
+        # 同一个键只保留一种格式，避免读到另一种格式的旧文件
+        other = target.with_suffix(".json" if target.suffix == ".parquet" else ".parquet")
+        fd, temp_path = tempfile.mkstemp(dir=target.parent, prefix=".tmp-", suffix=target.suffix)
+        os.close(fd)
+        try:
+            write(temp_path)
+            change = os.path.getsize(temp_path)
+            for path in (target, other):
+                try:
+                    change -= path.stat().st_size
+                except FileNotFoundError:
+                    pass
+            os.replace(temp_path, target)
+            other.unlink(missing_ok=True)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        return change
+
+    def _files(self) -> Iterator[Tuple[float, int, Path]]:
+        """缓存根目录下所有文件的 (修改时间, 大小, 路径)"""
+        for directory, _, names in os.walk(self.base):
+            for name in names:
+                # 正在写入的临时文件不计入，也不会被删除
+                if name.startswith(".tmp-"):
+                    continue
+                path = Path(directory) / name
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def _account(self, change: int):
+        with self._lock:
+            self._size += change
+            if self._size <= self.max_bytes:
+                return
+        self.evict()
+
+    def evict(self):
+        """总大小超过上限时按修改时间从旧到新删除文件，直到降到上限的 DISK_CACHE_EVICT_TARGET"""
+        # 其他线程正在淘汰时直接返回
+        if not self._evicting.acquire(blocking=False):
+            return
+        try:
+            files = sorted(self._files(), key=lambda item: item[0])
+            total = sum(size for _, size, _ in files)
+            if total > self.max_bytes:
+                target = self.max_bytes * DISK_CACHE_EVICT_TARGET
+                removed = 0
+                for _, size, path in files:
+                    if total <= target:
+                        break
+                    path.unlink(missing_ok=True)
+                    total -= size
+                    removed += 1
+                logger.info(f"磁盘缓存超过 {self.max_bytes} 字节，删除了 {removed} 个最旧的文件")
+            with self._lock:
+                self._size = total
+        finally:
+            self._evicting.release()
+
+
+def open_disk_cache(version: str) -> Optional[DiskCache]:
+    """按环境变量创建磁盘缓存，目录不可用时返回 None（只使用内存缓存）"""
+    root = os.environ.get("FUND_ADVISOR_CACHE_DIR", DEFAULT_CACHE_DIR)
+    if not root:
+        return None
+    max_bytes = int(os.environ.get("FUND_ADVISOR_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES))
+    try:
+        return DiskCache(Path(root), version, max_bytes=max_bytes)
+    except OSError as e:
+        logger.warning(f"磁盘缓存目录 {root} 不可用，仅使用内存缓存: {e}")
+        return None
@@ -0,0 +1,180 @@
+"""
+基金名称模糊检索索引
+
+基于 data/fund_basic_info.csv 构建内存中的三元组（trigram）倒排索引，
+覆盖基金简称、拼音缩写、拼音全称和基金代码。名称在建索引和查询时都做同样的规范化：
+全角转半角、统一大写、去掉空白和括号，并把末尾的 A/C 等份额类别单独拆出，
+使 "易方达蓝筹精选混合" 可以同时匹配到 A 类和 C 类份额。
+"""
+
+import logging
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tools.fund_catalog import BASIC_INFO_CSV
+
+logger = logging.getLogger(__name__)
+
+# 末尾单个字母视为份额类别，前一个字符不能是字母（避免误拆 ETF、REIT 等）
+SHARE_CLASS_PATTERN = re.compile(r"(?<=[^A-Z])([A-FHIY])$")
+# 规范化时去掉的字符：空白、各类括号、连字符和点
+STRIP_PATTERN = re.compile(r"[\s()\[\]【】\-·.]")
+
+NGRAM_SIZE = 3
+
+# 前缀匹配的得分区间下限：只靠三元组相似度的结果得分在 [0, PREFIX_SCORE_FLOOR) 内，
+# 前缀匹配的结果在 [PREFIX_SCORE_FLOOR, 1) 内，精确匹配为 1
+PREFIX_SCORE_FLOOR = 0.6
+
+
+def normalize_text(text: str) -> str:
+    """全角转半角、转大写并去掉空白和括号"""
+    text = unicodedata.normalize("NFKC", text or "").upper()
+    return STRIP_PATTERN.sub("", text)
+
+
+def split_share_class(name: str) -> Tuple[str, str]:
+    """把规范化后的名称拆分为 (基础名称, 份额类别)，没有份额类别时返回空字符串"""
+    match = SHARE_CLASS_PATTERN.search(name)
+    if match:
+        return name[: match.start()], match.group(1)
+    return name, ""
+
+
+def ngrams(text: str) -> List[str]:
+    """带首尾边界标记的 n-gram，短于 n 的字符串整体作为一个 gram"""
+    padded = f"^{text}$"
+    if len(padded) <= NGRAM_SIZE:
+        return [padded]
+    return [padded[i : i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)]
+
+
+class FundNameIndex:
+    """基金名称 / 拼音 / 代码的三元组倒排索引
+
+    每只基金对应多个条目（代码、名称、拼音缩写、拼音全称），查询时对每个条目计算
+    与查询串 gram 集合的 Jaccard 相似度，再取该基金各条目中的最高分。
+    排序先看匹配方式：任一条目与查询完全相同的排最前，其次是以查询开头的，最后才是只有 gram 重合的，
+    同一种匹配方式内按 Jaccard 相似度排序。
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self.codes = frame["fund_code"].to_numpy()
+        self.names = frame["fund_name"].to_numpy()
+        self.types = frame["fund_type"].to_numpy()
+        self.size = len(frame)
+
+        base_names, share_classes = [], []
+        for name in self.names:
+            base, share_class = split_share_class(normalize_text(name))
+            base_names.append(base)
+            share_classes.append(share_class)
+        self.base_names = np.array(base_names, dtype=object)
+        self.share_classes = np.array(share_classes, dtype=object)
+        self._code_to_row = {code: row for row, code in enumerate(self.codes)}
+        self._name_to_row = {}
+        for row, key in enumerate(zip(base_names, share_classes)):
+            self._name_to_row.setdefault(key, row)
+
+        # 条目按字段分块排列，第 k 个字段的第 row 个条目编号为 k * size + row
+        entry_sizes = []
+        postings = defaultdict(list)
+        fields = (
+            self.codes,
+            self.base_names,
+            frame["pinyin_initials"].map(normalize_text).to_numpy(),
+            frame["pinyin_full"].map(normalize_text).to_numpy(),
+        )
+        # 精确匹配和前缀匹配直接比较字段值
+        self._fields = tuple(np.array(values, dtype=str) for values in fields)
+        for values in fields:
+            for value in values:
+                grams = set(ngrams(value)) if value else set()
+                entry = len(entry_sizes)
+                entry_sizes.append(len(grams))
+                for gram in grams:
+                    postings[gram].append(entry)
+
+        self._field_count = len(fields)
+        self._entry_sizes = np.array(entry_sizes, dtype=np.float64)
+        self._postings = {gram: np.array(entries, dtype=np.int32) for gram, entries in postings.items()}
+        logger.info(f"基金名称索引构建完成: {self.size} 只基金, {len(self._postings)} 个 gram")
+
+    @classmethod
+    def from_csv(cls, csv_path=BASIC_INFO_CSV) -> "FundNameIndex":
+        frame = pd.read_csv(csv_path, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+        frame.columns = ["fund_code", "pinyin_initials", "fund_name", "fund_type", "pinyin_full"]
+        return cls(frame)
+
+    def code_of(self, fund_name: str) -> Optional[str]:
+        """按规范化后的完整名称精确查找基金代码，找不到时返回 None"""
+        row = self._name_to_row.get(split_share_class(normalize_text(fund_name)))
+        return None if row is None else self.codes[row]
+
+    def search(self, query: str, limit: int = 5) -> List[dict]:
+        """按相似度返回最匹配的基金列表"""
+        normalized = normalize_text(query)
+        if not normalized:
+            return []
+
+        base, share_class = split_share_class(normalized)
+        query_grams = set(ngrams(base))
+        matched = [self._postings[gram] for gram in query_grams if gram in self._postings]
+        if matched:
+            hits = np.bincount(np.concatenate(matched), minlength=len(self._entry_sizes))
+            entry_scores = hits / (len(query_grams) + self._entry_sizes - hits)
+            similarity = entry_scores.reshape(self._field_count, self.size).max(axis=0)
+        else:
+            similarity = np.zeros(self.size, dtype=np.float64)
+
+        # 查询中带份额类别时，其他份额略微降权
+        if share_class:
+            similarity[self.share_classes != share_class] *= 0.9
+
+        # 代码、名称或拼音与查询完全相同为精确匹配，以查询开头为前缀匹配
+        exact = np.zeros(self.size, dtype=bool)
+        prefix = np.zeros(self.size, dtype=bool)
+        for values in self._fields:
+            exact |= (values == normalized) | (values == base)
+            prefix |= np.char.startswith(values, base)
+        scores = np.where(
+            exact,
+            1.0,
+            np.where(prefix, PREFIX_SCORE_FLOOR + (1 - PREFIX_SCORE_FLOOR) * similarity, PREFIX_SCORE_FLOOR * similarity),
+        )
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.lexsort((self.codes[candidates], -similarity[candidates], -scores[candidates]))]
+
+        return [
+            {
+                "fund_code": self.codes[row],
+                "fund_name": self.names[row],
+                "fund_type": self.types[row],
+                "share_class": self.share_classes[row],
+                "score": round(float(scores[row]), 4),
+            }
+            for row in candidates
+        ]
+
+
+_index: Optional[FundNameIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_fund_index() -> FundNameIndex:
+    """获取进程级基金名称索引，首次调用时构建"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = FundNameIndex.from_csv()
+    return _index
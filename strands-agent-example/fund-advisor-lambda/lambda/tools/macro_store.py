@@ -0,0 +1,205 @@
+"""
+宏观经济时间序列库
+
+LPR、CPI、PPI 每月最多新增一条数据，但 akshare 每次都返回完整历史。这里把每个序列规范化后保存在内存中，
+并作为一个条目写入磁盘缓存（见 tools/disk_cache.py），重启后无需重新下载。
+
+只有到了下一期数据的预计发布时间之后才会向上游检查更新：
+- LPR：每月 20 日 9:00 公布（遇节假日顺延）
+- CPI、PPI：国家统计局于次月 9 日至 15 日之间公布，从 9 日开始检查
+
+到了发布时间但上游还没有新数据时（例如节假日顺延），每隔 MACRO_RECHECK_INTERVAL 再检查一次。
+抓到的数据只追加库中还没有的观测值，已入库的数据不会被改写。
+"""
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from datetime import time as dtime
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from tools.ak_cache import ak_refresh
+from tools.concurrency import SingleFlight
+from tools.disk_cache import DiskCache, open_disk_cache
+
+logger = logging.getLogger(__name__)
+
+# 到了发布时间仍没有新数据时的重新检查间隔（秒）
+MACRO_RECHECK_INTERVAL = 2 * 60 * 60
+
+# 宏观序列库在磁盘缓存中的版本号和命名空间
+MACRO_STORE_VERSION = "macro-1"
+MACRO_NAMESPACE = "macro_series"
+
+RELEASE_TIMEZONE = ZoneInfo("Asia/Shanghai")
+
+_MONTH = re.compile(r"(\d{4})\D*(\d{1,2})")
+
+
+@dataclass(frozen=True)
+class MacroSpec:
+    """一个宏观序列：观测值所在的列，以及第 m 月的数据在第 m + release_lag_months 月的哪一天公布"""
+
+    period_column: str
+    release_day: int
+    release_lag_months: int
+    release_time: dtime
+
+
+MACRO_SERIES = {
+    "macro_china_lpr": MacroSpec("TRADE_DATE", release_day=20, release_lag_months=0, release_time=dtime(9, 0)),
+    "macro_china_cpi": MacroSpec("月份", release_day=9, release_lag_months=1, release_time=dtime(9, 30)),
+    "macro_china_ppi": MacroSpec("月份", release_day=9, release_lag_months=1, release_time=dtime(9, 30)),
+}
+
+
+def month_of(value) -> Optional[int]:
+    """日期或 "2025年09月份" -> 月份序号（year * 12 + month - 1）"""
+    if isinstance(value, (date, datetime, pd.Timestamp)):
+        return value.year * 12 + value.month - 1
+    match = _MONTH.search(str(value))
+    if not match:
+        return None
+    return int(match.group(1)) * 12 + int(match.group(2)) - 1
+
+
+def next_release(spec: MacroSpec, latest_month: int) -> float:
+    """最新一期为 latest_month 时，下一期数据的预计发布时间戳"""
+    year, month = divmod(latest_month + 1 + spec.release_lag_months, 12)
+    released = datetime.combine(date(year, month + 1, spec.release_day), spec.release_time, RELEASE_TIMEZONE)
+    return released.timestamp()
+
+
+def normalize_series(spec: MacroSpec, frame: pd.DataFrame) -> pd.DataFrame:
+    """增加月份序号列 month，去掉无法识别日期的行，按时间升序排列"""
+    if frame is None or frame.empty or spec.period_column not in frame.columns:
+        return pd.DataFrame(columns=["month"])
+    normalized = frame.copy()
+    normalized["month"] = normalized[spec.period_column].map(month_of)
+    normalized = normalized.dropna(subset=["month"])
+    normalized["month"] = normalized["month"].astype("int64")
+    # 同一个月可能有多条观测（早期的 LPR），保留原始日期的先后顺序
+    return normalized.sort_values(["month", spec.period_column], kind="stable").reset_index(drop=True)
+
+
+@dataclass(frozen=True)
+class MacroSeries:
+    """已入库的序列，checked 为最近一次向上游检查的时间"""
+
+    frame: pd.DataFrame
+    checked: float
+
+    @property
+    def latest_month(self) -> Optional[int]:
+        return int(self.frame["month"].iloc[-1]) if not self.frame.empty else None
+
+    def to_frame(self) -> pd.DataFrame:
+        """写入磁盘缓存的形式：序列表，检查时间放在 attrs 中"""
+        frame = self.frame.copy(deep=False)
+        frame.attrs = {"checked": self.checked}
+        return frame
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "MacroSeries":
+        checked = frame.attrs.get("checked", 0.0)
+        frame = frame.copy(deep=False)
+        frame.attrs = {}
+        return cls(frame, checked)
+
+
+class MacroStore:
+    """按发布日历增量更新的宏观序列库"""
+
+    def __init__(self, disk: Optional[DiskCache], recheck_interval: float = MACRO_RECHECK_INTERVAL):
+        self._disk = disk
+        self._recheck_interval = recheck_interval
+        self._series: Dict[str, MacroSeries] = {}
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def series(self, name: str) -> pd.DataFrame:
+        """完整序列（按时间升序，含 month 列）；只在到了发布时间后才检查上游"""
+        now = time.time()
+        stored = self._stored(name)
+        if not self._needs_fetch(name, stored, now):
+            return stored.frame
+        try:
+            return self._flights.do(name, lambda: self._fetch(name)).frame
+        except Exception as e:
+            if stored is None or stored.frame.empty:
+                raise
+            logger.warning(f"更新宏观序列 {name} 失败，继续使用已入库的数据: {e}")
+            # 失败后同样等待一个检查间隔，避免每次请求都去请求上游
+            self._remember(name, MacroSeries(stored.frame, now), persist=False)
+            return stored.frame
+
+    def latest(self, name: str, count: int) -> pd.DataFrame:
+        """最近 count 期的观测值，最新的在前"""
+        frame = self.series(name)
+        return frame.iloc[::-1].head(count).drop(columns="month").reset_index(drop=True)
+
+    def _needs_fetch(self, name: str, stored: Optional[MacroSeries], now: float) -> bool:
+        if stored is None or stored.latest_month is None:
+            return True
+        released_at = next_release(MACRO_SERIES[name], stored.latest_month)
+        if now < released_at:
+            return False
+        # 发布时间之后还没检查过就立即检查，否则按检查间隔重试
+        return stored.checked < released_at or now - stored.checked >= self._recheck_interval
+
+    def _stored(self, name: str) -> Optional[MacroSeries]:
+        with self._lock:
+            stored = self._series.get(name)
+        if stored is None and self._disk is not None:
+            cached = self._disk.get(MACRO_NAMESPACE, name)
+            if cached is not None:
+                stored = MacroSeries.from_frame(cached[0])
+                with self._lock:
+                    self._series.setdefault(name, stored)
+        return stored
+
+    def _fetch(self, name: str) -> MacroSeries:
+        spec = MACRO_SERIES[name]
+        checked = time.time()
+        fetched = normalize_series(spec, ak_refresh(name))
+        stored = self._stored(name)
+        if stored is None or stored.frame.empty:
+            frame = fetched
+        elif fetched.empty:
+            frame = stored.frame
+        else:
+            # 只追加库中还没有的观测值
+            new_rows = fetched[~fetched[spec.period_column].isin(stored.frame[spec.period_column])]
+            frame = stored.frame
+            if not new_rows.empty:
+                frame = normalize_series(spec, pd.concat([stored.frame, new_rows], ignore_index=True))
+                logger.info(f"宏观序列 {name} 新增 {len(new_rows)} 期数据")
+        updated = MacroSeries(frame, checked)
+        self._remember(name, updated, persist=True)
+        return updated
+
+    def _remember(self, name: str, series: MacroSeries, persist: bool):
+        with self._lock:
+            self._series[name] = series
+        if persist and self._disk is not None:
+            self._disk.put(MACRO_NAMESPACE, name, series.to_frame())
+
+
+_store: Optional[MacroStore] = None
+_store_lock = threading.Lock()
+
+
+def get_macro_store() -> MacroStore:
+    """获取进程级宏观序列库"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MacroStore(open_disk_cache(version=MACRO_STORE_VERSION))
+    return _store
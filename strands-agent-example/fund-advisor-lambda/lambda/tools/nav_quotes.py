@@ -0,0 +1,89 @@
+"""
+开放式基金最新净值
+
+fund_open_fund_daily_em 一次返回全部开放式基金最近两个交易日的单位净值、累计净值和日增长率，
+列名带有净值日期（例如 "2025-06-13-单位净值"）。这里把它整理为 基金代码 -> 行号 的索引和三个数组：
+单位净值、日增长率（%）以及净值日期，持仓估值按基金代码批量查找。
+
+最新交易日的净值尚未公布的基金（例如 QDII 基金晚一天公布）使用前一交易日的净值，
+此时日增长率未知，记为 NaN。两天都没有净值的基金视为没有报价。
+数据通过 ak_call 缓存（见 tools/ak_cache.py 中该接口的缓存策略），净值每个交易日晚间更新。
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tools.ak_cache import ak_call
+
+NAV_QUOTES_ENDPOINT = "fund_open_fund_daily_em"
+
+# 列名形如 "<净值日期>-单位净值"
+UNIT_NAV_SUFFIX = "-单位净值"
+
+
+@dataclass(frozen=True)
+class NavQuotes:
+    """全部开放式基金的最新单位净值，nav_date 为每只基金净值对应的日期（YYYY-MM-DD，没有报价时为 None）"""
+
+    rows: Dict[str, int]
+    nav: np.ndarray
+    daily_return: np.ndarray
+    nav_date: np.ndarray
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "NavQuotes":
+        nav_columns = [column for column in frame.columns if str(column).endswith(UNIT_NAV_SUFFIX)]
+        if frame.empty or not nav_columns:
+            return cls.empty()
+        # 接口按 最新交易日、前一交易日 的顺序给出两列净值
+        dates = [str(column)[: -len(UNIT_NAV_SUFFIX)] for column in nav_columns[:2]]
+        latest = pd.to_numeric(frame[nav_columns[0]], errors="coerce").to_numpy(dtype=np.float64)
+        if len(nav_columns) > 1:
+            previous = pd.to_numeric(frame[nav_columns[1]], errors="coerce").to_numpy(dtype=np.float64)
+        else:
+            previous = np.full(len(frame), np.nan)
+        has_latest = np.isfinite(latest)
+        daily_return = pd.to_numeric(
+            frame["日增长率"].astype(str).str.rstrip("%"), errors="coerce"
+        ).to_numpy(dtype=np.float64)
+
+        nav = np.where(has_latest, latest, previous)
+        nav_date = np.where(
+            has_latest, dates[0], np.where(np.isfinite(previous), dates[-1], None)
+        ).astype(object)
+        codes = frame["基金代码"].astype(str).str.zfill(6)
+        return cls(
+            rows={code: row for row, code in enumerate(codes)},
+            nav=nav,
+            daily_return=np.where(has_latest, daily_return, np.nan),
+            nav_date=nav_date,
+        )
+
+    @classmethod
+    def empty(cls) -> "NavQuotes":
+        return cls({}, np.empty(0), np.empty(0), np.empty(0, dtype=object))
+
+    def rows_of(self, fund_codes: Iterable[str]) -> np.ndarray:
+        """批量查找行号，没有报价的基金代码为 -1"""
+        return np.array([self.rows.get(code, -1) for code in fund_codes], dtype=np.int64)
+
+
+_parsed: Optional[Tuple[pd.DataFrame, NavQuotes]] = None
+_parsed_lock = threading.Lock()
+
+
+def get_nav_quotes() -> NavQuotes:
+    """最新净值；ak_call 返回的仍是同一份数据时复用上次整理的结果"""
+    global _parsed
+    frame = ak_call(NAV_QUOTES_ENDPOINT)
+    with _parsed_lock:
+        if _parsed is not None and _parsed[0] is frame:
+            return _parsed[1]
+    quotes = NavQuotes.from_frame(frame)
+    with _parsed_lock:
+        _parsed = (frame, quotes)
+    return quotes
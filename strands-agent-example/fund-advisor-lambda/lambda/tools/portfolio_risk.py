@@ -0,0 +1,184 @@
+"""
+组合风险分析
+
+把组合中各基金的累计净值序列（见 tools/nav_store.py）按所有基金都有净值的交易日对齐，
+得到 (基金数, 交易日数) 的收益率矩阵，再用 NumPy 一次算出：
+
+- 年化协方差矩阵和组合波动率 sigma = sqrt(w' S w)
+- 边际风险贡献 (S w) / sigma，以及每只基金的风险贡献 w_i (S w)_i / sigma，各基金的风险贡献合计等于组合波动率
+- 分散化比率：各基金波动率的加权和除以组合波动率
+- 有效下注数（Meucci）：把组合分解到协方差矩阵的各主成分上，按各主成分方差占比的熵取指数，
+  取值在 1 到基金数之间，越大说明风险来源越分散
+- 集中度：权重的赫芬达尔指数（HHI）及其倒数（有效基金数）
+
+协方差只取决于基金集合和统计区间，与权重无关。CovarianceCache 按（基金集合、区间、各序列的最新日期和长度）缓存，
+净值库抓到新数据后自动重新计算；同一组基金换一套权重（例如比较调仓方案）时直接复用。
+缓存的是每个基金集合各自的协方差，而不是全市场协方差矩阵的切片：全市场对齐到共同交易日后，
+区间会被截断到最晚成立的基金，按组合自身的基金集合对齐才能用上这些基金全部的共同历史。
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import reduce
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from tools import risk_metrics
+from tools.concurrency import SingleFlight
+from tools.nav_store import NavSeries
+
+# 计算协方差至少需要的共同交易日数
+MIN_RISK_OBSERVATIONS = 60
+
+# 缓存的协方差矩阵个数
+COVARIANCE_CACHE_SIZE = 256
+
+
+@dataclass(frozen=True)
+class CovarianceEstimate:
+    """一组基金在共同交易日上的年化收益率统计，行列顺序与 fund_codes 一致"""
+
+    fund_codes: Tuple[str, ...]
+    start_date: np.datetime64
+    end_date: np.datetime64
+    observations: int
+    mean_returns: np.ndarray  # 年化平均收益率
+    covariance: np.ndarray  # 年化协方差
+
+    @property
+    def volatility(self) -> np.ndarray:
+        return np.sqrt(np.diag(self.covariance))
+
+    def correlation(self) -> np.ndarray:
+        volatility = self.volatility
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.covariance / np.outer(volatility, volatility)
+
+
+@dataclass(frozen=True)
+class PortfolioRisk:
+    """一组权重下的组合风险，数组的顺序与 CovarianceEstimate.fund_codes 一致，均为小数"""
+
+    weights: np.ndarray
+    expected_return: float
+    volatility: float
+    marginal_risk: np.ndarray
+    risk_contribution: np.ndarray
+    diversification_ratio: float
+    effective_bets: float
+    herfindahl: float
+
+    @property
+    def risk_share(self) -> np.ndarray:
+        """各基金的风险贡献占组合波动率的比例，合计为 1"""
+        return self.risk_contribution / self.volatility
+
+
+def aligned_values(series: Tuple[NavSeries, ...], days: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """所有序列都有数据的日期，以及这些日期上的 (序列数, 日期数) 净值矩阵
+
+    days 为统计区间（自然日），从最后一个共同日期往前截取，None 表示全部共同日期。
+    """
+    dates = reduce(np.intersect1d, [item.dates for item in series])
+    if days is not None and len(dates):
+        dates = dates[dates >= dates[-1] - np.timedelta64(days, "D")]
+    # 每个序列的日期升序且唯一，共同日期在序列中的位置可以直接二分查找
+    values = np.vstack([np.asarray(item.values)[np.searchsorted(item.dates, dates)] for item in series])
+    return dates, values
+
+
+def estimate_covariance(series: Dict[str, NavSeries], days: Optional[int] = None) -> CovarianceEstimate:
+    """按基金代码排序后对齐净值，估计年化平均收益率和协方差"""
+    fund_codes = tuple(sorted(series))
+    dates, values = aligned_values(tuple(series[code] for code in fund_codes), days)
+    if len(dates) < MIN_RISK_OBSERVATIONS:
+        shortest = min(fund_codes, key=lambda code: len(series[code]))
+        raise ValueError(
+            f"only {len(dates)} trading days on which all funds have a NAV, at least {MIN_RISK_OBSERVATIONS} "
+            f"are needed; fund {shortest} has the shortest history"
+        )
+    returns = risk_metrics.simple_returns(values)
+    periods = risk_metrics.TRADING_DAYS
+    return CovarianceEstimate(
+        fund_codes=fund_codes,
+        start_date=dates[0],
+        end_date=dates[-1],
+        observations=len(dates),
+        mean_returns=returns.mean(axis=-1) * periods,
+        # 只有一只基金时 np.cov 返回标量
+        covariance=np.atleast_2d(np.cov(returns)) * periods,
+    )
+
+
+def effective_number_of_bets(weights: np.ndarray, covariance: np.ndarray) -> float:
+    """Meucci 有效下注数：组合方差在各主成分上的占比 p，exp(-sum(p * ln p))"""
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    variances = (eigenvectors.T @ weights) ** 2 * np.clip(eigenvalues, 0, None)
+    total = variances.sum()
+    if total <= 0:
+        return float("nan")
+    shares = variances[variances > 0] / total
+    return float(np.exp(-(shares * np.log(shares)).sum()))
+
+
+def analyze(estimate: CovarianceEstimate, weights: np.ndarray) -> PortfolioRisk:
+    """weights 按 estimate.fund_codes 排列且合计为 1"""
+    covariance = estimate.covariance
+    exposure = covariance @ weights
+    volatility = float(np.sqrt(max(weights @ exposure, 0.0)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        marginal_risk = exposure / volatility
+        diversification_ratio = float(weights @ estimate.volatility / volatility)
+    return PortfolioRisk(
+        weights=weights,
+        expected_return=float(weights @ estimate.mean_returns),
+        volatility=volatility,
+        marginal_risk=marginal_risk,
+        risk_contribution=weights * marginal_risk,
+        diversification_ratio=diversification_ratio,
+        effective_bets=effective_number_of_bets(weights, covariance),
+        herfindahl=float((weights ** 2).sum()),
+    )
+
+
+class CovarianceCache:
+    """按基金集合和统计区间缓存协方差估计，最近最少使用的先淘汰"""
+
+    def __init__(self, maxsize: int = COVARIANCE_CACHE_SIZE):
+        self._maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, CovarianceEstimate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def estimate(self, series: Dict[str, NavSeries], days: Optional[int] = None) -> CovarianceEstimate:
+        # 序列有新数据时最新日期或长度会变化，对应新的键
+        key = (days,) + tuple(
+            (code, str(series[code].dates[-1]), len(series[code])) for code in sorted(series)
+        )
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                return cached
+        return self._flights.do(key, lambda: self._compute(key, series, days))
+
+    def _compute(self, key: Hashable, series: Dict[str, NavSeries], days: Optional[int]) -> CovarianceEstimate:
+        estimate = estimate_covariance(series, days)
+        with self._lock:
+            self._entries[key] = estimate
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+        return estimate
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_covariance_cache = CovarianceCache()
+
+
+def get_covariance_cache() -> CovarianceCache:
+    """获取进程级协方差缓存"""
+    return _covariance_cache
@@ -0,0 +1,99 @@
+"""
+向量化风险与收益指标
+
+所有函数都沿最后一个轴计算：传入一维净值序列得到单只基金的指标，
+传入 (基金数, 交易日数) 的二维矩阵则一次得到全部基金的指标，可直接用于全市场筛选。
+收益率、波动率、回撤均为小数（0.12 表示 12%），无风险利率为年化小数。
+"""
+
+import numpy as np
+
+# A 股每年交易日约 242~250 天，年化时按 250 天计
+TRADING_DAYS = 250
+
+# 贝塔接近 0 时（例如货币和债券基金相对股票指数）特雷诺比率会被放大到没有意义的量级，不再计算
+MIN_TREYNOR_BETA = 0.05
+
+
+def simple_returns(values: np.ndarray) -> np.ndarray:
+    """逐日简单收益率"""
+    return values[..., 1:] / values[..., :-1] - 1
+
+
+def rolling_returns(values: np.ndarray, window: int) -> np.ndarray:
+    """持有 window 个交易日的滚动收益率，第 i 个值对应从第 i 天买入"""
+    return values[..., window:] / values[..., :-window] - 1
+
+
+def total_return(values: np.ndarray) -> np.ndarray:
+    """区间累计收益率"""
+    return values[..., -1] / values[..., 0] - 1
+
+
+def annualized_return(values: np.ndarray, periods: int = TRADING_DAYS) -> np.ndarray:
+    """按复利年化的区间收益率"""
+    days = values.shape[-1] - 1
+    return (values[..., -1] / values[..., 0]) ** (periods / days) - 1
+
+
+def annualized_volatility(returns: np.ndarray, periods: int = TRADING_DAYS) -> np.ndarray:
+    """年化波动率（逐日收益率的样本标准差乘以 sqrt(periods)）"""
+    return returns.std(axis=-1, ddof=1) * np.sqrt(periods)
+
+
+def drawdowns(values: np.ndarray) -> np.ndarray:
+    """每一天相对此前最高点的回撤（小于等于 0）"""
+    return values / np.maximum.accumulate(values, axis=-1) - 1
+
+
+def max_drawdown(values: np.ndarray) -> np.ndarray:
+    """最大回撤（小于等于 0）"""
+    return drawdowns(values).min(axis=-1)
+
+
+def max_drawdown_window(values: np.ndarray):
+    """一维序列最大回撤的 (最高点下标, 最低点下标)"""
+    trough = int(drawdowns(values).argmin())
+    peak = int(values[: trough + 1].argmax())
+    return peak, trough
+
+
+def sharpe_ratio(returns: np.ndarray, risk_free: float = 0.0, periods: int = TRADING_DAYS) -> np.ndarray:
+    """年化夏普比率"""
+    excess = returns - risk_free / periods
+    return excess.mean(axis=-1) / excess.std(axis=-1, ddof=1) * np.sqrt(periods)
+
+
+def sortino_ratio(returns: np.ndarray, risk_free: float = 0.0, periods: int = TRADING_DAYS) -> np.ndarray:
+    """年化索提诺比率，分母为只计入负超额收益的下行偏差"""
+    excess = returns - risk_free / periods
+    downside = np.sqrt((np.minimum(excess, 0) ** 2).mean(axis=-1))
+    return excess.mean(axis=-1) / downside * np.sqrt(periods)
+
+
+def beta(returns: np.ndarray, benchmark_returns: np.ndarray) -> np.ndarray:
+    """相对基准的贝塔，两个序列须按日期对齐"""
+    active = returns - returns.mean(axis=-1, keepdims=True)
+    benchmark = benchmark_returns - benchmark_returns.mean(axis=-1, keepdims=True)
+    return (active * benchmark).sum(axis=-1) / (benchmark * benchmark).sum(axis=-1)
+
+
+def tracking_error(returns: np.ndarray, benchmark_returns: np.ndarray, periods: int = TRADING_DAYS) -> np.ndarray:
+    """年化跟踪误差"""
+    return annualized_volatility(returns - benchmark_returns, periods)
+
+
+def information_ratio(returns: np.ndarray, benchmark_returns: np.ndarray, periods: int = TRADING_DAYS) -> np.ndarray:
+    """年化信息比率：超越基准的平均收益除以跟踪误差"""
+    active = returns - benchmark_returns
+    return active.mean(axis=-1) / active.std(axis=-1, ddof=1) * np.sqrt(periods)
+
+
+def treynor_ratio(
+    returns: np.ndarray, benchmark_returns: np.ndarray, risk_free: float = 0.0, periods: int = TRADING_DAYS
+) -> np.ndarray:
+    """特雷诺比率：年化超额收益除以贝塔，贝塔的绝对值小于 MIN_TREYNOR_BETA 时为 NaN"""
+    excess = returns.mean(axis=-1) * periods - risk_free
+    betas = beta(returns, benchmark_returns)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(np.abs(betas) < MIN_TREYNOR_BETA, np.nan, excess / betas)
@@ -1,31 +1,36 @@
 from strands import tool
-import boto3
 from boto3.dynamodb.conditions import Key, Attr
 import json
 from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Sequence
+from tools.concurrency import fan_out
+from tools.portfolio_valuation import (
+    combine_fund_summaries, fund_summary_rows, holdings_frame, portfolio_totals, summarize_by_fund, to_decimal,
+    value_holdings, value_new_holding,
+)
+from tools.request_context import clear_request_cache, request_memoized
+from tools.result_encoder import to_plain
+from tools.table_registry import get_table, paginate
 
-kb_name = "fsi-fund-knowledge"
+# 计算投资组合摘要需要的持仓属性
+HOLDING_SUMMARY_ATTRIBUTES = [
+    "user_id", "fund_code", "fund_name", "holding_amount", "purchase_date", "purchase_price", "current_value",
+    "nav_date",
+]
 
-def get_table(table_name):
-    """Helper function to get DynamoDB table
+def iter_user_holdings(user_id: str, attributes: Optional[Sequence[str]] = None) -> Iterator[List[dict]]:
+    """逐页读取用户的持仓，每页的数值已转换为 int / float
     Args:
-        table_name: name of the table
+        user_id: 用户ID
+        attributes: 只读取这些属性（可选，默认读取完整条目）
     Returns:
-        DynamoDB table resource
+        逐页产出的持仓列表
     """
-    dynamodb = boto3.resource("dynamodb")
-    smm_client = boto3.client("ssm")
-    param_name = f"{kb_name}-{table_name}-table-name"
-    
-    try:
-        table_param = smm_client.get_parameter(
-            Name=param_name, WithDecryption=False
-        )
-        return dynamodb.Table(table_param["Parameter"]["Value"])
-    except Exception as e:
-        raise Exception(f"无法获取表 {table_name}: {str(e)}")
+    table = get_table("user_holdings")
+    return paginate(table.query, attributes, KeyConditionExpression=Key("user_id").eq(user_id))
 
 @tool
+@request_memoized
 def get_user_holdings(user_id: str) -> dict:
     """获取用户的基金持仓信息
     Args:
@@ -34,21 +39,18 @@ def get_user_holdings(user_id: str) -> dict:
         holdings: 用户持仓信息的JSON格式
     """
     try:
-        table = get_table("user_holdings")
+        # 使用主键(user_id)查询，沿 LastEvaluatedKey 读完所有分页
+        holdings = [item for page in iter_user_holdings(user_id) for item in page]
         
-        # 使用主键(user_id)查询
-        response = table.query(
-            KeyConditionExpression=Key("user_id").eq(user_id)
-        )
-        
-        if response["Items"]:
-            return response["Items"]
+        if holdings:
+            return holdings
         else:
             return f"未找到用户 {user_id} 的持仓信息"
     except Exception as e:
         return str(e)
 
 @tool
+@request_memoized
 def get_user_fund_holding(user_id: str, fund_code: str) -> dict:
     """获取用户特定基金的持仓信息
     Args:
@@ -93,26 +95,28 @@ def add_user_holding(user_id: str, fund_code: str, fund_name: str,
     try:
         table = get_table("user_holdings")
         
-        # 计算当前价值和盈亏（实际应用中应该从实时数据获取）
-        current_value = holding_amount * purchase_price  # 示例，实际应该获取最新净值
-        profit_loss = 0.0  # 示例，实际应该计算盈亏
+        # 按基金最新净值计算当前价值和盈亏，取不到净值时按成本计
+        valuation = value_new_holding(fund_code, holding_amount, purchase_price)
         
-        # 创建项目
+        # 创建项目（DynamoDB 的数值需要使用 Decimal）
         item = {
             "user_id": user_id,
             "fund_code": fund_code,
             "fund_name": fund_name,
-            "holding_amount": holding_amount,
+            "holding_amount": to_decimal(holding_amount),
             "purchase_date": purchase_date,
-            "purchase_price": purchase_price,
-            "current_value": current_value,
-            "profit_loss": profit_loss,
+            "purchase_price": to_decimal(purchase_price),
+            "current_value": to_decimal(valuation["current_value"]),
+            "profit_loss": to_decimal(valuation["profit_loss"]),
             "last_updated": datetime.now().isoformat()
         }
+        if valuation["nav_date"]:
+            item["nav_date"] = valuation["nav_date"]
         
         # 添加到DynamoDB
         table.put_item(Item=item)
         
+        clear_request_cache()
         return {"status": "success", "message": f"成功添加用户 {user_id} 的基金 {fund_code} 持仓信息"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -154,15 +158,15 @@ def update_user_holding(user_id: str, fund_code: str,
         
         if holding_amount is not None:
             update_expression += ", holding_amount = :amount"
-            expression_values[":amount"] = holding_amount
+            expression_values[":amount"] = to_decimal(holding_amount)
             
         if current_value is not None:
             update_expression += ", current_value = :value"
-            expression_values[":value"] = current_value
+            expression_values[":value"] = to_decimal(current_value)
             
         if profit_loss is not None:
             update_expression += ", profit_loss = :profit"
-            expression_values[":profit"] = profit_loss
+            expression_values[":profit"] = to_decimal(profit_loss)
         
         # 更新项目
         table.update_item(
@@ -174,6 +178,7 @@ def update_user_holding(user_id: str, fund_code: str,
             ExpressionAttributeValues=expression_values
         )
         
+        clear_request_cache()
         return {"status": "success", "message": f"成功更新用户 {user_id} 的基金 {fund_code} 持仓信息"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -198,6 +203,7 @@ def delete_user_holding(user_id: str, fund_code: str) -> dict:
             }
         )
         
+        clear_request_cache()
         return {"status": "success", "message": f"成功删除用户 {user_id} 的基金 {fund_code} 持仓信息"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -211,33 +217,50 @@ def get_user_portfolio_summary(user_id: str) -> dict:
         summary: 用户投资组合摘要的JSON格式
     """
     try:
-        holdings = get_user_holdings(user_id)
-        
-        if isinstance(holdings, str):  # 错误消息
-            return holdings
-            
-        # 计算总资产和总盈亏
-        total_value = sum(item.get("current_value", 0) for item in holdings)
-        total_profit_loss = sum(item.get("profit_loss", 0) for item in holdings)
-        
-        # 计算每个基金的占比
-        for item in holdings:
-            if "current_value" in item and total_value > 0:
-                item["percentage"] = (item["current_value"] / total_value) * 100
-            else:
-                item["percentage"] = 0
-                
-        return {
-            "user_id": user_id,
-            "total_value": total_value,
-            "total_profit_loss": total_profit_loss,
-            "holdings_count": len(holdings),
-            "holdings": holdings
-        }
+        # 逐页读取只需要的属性，边读边汇总
+        summary = _portfolio_summary(user_id, iter_user_holdings(user_id, HOLDING_SUMMARY_ATTRIBUTES))
+        if summary is None:
+            return f"未找到用户 {user_id} 的持仓信息"
+        return summary
     except Exception as e:
         return str(e)
 
+def _portfolio_summary(user_id: str, pages: Iterable[List[dict]]) -> Optional[dict]:
+    """逐页按最新净值估值，只累加按基金的汇总，没有任何持仓时返回 None
+
+    每页的持仓明细估值后即被丢弃，内存占用只与基金数量有关，与持仓笔数无关；
+    同一基金的多笔持仓合并为一行，purchase_price 为按份额加权的平均成本价。
+    """
+    by_fund = None
+    for page in pages:
+        if not page:
+            continue
+        page_funds = summarize_by_fund(value_holdings(holdings_frame(page)))
+        by_fund = page_funds if by_fund is None else combine_fund_summaries([by_fund, page_funds])
+    if by_fund is None:
+        return None
+    summary = portfolio_totals(by_fund)
+    # 占比需要整个组合的总市值，在所有分页读完后计算
+    funds = fund_summary_rows(by_fund, summary["total_value"])
+    
+    return {
+        "user_id": user_id,
+        "total_value": to_plain(summary["total_value"]),
+        "total_cost": to_plain(summary["total_cost"]),
+        "total_profit_loss": to_plain(summary["total_profit_loss"]),
+        "profit_loss_pct": to_plain(summary["profit_loss_pct"]),
+        "daily_change": to_plain(summary["daily_change"]),
+        "daily_change_pct": to_plain(summary["daily_change_pct"]),
+        "holdings_count": int(summary["holdings_count"]),
+        "as_of": to_plain(summary["as_of"]),
+        "holdings": [
+            {name: to_plain(value) for name, value in record.items()}
+            for record in funds.to_dict("records")
+        ]
+    }
+
 @tool
+@request_memoized
 def get_user_profile(user_id: str) -> dict:
     """获取用户的身份信息
     Args:
@@ -312,6 +335,7 @@ def create_user_profile(user_id: str, name: str, age: int, risk_preference: str,
         # 添加到DynamoDB
         table.put_item(Item=item)
         
+        clear_request_cache()
         return {"status": "success", "message": f"成功创建用户 {user_id} 的身份信息"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -393,6 +417,7 @@ def update_user_profile(user_id: str, name: str = None, age: int = None,
             } if name is not None else {}
         )
         
+        clear_request_cache()
         return {"status": "success", "message": f"成功更新用户 {user_id} 的身份信息"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -406,15 +431,27 @@ def get_user_comprehensive_info(user_id: str) -> dict:
         info: 用户综合信息的JSON格式
     """
     try:
-        # 获取用户身份信息
-        profile = get_user_profile(user_id)
+        # 身份信息和持仓在两张表中，并发读取，只需一次往返的时间
+        results = fan_out({
+            "profile": lambda: get_user_profile(user_id),
+            "holdings": lambda: get_user_holdings(user_id),
+        })
+        profile, holdings = results["profile"], results["holdings"]
+        if isinstance(profile, Exception):
+            profile = str(profile)
         if isinstance(profile, str):  # 错误消息
             return {"status": "error", "message": profile}
             
-        # 获取用户投资组合摘要
-        portfolio = get_user_portfolio_summary(user_id)
-        if isinstance(portfolio, str):  # 错误消息
-            portfolio = {"status": "error", "message": portfolio}
+        # 用已读取的持仓计算投资组合摘要
+        if isinstance(holdings, Exception):
+            holdings = str(holdings)
+        if isinstance(holdings, str):  # 错误消息
+            portfolio = {"status": "error", "message": holdings}
+        else:
+            try:
+                portfolio = _portfolio_summary(user_id, [holdings])
+            except Exception as e:
+                portfolio = {"status": "error", "message": str(e)}
             
         # 合并信息
         return {
@@ -1,5 +1,6 @@
 import boto3
 import os
+import time
 from boto3.session import Session
 import yaml
 import argparse
@@ -33,7 +34,7 @@ class AmazonDynamoDB:
         print(self._dynamodb_client, self._dynamodb_resource)
 
     def create_dynamodb(
-        self, kb_name: str, table_name: str, pk_item: str, sk_item: str
+        self, kb_name: str, table_name: str, pk_item: str, sk_item: str, gsi_items: list = None
     ):
         """
         Create a dynamoDB table for handling the fund info and stores table name
@@ -43,20 +44,29 @@ class AmazonDynamoDB:
             table_name: table name
             pk_item: table primary key
             sk_item: table secondary key
+            gsi_items: optional global secondary indexes, each containing index_name,
+                pk_item and optionally sk_item
         """
+        gsi_items = gsi_items or []
+        key_attributes = [pk_item, sk_item] + [
+            attribute for gsi in gsi_items for attribute in (gsi["pk_item"], gsi.get("sk_item"))
+        ]
+        attribute_definitions = [
+            {"AttributeName": attribute, "AttributeType": "S"}
+            for attribute in dict.fromkeys(key_attributes) if attribute
+        ]
         try:
-            table = self._dynamodb_resource.create_table(
-                TableName=table_name,
-                KeySchema=[
-                    {"AttributeName": pk_item, "KeyType": "HASH"},
-                    {"AttributeName": sk_item, "KeyType": "RANGE"},
-                ],
-                AttributeDefinitions=[
-                    {"AttributeName": pk_item, "AttributeType": "S"},
-                    {"AttributeName": sk_item, "AttributeType": "S"},
-                ],
-                BillingMode="PAY_PER_REQUEST",  # Use on-demand capacity mode
-            )
+            create_args = {
+                "TableName": table_name,
+                "KeySchema": self._key_schema(pk_item, sk_item),
+                "AttributeDefinitions": attribute_definitions,
+                "BillingMode": "PAY_PER_REQUEST",  # Use on-demand capacity mode
+            }
+            if gsi_items:
+                create_args["GlobalSecondaryIndexes"] = [
+                    self._global_secondary_index(gsi) for gsi in gsi_items
+                ]
+            table = self._dynamodb_resource.create_table(**create_args)
 
             # Wait for the table to be created
             print(f"Creating table {table_name}...")
@@ -71,6 +81,7 @@ class AmazonDynamoDB:
             )
         except self._dynamodb_client.exceptions.ResourceInUseException:
             print(f"Table {table_name} already exists, skipping table creation step")
+            self.create_missing_indexes(table_name, gsi_items, attribute_definitions)
             self._smm_client.put_parameter(
                 Name=f"{kb_name}-{table_name}-table-name",
                 Description=f"{kb_name} {table_name} table name",
@@ -79,19 +90,78 @@ class AmazonDynamoDB:
                 Overwrite=True,
             )
 
+    def create_missing_indexes(self, table_name: str, gsi_items: list, attribute_definitions: list):
+        """
+        Add the configured global secondary indexes that an existing table does not have yet
+        Args:
+            table_name: table name
+            gsi_items: global secondary index configurations
+            attribute_definitions: attribute definitions covering the index keys
+        """
+        description = self._dynamodb_client.describe_table(TableName=table_name)["Table"]
+        existing = {gsi["IndexName"] for gsi in description.get("GlobalSecondaryIndexes", [])}
+        # DynamoDB 每次 update_table 只能创建一个全局二级索引
+        for gsi in gsi_items:
+            if gsi["index_name"] in existing:
+                continue
+            print(f"Creating index {gsi['index_name']} on table {table_name}...")
+            self._dynamodb_client.update_table(
+                TableName=table_name,
+                AttributeDefinitions=attribute_definitions,
+                GlobalSecondaryIndexUpdates=[{"Create": self._global_secondary_index(gsi)}],
+            )
+            # table_exists 在索引仍为 CREATING 时就会返回，需要等到索引回填完成变为 ACTIVE
+            self._wait_for_index_active(table_name, gsi["index_name"])
+
+    def _wait_for_index_active(self, table_name: str, index_name: str, delay: int = 10, max_attempts: int = 360):
+        """
+        Poll describe_table until the global secondary index is ACTIVE
+        Args:
+            table_name: table name
+            index_name: global secondary index name
+            delay: seconds between polls
+            max_attempts: polls before giving up
+        """
+        for _ in range(max_attempts):
+            description = self._dynamodb_client.describe_table(TableName=table_name)["Table"]
+            statuses = {
+                gsi["IndexName"]: gsi["IndexStatus"] for gsi in description.get("GlobalSecondaryIndexes", [])
+            }
+            if statuses.get(index_name) == "ACTIVE":
+                print(f"Index {index_name} on table {table_name} is active")
+                return
+            time.sleep(delay)
+        raise TimeoutError(f"Index {index_name} on table {table_name} did not become ACTIVE")
+
+    @staticmethod
+    def _key_schema(pk_item: str, sk_item: str = None) -> list:
+        key_schema = [{"AttributeName": pk_item, "KeyType": "HASH"}]
+        if sk_item:
+            key_schema.append({"AttributeName": sk_item, "KeyType": "RANGE"})
+        return key_schema
+
+    def _global_secondary_index(self, gsi: dict) -> dict:
+        return {
+            "IndexName": gsi["index_name"],
+            "KeySchema": self._key_schema(gsi["pk_item"], gsi.get("sk_item")),
+            "Projection": {"ProjectionType": "ALL"},
+        }
+
     def create_multiple_tables(self, kb_name: str, tables_config: list):
         """
         Create multiple DynamoDB tables based on configuration
         Args:
             kb_name: knowledge base name for creating the SSM parameters
-            tables_config: list of table configurations, each containing table_name, pk_item, and sk_item
+            tables_config: list of table configurations, each containing table_name, pk_item, sk_item
+                and optionally gsi
         """
         for table_config in tables_config:
             table_name = table_config["table_name"]
             pk_item = table_config["pk_item"]
             sk_item = table_config["sk_item"]
+            gsi_items = table_config.get("gsi", [])
             
-            self.create_dynamodb(kb_name, table_name, pk_item, sk_item)
+            self.create_dynamodb(kb_name, table_name, pk_item, sk_item, gsi_items)
 
     def delete_dynamodb_table(self, kb_name, table_name):
         """
@@ -0,0 +1,34 @@
+"""
+单元测试公共配置
+
+tools 包从 lambda/ 目录导入。akshare 换成一个空的假模块，各测试通过 akshare 夹具设置用到的接口，
+不会访问网络；磁盘缓存写到临时目录。DynamoDB 表同样由测试内的假对象代替。
+"""
+
+import os
+import sys
+import tempfile
+import types
+from pathlib import Path
+
+import pytest
+
+# 添加Lambda函数代码目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute() / "lambda"))
+
+# 导入 tools 之前设置：akshare 缓存在导入时打开磁盘缓存目录
+os.environ.setdefault("FUND_ADVISOR_CACHE_DIR", tempfile.mkdtemp(prefix="fund-advisor-test-cache-"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+_fake_akshare = types.ModuleType("akshare")
+_fake_akshare.__version__ = "test"
+sys.modules.setdefault("akshare", _fake_akshare)
+
+# test_lambda.py 是调用 Lambda 处理程序的手动脚本，需要真实的 AWS 环境，不作为单元测试收集
+collect_ignore = ["test_lambda.py"]
+
+
+@pytest.fixture
+def akshare(monkeypatch):
+    """假的 akshare 模块，用 monkeypatch.setattr(akshare, "接口名", 函数, raising=False) 提供数据"""
+    return sys.modules["akshare"]
@@ -0,0 +1,126 @@
+"""
+akshare 缓存的过期策略测试
+
+用可控的时钟驱动 TTLCache，检查有效期内命中、stale 窗口内返回旧值并在后台刷新、
+窗口之外同步重新抓取，以及季报类数据在披露期内外的过期时间。
+"""
+
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from tools import ak_cache
+from tools.ak_cache import DAY, CachePolicy, TTLCache, until_quarterly_recheck
+from tools.disk_cache import DiskCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """ak_cache 模块中 time.time() 的返回值，测试中直接修改 clock.now"""
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(ak_cache, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+class Upstream:
+    """记录调用次数的上游接口，每次返回新的值"""
+
+    def __init__(self):
+        self.calls = 0
+        self.refreshed = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls > 1:
+            self.refreshed.set()
+        return f"value-{self.calls}"
+
+
+def test_fresh_entry_is_served_from_memory(clock):
+    cache = TTLCache({"endpoint": CachePolicy(ttl=10)})
+    fetch = Upstream()
+    assert cache.get_or_fetch("endpoint", "key", fetch) == "value-1"
+    clock.now += 9
+    assert cache.get_or_fetch("endpoint", "key", fetch) == "value-1"
+    assert fetch.calls == 1
+
+
+def test_stale_entry_is_served_while_refreshing(clock):
+    cache = TTLCache({"endpoint": CachePolicy(ttl=10, stale_ttl=20)})
+    fetch = Upstream()
+    cache.get_or_fetch("endpoint", "key", fetch)
+    clock.now += 15
+    assert cache.get_or_fetch("endpoint", "key", fetch) == "value-1"
+    assert fetch.refreshed.wait(timeout=5)
+    # 后台刷新写入新值之后直接命中
+    for _ in range(100):
+        if not cache._refreshing:
+            break
+        threading.Event().wait(0.01)
+    assert cache.get_or_fetch("endpoint", "key", fetch) == "value-2"
+    assert fetch.calls == 2
+
+
+def test_entry_past_the_stale_window_is_fetched_again(clock):
+    cache = TTLCache({"endpoint": CachePolicy(ttl=10, stale_ttl=20)})
+    fetch = Upstream()
+    cache.get_or_fetch("endpoint", "key", fetch)
+    clock.now += 31
+    assert cache.get_or_fetch("endpoint", "key", fetch) == "value-2"
+    assert fetch.calls == 2
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache({"endpoint": CachePolicy(ttl=10, max_entries=2)})
+    for key in ("a", "b"):
+        cache.get_or_fetch("endpoint", key, lambda: key)
+    cache.get_or_fetch("endpoint", "a", Upstream())
+    cache.get_or_fetch("endpoint", "c", lambda: "c")
+    fetch = Upstream()
+    assert cache.get_or_fetch("endpoint", "a", fetch) == "a"
+    assert cache.get_or_fetch("endpoint", "b", fetch) == "value-1"
+
+
+def test_disk_entry_is_shared_between_caches(clock, tmp_path):
+    disk = DiskCache(tmp_path, "test")
+    frame = pd.DataFrame({"fund_code": ["000001"], "nav": [1.5]})
+    TTLCache({"endpoint": CachePolicy(ttl=DAY)}, disk=disk).get_or_fetch("endpoint", "key", lambda: frame)
+
+    fetch = Upstream()
+    cached = TTLCache({"endpoint": CachePolicy(ttl=DAY)}, disk=disk).get_or_fetch("endpoint", "key", fetch)
+    pd.testing.assert_frame_equal(cached, frame)
+    assert fetch.calls == 0
+
+
+def test_ak_call_caches_by_endpoint_and_arguments(akshare, monkeypatch):
+    calls = []
+
+    def fund_fee_em(symbol, indicator):
+        calls.append((symbol, indicator))
+        return pd.DataFrame({"费用类型": [indicator], "费率": ["0.15%"]})
+
+    monkeypatch.setattr(akshare, "fund_fee_em", fund_fee_em, raising=False)
+    monkeypatch.setattr(ak_cache, "_cache", TTLCache())
+    first = ak_cache.ak_call("fund_fee_em", symbol="000001", indicator="认购费率")
+    second = ak_cache.ak_call("fund_fee_em", indicator="认购费率", symbol="000001")
+    ak_cache.ak_call("fund_fee_em", symbol="000001", indicator="赎回费率")
+    assert first is second
+    assert calls == [("000001", "认购费率"), ("000001", "赎回费率")]
+
+
+@pytest.mark.parametrize(
+    "now, expected",
+    [
+        # 季度开始后 45 天内（披露期）缓存一天
+        (datetime(2025, 4, 10, 12), datetime(2025, 4, 11, 12)),
+        (datetime(2025, 2, 14), datetime(2025, 2, 15)),
+        # 披露期结束后缓存到下一个季度开始
+        (datetime(2025, 5, 20), datetime(2025, 7, 1)),
+        (datetime(2025, 12, 1), datetime(2026, 1, 1)),
+    ],
+)
+def test_quarterly_recheck(now, expected):
+    assert until_quarterly_recheck(now.timestamp()) == expected.timestamp()
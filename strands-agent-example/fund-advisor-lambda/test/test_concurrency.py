@@ -0,0 +1,107 @@
+"""
+SingleFlight 与 fan_out 测试
+"""
+
+import threading
+import time
+
+import pytest
+
+from tools.concurrency import SingleFlight, fan_out, single_flight
+
+CALLERS = 8
+
+
+def run_concurrently(flight, key, fn):
+    """CALLERS 个线程对同一个 key 调用 flight.do，第一个调用进行期间其余线程到达，返回各线程的结果或异常"""
+    started, release = threading.Event(), threading.Event()
+    results = [None] * CALLERS
+
+    def blocking_fn():
+        started.set()
+        release.wait(timeout=5)
+        return fn()
+
+    def call(index):
+        try:
+            results[index] = flight.do(key, blocking_fn)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(CALLERS)]
+    threads[0].start()
+    started.wait(timeout=5)
+    for thread in threads[1:]:
+        thread.start()
+    # 留出时间让其余线程进入 do 并开始等待
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {"fund_code": "000001"}
+
+    results = run_concurrently(flight, "000001", fetch)
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_error_is_shared_and_the_key_is_released():
+    flight = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        raise ValueError("upstream failed")
+
+    results = run_concurrently(flight, "000001", fetch)
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    # 调用结束后同一个 key 会重新执行
+    with pytest.raises(ValueError):
+        flight.do("000001", fetch)
+    assert len(calls) == 2
+
+
+def test_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do("000001", lambda: 1) == 1
+    assert flight.do("110011", lambda: 2) == 2
+
+
+def test_single_flight_calls_through_with_unhashable_arguments():
+    calls = []
+
+    @single_flight
+    def lookup(fund_codes):
+        calls.append(fund_codes)
+        return len(fund_codes)
+
+    assert lookup(["000001", "110011"]) == 2
+    assert calls == [["000001", "110011"]]
+
+
+def test_fan_out_returns_exceptions_for_failed_tasks():
+    def fail():
+        raise KeyError("110011")
+
+    results = fan_out({"000001": lambda: 1.5, "110011": fail, "161725": lambda: 0.8})
+    assert results["000001"] == 1.5
+    assert results["161725"] == 0.8
+    assert isinstance(results["110011"], KeyError)
+
+
+def test_fan_out_times_out_slow_tasks():
+    release = threading.Event()
+    results = fan_out({"fast": lambda: "done", "slow": lambda: release.wait(5)}, timeout=0.1)
+    release.set()
+    assert results["fast"] == "done"
+    assert isinstance(results["slow"], TimeoutError)
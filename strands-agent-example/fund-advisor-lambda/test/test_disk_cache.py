@@ -0,0 +1,92 @@
+"""
+磁盘缓存测试
+
+检查 DataFrame 经 Parquet 写入读回后逐列一致（包括 JSON 编码的 object 列、日期列和 attrs），
+其他值写成 JSON，无法原样保存的值不落盘，以及超过大小上限时按修改时间淘汰最旧的文件。
+"""
+
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+from tools.disk_cache import DISK_CACHE_EVICT_TARGET, DiskCache
+
+
+def cache_files(cache):
+    return sorted(path.name for path in cache.base.rglob("*") if path.is_file())
+
+
+def test_frame_round_trip(tmp_path):
+    cache = DiskCache(tmp_path, "test")
+    # 雪球接口的 item/value 表：同一列中混有字典、数字和字符串
+    frame = pd.DataFrame(
+        {
+            "item": ["基金经理", "规模", "成立日期"],
+            "value": [{"name": "张三", "years": 5}, 12.5, "2010-01-01"],
+            "report_date": [datetime.date(2025, 3, 31), None, datetime.date(2024, 12, 31)],
+            "nav": [1.25, np.nan, 0.98],
+            "rank": [1, 2, 3],
+        }
+    )
+    frame.attrs = {"fund_code": "000001", "checked": {"2025": 1_700_000_000.0}}
+    cache.put("fund_individual_basic_info_xq", ("symbol", "000001"), frame)
+
+    value, fetched_at = cache.get("fund_individual_basic_info_xq", ("symbol", "000001"))
+    pd.testing.assert_frame_equal(value, frame, check_dtype=False)
+    assert value["value"][0] == {"name": "张三", "years": 5}
+    assert value["report_date"][0] == datetime.date(2025, 3, 31)
+    assert value.attrs == frame.attrs
+    assert fetched_at > 0
+    assert all(name.endswith(".parquet") for name in cache_files(cache))
+
+
+def test_other_values_are_stored_as_json(tmp_path):
+    cache = DiskCache(tmp_path, "test")
+    cache.put("namespace", "key", {"rows": [["000001", 1.5]], "total_rows": 1})
+    assert cache.get("namespace", "key")[0] == {"rows": [["000001", 1.5]], "total_rows": 1}
+    assert all(name.endswith(".json") for name in cache_files(cache))
+
+
+def test_values_that_cannot_be_stored_as_is_are_skipped(tmp_path):
+    cache = DiskCache(tmp_path, "test")
+    cache.put("namespace", "set", {"000001", "110011"})
+    cache.put("namespace", "numpy", pd.DataFrame({"value": [np.int64(1), "一"]}))
+    assert cache.get("namespace", "set") is None
+    assert cache.get("namespace", "numpy") is None
+    assert cache_files(cache) == []
+
+
+def test_key_keeps_only_the_latest_format(tmp_path):
+    cache = DiskCache(tmp_path, "test")
+    cache.put("namespace", "key", pd.DataFrame({"value": [1.0]}))
+    cache.put("namespace", "key", [1, 2, 3])
+    assert cache.get("namespace", "key")[0] == [1, 2, 3]
+    assert len(cache_files(cache)) == 1
+
+
+def test_values_lists_every_entry(tmp_path):
+    cache = DiskCache(tmp_path, "test")
+    for code in ("000001", "110011"):
+        cache.put("fund_holdings", code, {"fund_code": code})
+    assert sorted(value["fund_code"] for value, _ in cache.values("fund_holdings")) == ["000001", "110011"]
+    assert list(cache.values("missing")) == []
+
+
+def test_oldest_files_are_evicted_over_the_size_cap(tmp_path):
+    cache = DiskCache(tmp_path, "test", max_bytes=10_000)
+    payload = "x" * 1000
+    for index in range(8):
+        cache.put("namespace", index, payload)
+        # 按写入顺序设置修改时间，第 0 个最旧
+        written_at = 1_000_000_000 + index
+        os.utime(cache._path("namespace", index).with_suffix(".json"), (written_at, written_at))
+    assert len(cache_files(cache)) == 8
+
+    cache.max_bytes = 5000
+    cache.put("namespace", 8, payload)
+    remaining = [key for key in range(9) if cache.get("namespace", key) is not None]
+    total = sum(path.stat().st_size for path in cache.base.rglob("*") if path.is_file())
+    assert total <= 5000 * DISK_CACHE_EVICT_TARGET
+    assert remaining == list(range(9 - len(remaining), 9))
@@ -0,0 +1,105 @@
+"""
+基金搜索的分页游标测试
+
+基金目录换成几只假基金，检查按游标翻页能不重不漏地取到全部结果、最后一页的 next_cursor 为空，
+以及其他搜索条件或无法解析的游标会被拒绝。
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools import fund_catalog, fund_db, fund_info
+from tools.fund_catalog import NUMERIC_COLUMNS, FundCatalog
+
+FUNDS = [
+    # 基金代码, 名称, 类型, 今年来收益（%）
+    ("000001", "华夏成长混合", "混合型", 12.5),
+    ("000011", "华夏大盘精选混合A", "混合型", 8.0),
+    ("110011", "易方达优质精选混合", "混合型", 8.0),
+    ("161725", "招商中证白酒指数", "指数型", -3.2),
+    ("000198", "天弘余额宝货币", "货币型", 1.1),
+    ("519066", "汇添富蓝筹稳健混合", "混合型", np.nan),
+    ("001938", "中欧时代先锋股票A", "股票型", 20.3),
+]
+
+
+@pytest.fixture(autouse=True)
+def catalog(monkeypatch):
+    frame = pd.DataFrame(
+        {
+            "fund_code": [code for code, _, _, _ in FUNDS],
+            "fund_name": [name for _, name, _, _ in FUNDS],
+            "fund_type": [fund_type for _, _, fund_type, _ in FUNDS],
+            "manager_name": ["基金经理"] * len(FUNDS),
+            "company": ["基金公司"] * len(FUNDS),
+        },
+        dtype=object,
+    )
+    for name in NUMERIC_COLUMNS:
+        frame[name] = np.nan
+    frame["ytd_return"] = [ytd for _, _, _, ytd in FUNDS]
+    monkeypatch.setattr(fund_catalog, "_catalog", FundCatalog(frame))
+    monkeypatch.setattr(fund_db, "_database", None)
+    fund_info._search_page.cache_clear()
+    yield
+    fund_info._search_page.cache_clear()
+
+
+def search(**kwargs):
+    return fund_info.get_fund_search_results(**kwargs)
+
+
+def codes(result):
+    column = result["columns"].index("fund_code")
+    return [row[column] for row in result["rows"]]
+
+
+def test_pages_cover_all_results_in_order():
+    pages = []
+    result = search(query="", page_size=3)
+    while True:
+        pages.append(codes(result))
+        assert result["total_rows"] == len(FUNDS)
+        if result["next_cursor"] is None:
+            break
+        result = search(query="", page_size=3, cursor=result["next_cursor"])
+    # 今年来收益降序，相同时按基金代码，缺失值排在最后
+    assert pages == [["001938", "000001", "000011"], ["110011", "000198", "161725"], ["519066"]]
+
+
+def test_filters_by_query_and_fund_type():
+    result = search(query="混合", fund_type="混合型", page_size=2)
+    assert result["total_rows"] == 4
+    assert codes(result) == ["000001", "000011"]
+    result = search(query="混合", fund_type="混合型", page_size=2, cursor=result["next_cursor"])
+    assert codes(result) == ["110011", "519066"]
+    assert result["next_cursor"] is None
+
+
+def test_cursor_from_another_search_is_rejected():
+    cursor = search(query="混合", page_size=2)["next_cursor"]
+    assert "error" in search(query="华夏", page_size=2, cursor=cursor)
+    assert "error" in search(query="混合", fund_type="混合型", page_size=2, cursor=cursor)
+    assert "error" in search(query="混合", page_size=2, cursor=cursor, diversify_seed=7)
+    assert "error" in search(query="混合", page_size=2, cursor="not-a-cursor")
+
+
+def test_diversified_pages_follow_the_seed():
+    def all_pages(seed):
+        result = search(query="", page_size=4, diversify_seed=seed)
+        first = codes(result)
+        return first + codes(search(query="", page_size=4, diversify_seed=seed, cursor=result["next_cursor"]))
+
+    order = all_pages(7)
+    assert sorted(order) == sorted(code for code, _, _, _ in FUNDS)
+    assert all_pages(7) == order
+
+
+def test_cursor_past_the_end_returns_an_empty_page():
+    cursor = search(query="华夏", page_size=1)["next_cursor"]
+    key = cursor.partition("-")[2]
+    result = search(query="华夏", page_size=1, cursor=f"10-{key}")
+    assert result["rows"] == []
+    assert result["total_rows"] == 2
+    assert result["next_cursor"] is None
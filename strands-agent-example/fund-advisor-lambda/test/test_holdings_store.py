@@ -0,0 +1,157 @@
+"""
+季度持仓库测试
+
+季度的解析和披露时间的推算，以及 HoldingsStore 只在目标季度缺失时按年份抓取、
+披露期内定期重新检查、持久化到磁盘后重启无需重新抓取。fund_portfolio_hold_em 由假的 akshare 提供。
+"""
+
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from tools import ak_cache
+from tools.ak_cache import TTLCache
+from tools.disk_cache import DiskCache
+from tools.holdings_store import (
+    FundHoldings,
+    HoldingsStore,
+    latest_reported_quarter,
+    normalize_holdings,
+    parse_quarter,
+    quarter_end,
+    quarter_label,
+    quarter_of,
+)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("2025Q1", (2025, 1)),
+        ("2024 q4", (2024, 4)),
+        ("2024年4季度股票投资明细", (2024, 4)),
+        ("2025-06-30", (2025, 2)),
+        ("20250930", (2025, 3)),
+    ],
+)
+def test_parse_quarter(text, expected):
+    assert parse_quarter(text) == quarter_of(*expected)
+
+
+def test_parse_quarter_rejects_other_text():
+    assert parse_quarter("股票投资明细") is None
+
+
+def test_quarter_label_and_end():
+    assert quarter_label(quarter_of(2025, 3)) == "2025Q3"
+    assert quarter_end(quarter_of(2025, 1)) == date(2025, 3, 31)
+    assert quarter_end(quarter_of(2025, 2)) == date(2025, 6, 30)
+    assert quarter_end(quarter_of(2024, 4)) == date(2024, 12, 31)
+
+
+@pytest.mark.parametrize(
+    "now, expected",
+    [
+        # 一季度结束不到 15 天，最新已披露的仍是上一年四季度
+        (datetime(2025, 4, 10), (2024, 4)),
+        (datetime(2025, 4, 20), (2025, 1)),
+        (datetime(2025, 1, 10), (2024, 3)),
+    ],
+)
+def test_latest_reported_quarter(now, expected):
+    assert latest_reported_quarter(now.timestamp()) == quarter_of(*expected)
+
+
+def holdings_report(*quarters):
+    """fund_portfolio_hold_em 形式的持仓表，每个季度两只股票"""
+    rows = []
+    for year, quarter in quarters:
+        for code, name in (("600519", "贵州茅台"), ("000858", "五粮液")):
+            rows.append(
+                {
+                    "序号": len(rows) + 1,
+                    "股票代码": code,
+                    "股票名称": name,
+                    "占净值比例": 8.5,
+                    "持股数": 120.0,
+                    "持仓市值": 18000.0,
+                    "季度": f"{year}年{quarter}季度股票投资明细",
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def reports(akshare, monkeypatch):
+    """按年份返回的假持仓数据：reports.years 为 {年份: DataFrame}，调用记录在 reports.calls"""
+    reports = SimpleNamespace(years={}, calls=[])
+
+    def fund_portfolio_hold_em(symbol, date):
+        reports.calls.append((symbol, date))
+        return reports.years.get(int(date), pd.DataFrame())
+
+    monkeypatch.setattr(akshare, "fund_portfolio_hold_em", fund_portfolio_hold_em, raising=False)
+    # 不复用其他测试留在 akshare 缓存中的结果
+    monkeypatch.setattr(ak_cache, "_cache", TTLCache())
+    return reports
+
+
+def test_normalize_holdings():
+    normalized = normalize_holdings(holdings_report((2025, 1)))
+    assert list(normalized.columns) == ["quarter", "stock_code", "stock_name", "weight", "shares", "market_value"]
+    assert normalized["quarter"].tolist() == [quarter_of(2025, 1)] * 2
+    assert normalize_holdings(pd.DataFrame()).empty
+
+
+def test_year_is_fetched_once_for_all_its_quarters(reports, tmp_path):
+    reports.years[2025] = holdings_report((2025, 1), (2025, 2))
+    store = HoldingsStore(DiskCache(tmp_path, "test"))
+
+    quarter, holdings = store.holdings("000001", quarter_of(2025, 1))
+    assert quarter == quarter_of(2025, 1)
+    assert holdings["stock_code"].tolist() == ["600519", "000858"]
+    quarter, _ = store.holdings("000001", quarter_of(2025, 2))
+    assert quarter == quarter_of(2025, 2)
+    assert reports.calls == [("000001", "2025")]
+    assert store.latest_quarter("000001") == quarter_of(2025, 2)
+
+
+def test_stored_holdings_survive_a_restart(reports, tmp_path):
+    reports.years[2025] = holdings_report((2025, 1))
+    HoldingsStore(DiskCache(tmp_path, "test")).holdings("000001", quarter_of(2025, 1))
+
+    restarted = HoldingsStore(DiskCache(tmp_path, "test"))
+    quarter, holdings = restarted.holdings("000001", quarter_of(2025, 1))
+    assert quarter == quarter_of(2025, 1)
+    assert len(holdings) == 2
+    assert reports.calls == [("000001", "2025")]
+    assert list(restarted._fund("000001").checked) == [2025]
+    assert [code for code, _, _ in restarted.latest_holdings()] == ["000001"]
+
+
+def test_previous_year_is_checked_when_the_target_year_is_empty(reports, tmp_path):
+    reports.years[2024] = holdings_report((2024, 3), (2024, 4))
+    store = HoldingsStore(DiskCache(tmp_path, "test"))
+    now = datetime(2025, 4, 20).timestamp()
+
+    fund = store._ensure("000001", quarter_of(2025, 1), now, previous_year=True)
+    assert fund.latest(quarter_of(2025, 1)) == quarter_of(2024, 4)
+    assert reports.calls == [("000001", "2025"), ("000001", "2024")]
+
+
+def test_missing_quarter_is_rechecked_until_disclosure_settles():
+    store = HoldingsStore(None, recheck_interval=3600)
+    wanted = quarter_of(2025, 1)
+    # 季度结束 45 天（5 月 15 日）之前检查过：间隔一小时后重新检查
+    during = datetime(2025, 4, 20).timestamp()
+    fund = FundHoldings("000001", normalize_holdings(None), {2025: during})
+    assert not store._needs_fetch(fund, 2025, wanted, during + 60)
+    assert store._needs_fetch(fund, 2025, wanted, during + 3600)
+    # 披露期结束后检查过仍然没有，不再请求
+    settled = datetime(2025, 5, 20).timestamp()
+    fund = FundHoldings("000001", normalize_holdings(None), {2025: settled})
+    assert not store._needs_fetch(fund, 2025, wanted, settled + 30 * 86400)
+    # 该年份从未检查过
+    assert store._needs_fetch(FundHoldings("000001", normalize_holdings(None)), 2025, wanted, settled)
@@ -0,0 +1,107 @@
+"""
+请求作用域与 strands Agent 的集成测试
+
+request_scope 依赖 strands 在 Agent 调用（run_async 的线程）和工具执行（asyncio.to_thread）时复制 contextvars。
+这里用按脚本返回工具调用的模型驱动真实的 Agent 事件循环，检查 @request_memoized 工具
+在一个作用域内只执行一次、不同作用域之间互不复用，子 Agent 中的工具调用也共用外层的作用域。
+"""
+
+import json
+import threading
+
+from strands import Agent, tool
+from strands.models.model import Model
+
+from tools.request_context import request_memoized, request_scope
+
+
+class ScriptedModel(Model):
+    """按顺序返回预先写好的回复：字符串为最终回答，列表为一轮 [(工具名, 参数)] 工具调用"""
+
+    def __init__(self, turns):
+        self.turns = list(turns)
+
+    def update_config(self, **model_config):
+        pass
+
+    def get_config(self):
+        return {}
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        raise NotImplementedError
+        yield
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        turn = self.turns.pop(0)
+        yield {"messageStart": {"role": "assistant"}}
+        if isinstance(turn, str):
+            yield {"contentBlockDelta": {"delta": {"text": turn}}}
+            yield {"contentBlockStop": {}}
+            yield {"messageStop": {"stopReason": "end_turn"}}
+            return
+        for index, (name, arguments) in enumerate(turn):
+            yield {"contentBlockStart": {"start": {"toolUse": {"toolUseId": f"{len(self.turns)}-{index}", "name": name}}}}
+            yield {"contentBlockDelta": {"delta": {"toolUse": {"input": json.dumps(arguments)}}}}
+            yield {"contentBlockStop": {}}
+        yield {"messageStop": {"stopReason": "tool_use"}}
+
+
+calls = []
+calls_lock = threading.Lock()
+
+
+@tool
+@request_memoized
+def lookup_fund(fund_code: str) -> dict:
+    """Look up a fund
+    Args:
+        fund_code: the code of the fund
+    """
+    with calls_lock:
+        calls.append(fund_code)
+    return {"fund_code": fund_code}
+
+
+@tool
+def fund_analyst(fund_code: str) -> str:
+    """Sub-agent that looks up the same fund again
+    Args:
+        fund_code: the code of the fund
+    """
+    model = ScriptedModel([[("lookup_fund", {"fund_code": fund_code})], "analysed"])
+    return str(Agent(model=model, tools=[lookup_fund], callback_handler=None)(fund_code))
+
+
+def run_agent():
+    # 第一轮并发调用两次相同的工具，第二轮再调用一次，第三轮调用子 Agent
+    model = ScriptedModel([
+        [("lookup_fund", {"fund_code": "000001"}), ("lookup_fund", {"fund_code": "000001"})],
+        [("lookup_fund", {"fund_code": "000001"}), ("lookup_fund", {"fund_code": "110011"})],
+        [("fund_analyst", {"fund_code": "000001"})],
+        "done",
+    ])
+    return Agent(model=model, tools=[lookup_fund, fund_analyst], callback_handler=None)("compare funds")
+
+
+def setup_function():
+    calls.clear()
+
+
+def test_tool_calls_share_one_scope():
+    with request_scope():
+        result = run_agent()
+    assert str(result).strip() == "done"
+    assert sorted(calls) == ["000001", "110011"]
+
+
+def test_scopes_do_not_share_results():
+    with request_scope():
+        run_agent()
+    with request_scope():
+        run_agent()
+    assert sorted(calls) == ["000001", "000001", "110011", "110011"]
+
+
+def test_no_memoization_outside_a_scope():
+    run_agent()
+    assert calls.count("000001") == 4
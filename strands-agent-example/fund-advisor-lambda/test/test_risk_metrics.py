@@ -0,0 +1,84 @@
+"""
+风险与收益指标公式测试
+
+用可以手算的净值序列核对各指标，并检查二维矩阵按行计算的结果与逐只基金计算一致。
+"""
+
+import numpy as np
+import pytest
+
+from tools import risk_metrics
+
+BENCHMARK_RETURNS = np.array([0.01, -0.02, 0.015, -0.005, 0.02, -0.01, 0.005, -0.015])
+
+
+def test_simple_and_total_returns():
+    values = np.array([1.0, 1.1, 0.99])
+    np.testing.assert_allclose(risk_metrics.simple_returns(values), [0.1, -0.1])
+    assert risk_metrics.total_return(values) == pytest.approx(-0.01)
+    np.testing.assert_allclose(risk_metrics.rolling_returns(values, 2), [-0.01])
+
+
+def test_annualized_return_compounds():
+    # 两个周期共增长 21%，每个周期 10%
+    assert risk_metrics.annualized_return(np.array([1.0, 1.1, 1.21]), periods=1) == pytest.approx(0.1)
+    # 半年（125 个交易日）增长 10%，年化为 1.1 ** 2 - 1
+    values = np.linspace(1.0, 1.1, 126)
+    assert risk_metrics.annualized_return(values) == pytest.approx(0.21)
+
+
+def test_max_drawdown_and_window():
+    values = np.array([1.0, 1.2, 0.9, 1.5, 1.2])
+    assert risk_metrics.max_drawdown(values) == pytest.approx(-0.25)
+    assert risk_metrics.max_drawdown_window(values) == (1, 2)
+    np.testing.assert_allclose(risk_metrics.drawdowns(values), [0, 0, -0.25, 0, -0.2])
+
+
+def test_sharpe_and_sortino_ratios():
+    returns = BENCHMARK_RETURNS + 0.002
+    risk_free = 0.02
+    excess = returns - risk_free / 250
+    expected_sharpe = excess.mean() / excess.std(ddof=1) * np.sqrt(250)
+    assert risk_metrics.sharpe_ratio(returns, risk_free) == pytest.approx(expected_sharpe)
+    downside = np.sqrt((np.minimum(excess, 0) ** 2).mean())
+    assert risk_metrics.sortino_ratio(returns, risk_free) == pytest.approx(excess.mean() / downside * np.sqrt(250))
+
+
+def test_beta_and_treynor_ratio():
+    returns = 2 * BENCHMARK_RETURNS + 0.001
+    assert risk_metrics.beta(returns, BENCHMARK_RETURNS) == pytest.approx(2.0)
+    expected = (returns.mean() * 250 - 0.02) / 2
+    assert risk_metrics.treynor_ratio(returns, BENCHMARK_RETURNS, risk_free=0.02) == pytest.approx(expected)
+
+
+def test_treynor_ratio_is_undefined_for_near_zero_beta():
+    # 与基准几乎无关的债券基金：贝塔 0.01，特雷诺比率没有意义
+    bond = 0.01 * BENCHMARK_RETURNS + 0.0002
+    assert risk_metrics.beta(bond, BENCHMARK_RETURNS) == pytest.approx(0.01)
+    assert np.isnan(risk_metrics.treynor_ratio(bond, BENCHMARK_RETURNS))
+
+
+def test_tracking_error_and_information_ratio():
+    active = np.array([0.001, -0.002, 0.003, 0.0, 0.002, -0.001, 0.001, 0.0])
+    returns = BENCHMARK_RETURNS + active
+    expected_error = active.std(ddof=1) * np.sqrt(250)
+    assert risk_metrics.tracking_error(returns, BENCHMARK_RETURNS) == pytest.approx(expected_error)
+    assert risk_metrics.information_ratio(returns, BENCHMARK_RETURNS) == pytest.approx(
+        active.mean() * 250 / expected_error
+    )
+
+
+def test_matrix_rows_match_single_series():
+    stock = 2 * BENCHMARK_RETURNS + 0.001
+    bond = 0.01 * BENCHMARK_RETURNS + 0.0002
+    matrix = np.vstack([stock, bond])
+    np.testing.assert_allclose(
+        risk_metrics.sharpe_ratio(matrix), [risk_metrics.sharpe_ratio(stock), risk_metrics.sharpe_ratio(bond)]
+    )
+    treynor = risk_metrics.treynor_ratio(matrix, BENCHMARK_RETURNS)
+    assert treynor[0] == pytest.approx(risk_metrics.treynor_ratio(stock, BENCHMARK_RETURNS))
+    assert np.isnan(treynor[1])
+    values = np.cumprod(1 + matrix, axis=-1)
+    np.testing.assert_allclose(
+        risk_metrics.max_drawdown(values), [risk_metrics.max_drawdown(row) for row in values]
+    )
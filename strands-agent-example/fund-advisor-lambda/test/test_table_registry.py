@@ -0,0 +1,80 @@
+"""
+DynamoDB 批量读取测试
+
+用假的 DynamoDB resource 代替 boto3：batch_get_item 先返回一部分 UnprocessedKeys，
+检查未处理的键会按指数退避重试、超过 100 个键时分批请求、重试次数用完后返回已读到的条目。
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from tools import table_registry
+from tools.table_registry import BATCH_GET_LIMIT, BATCH_GET_RETRIES, TableRegistry
+
+PHYSICAL_NAME = "fund-basic-info-test"
+
+
+class FakeDynamoDB:
+    """每次 batch_get_item 只处理前 processed 个键，其余放进 UnprocessedKeys"""
+
+    def __init__(self, processed):
+        self.processed = processed
+        self.requests = []
+
+    def batch_get_item(self, RequestItems):
+        keys = RequestItems[PHYSICAL_NAME]["Keys"]
+        self.requests.append([key["fund_code"] for key in keys])
+        done, rest = keys[: self.processed], keys[self.processed :]
+        response = {"Responses": {PHYSICAL_NAME: [dict(key, fund_name=f"基金{key['fund_code']}") for key in done]}}
+        if rest:
+            response["UnprocessedKeys"] = {PHYSICAL_NAME: {"Keys": rest}}
+        return response
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(table_registry, "time", SimpleNamespace(sleep=sleeps.append, monotonic=lambda: 0.0))
+    return sleeps
+
+
+def registry_with(dynamodb):
+    registry = TableRegistry()
+    registry._names["fund_basic_info"] = (PHYSICAL_NAME, float("inf"))
+    registry._local.dynamodb = dynamodb
+    return registry
+
+
+def fund_keys(count):
+    return [{"fund_code": f"{index:06d}"} for index in range(count)]
+
+
+def test_unprocessed_keys_are_retried_with_backoff(sleeps):
+    dynamodb = FakeDynamoDB(processed=2)
+    items = registry_with(dynamodb).batch_get("fund_basic_info", fund_keys(5))
+    assert [item["fund_code"] for item in items] == [f"{index:06d}" for index in range(5)]
+    assert dynamodb.requests == [
+        ["000000", "000001", "000002", "000003", "000004"],
+        ["000002", "000003", "000004"],
+        ["000004"],
+    ]
+    assert sleeps == [0.05, 0.1]
+
+
+def test_keys_are_requested_in_batches_of_the_limit(sleeps):
+    dynamodb = FakeDynamoDB(processed=BATCH_GET_LIMIT)
+    items = registry_with(dynamodb).batch_get("fund_basic_info", fund_keys(2 * BATCH_GET_LIMIT + 10))
+    assert len(items) == 2 * BATCH_GET_LIMIT + 10
+    assert [len(request) for request in dynamodb.requests] == [BATCH_GET_LIMIT, BATCH_GET_LIMIT, 10]
+    assert sleeps == []
+
+
+def test_gives_up_after_the_retry_limit(sleeps, caplog):
+    dynamodb = FakeDynamoDB(processed=1)
+    items = registry_with(dynamodb).batch_get("fund_basic_info", fund_keys(10))
+    assert len(items) == BATCH_GET_RETRIES + 1
+    assert len(dynamodb.requests) == BATCH_GET_RETRIES + 1
+    assert len(sleeps) == BATCH_GET_RETRIES
+    assert all(later >= earlier for earlier, later in zip(sleeps, sleeps[1:]))
+    assert "仍未处理" in caplog.text